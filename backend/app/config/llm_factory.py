@@ -31,6 +31,7 @@ from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.language_models.chat_models import BaseChatModel
 from app.config.monitoring import langfuse_handler
+from app.config.provider_registry import get_provider
 
 from enum import Enum
 from typing import Dict, List, Type, Any
@@ -66,6 +67,15 @@ class LLMFactory:
         if json_output:
             kwargs["response_format"] = {"type": "json_object"}
 
+        # Chat models are shared process-wide; bind_tools / with_structured_output
+        # return new runnables and leave the shared instance untouched
+        return get_provider(
+            ("llm", model, temperature, kwargs),
+            lambda: LLMFactory._create_llm(model, temperature, **kwargs),
+        )
+
+    @staticmethod
+    def _create_llm(model: LLMModel, temperature: float, **kwargs) -> BaseChatModel:
         if model in  [LLMModel.GPT_4, LLMModel.GPT_4O, LLMModel.GPT_4O_MINI]:
             return ChatOpenAI(
                 model=model,
@@ -94,6 +104,13 @@ class LLMFactory:
         For Gemini/Google models: uses method="json_mode"
         For OpenAI models: uses default method
         """
+        return get_provider(
+            ("structured_llm", model, output_schema, kwargs),
+            lambda: LLMFactory._create_structured_llm(model, output_schema, **kwargs),
+        )
+
+    @staticmethod
+    def _create_structured_llm(model: LLMModel, output_schema: Type[Any], **kwargs):
         llm = LLMFactory.get_llm(model, **kwargs)
         
         # Check if it's a Google/Gemini model
@@ -0,0 +1,13 @@
+"""
+Process-local data directory for registries, caches and indexes
+"""
+import os
+
+LOCAL_DATA_DIR = os.getenv("LOCAL_DATA_DIR", "./data")
+
+
+def local_data_path(*parts: str) -> str:
+    """Path under LOCAL_DATA_DIR; parent directories are created on demand"""
+    path = os.path.join(LOCAL_DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
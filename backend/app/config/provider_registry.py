@@ -0,0 +1,112 @@
+"""
+Process-level registry of embedding providers and LLM clients
+
+Services are constructed per request (VectorizationService in query_index,
+LLMFactory.get_llm in every agent call), but the clients behind them are
+expensive to build: credential parsing, SDK client and HTTP pool setup,
+schema conversion for structured output. The registry builds each client
+once per (kind, provider, model, options) key and hands out the same warmed
+instance afterwards, so keep-alive connections are reused.
+
+Clients are shared and must not be mutated by callers.
+"""
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+_providers: Dict[Hashable, Any] = {}
+_providers_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.RLock()
+
+# Attributes that hold SDK clients with their own HTTP pools
+_CLIENT_ATTRIBUTES = (
+    "embeddings", "client", "async_client", "root_client", "root_async_client", "aio", "_client",
+)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable form of constructor options; raises TypeError when not possible"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    hash(value)
+    return value
+
+
+def _check_loop() -> None:
+    global _providers_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _providers_loop is not loop:
+        # Async HTTP pools are bound to the loop that first used them, so
+        # scripts that call asyncio.run() repeatedly start from scratch
+        if _providers_loop is not None:
+            _providers.clear()
+        _providers_loop = loop
+
+
+def get_provider(key: tuple, factory: Callable[[], Any]) -> Any:
+    """Shared instance for key, built with factory on first use.
+
+    Keys may contain option dicts and lists. Keys that still cannot be hashed
+    (options holding live objects such as callbacks) get a fresh, unshared
+    instance.
+    """
+    try:
+        key = _freeze(key)
+    except TypeError:
+        return factory()
+    with _lock:
+        _check_loop()
+        provider = _providers.get(key)
+        if provider is None:
+            provider = _providers[key] = factory()
+        return provider
+
+
+async def _close(obj: Any, seen: set) -> None:
+    if obj is None or id(obj) in seen:
+        return
+    seen.add(id(obj))
+    close = getattr(obj, "aclose", None) or getattr(obj, "close", None)
+    if callable(close):
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.debug(f"Error closing {type(obj).__name__}: {e}")
+    # SDK clients wrap further clients (e.g. google-genai's .aio, openai resources' ._client)
+    for attribute in _CLIENT_ATTRIBUTES:
+        await _close(getattr(obj, attribute, None), seen)
+
+
+async def warm_providers() -> None:
+    """Build the default embedding provider at startup instead of on the first request"""
+    try:
+        from app.services.vectorization_service import VectorizationService
+
+        await asyncio.to_thread(VectorizationService)
+        logger.info(f"Warmed {len(_providers)} shared provider client(s)")
+    except Exception as e:
+        # Providers are built lazily on first use instead
+        logger.warning(f"Could not warm providers: {e}")
+
+
+async def close_providers() -> None:
+    """Close pooled connections held by shared clients (app shutdown)"""
+    global _providers_loop
+    with _lock:
+        providers = list(_providers.values())
+        _providers.clear()
+        _providers_loop = None
+    seen: set = set()
+    for provider in providers:
+        await _close(provider, seen)
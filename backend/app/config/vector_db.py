@@ -1,32 +1,126 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 from pinecone import PineconeAsyncio
 from pinecone.db_data import _IndexAsyncio
+import asyncio
 import os
 
+import numpy as np
+
+from app.vector.base import Vector, to_list
+from app.vector.filters import normalize_filter
+from app.vector.upsert_buffer import get_upsert_buffer
+
+
+# Process-wide Pinecone client and index handles. Creating a PineconeAsyncio
+# per call meant a fresh HTTP session and a describe_index control-plane round
+# trip before every query; these are now created once per event loop and the
+# keep-alive connections are reused across requests.
+_client: Optional[PineconeAsyncio] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_indexes: Dict[str, _IndexAsyncio] = {}
+_lock: Optional[asyncio.Lock] = None
+
+# Upper bound on concurrent queries issued by VectorDatabase.query_many
+QUERY_CONCURRENCY = int(os.getenv("PINECONE_QUERY_CONCURRENCY", 16))
+
+# Pinecone accepts at most 1000 IDs per delete request
+DELETE_BATCH_SIZE = 1000
+# IDs go in the fetch URL, so keep requests short
+FETCH_BATCH_SIZE = 100
+
+
+def _get_client() -> PineconeAsyncio:
+    global _client, _client_loop, _lock
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        # aiohttp sessions are bound to the loop they were created on, so
+        # scripts that call asyncio.run() repeatedly get a fresh client
+        _client = PineconeAsyncio(api_key=os.getenv("PINECONE_API_KEY"))
+        _client_loop = loop
+        _indexes.clear()
+        _lock = asyncio.Lock()
+    return _client
+
+
+async def get_index(index_name: str) -> _IndexAsyncio:
+    """Shared index handle; the host is resolved on first use only.
+
+    Set PINECONE_INDEX_HOST to skip describe_index entirely.
+    """
+    client = _get_client()
+    index = _indexes.get(index_name)
+    if index is None:
+        async with _lock:
+            index = _indexes.get(index_name)
+            if index is None:
+                host = os.getenv("PINECONE_INDEX_HOST")
+                if not host or index_name != os.getenv("PINECONE_INDEX_NAME"):
+                    host = (await client.describe_index(index_name)).host
+                index = _indexes[index_name] = client.IndexAsyncio(host=host)
+    return index
+
+
+async def close_vector_databases():
+    """Close the shared Pinecone client and index handles (app shutdown)"""
+    global _client, _client_loop
+    for index in _indexes.values():
+        await index.close()
+    _indexes.clear()
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _client_loop = None
+
+
+async def _write_vectors(index_name: str, namespace: str, vectors: List[Dict[str, Any]]) -> None:
+    """One upsert request for the upsert buffer"""
+    index = await get_index(index_name)
+    await index.upsert(
+        vectors=[{**vector, "values": to_list(vector["values"])} for vector in vectors], namespace=namespace
+    )
+
 
 class VectorDatabase:
     def __init__(self, index_name: str):
-        self.pc = None
         self.index_name = index_name
+        self.pc: PineconeAsyncio = None
         self.index: _IndexAsyncio = None
 
     async def __aenter__(self):
-        self.pc = PineconeAsyncio(api_key=os.getenv("PINECONE_API_KEY"))
-        index_description = await self.pc.describe_index(self.index_name)
-        self.index = self.pc.IndexAsyncio(host=index_description.host)
+        # Cheap: reuses the shared client, the index handle resolves lazily
+        self.pc = _get_client()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.pc.close()
+        # The shared client stays open; see close_vector_databases
+        pass
+
+    async def _get_index(self) -> _IndexAsyncio:
+        if self.index is None:
+            self.index = await get_index(self.index_name)
+        return self.index
 
     async def upsert_vectors(self, vectors: List[Dict[str, Any]], namespace: str):
-        await self.index.upsert(vectors=vectors, namespace=namespace)
+        """Upsert payloads whose "values" may be float32 arrays; lists are built only here"""
+        index = await self._get_index()
+        vectors = [{**vector, "values": to_list(vector["values"])} for vector in vectors]
+        await index.upsert(vectors=vectors, namespace=namespace)
+
+    async def buffer_vectors(self, vectors: List[Dict[str, Any]], namespace: str) -> "asyncio.Future[None]":
+        """Queue vectors in the process-wide upsert buffer.
+
+        Returns once they are buffered (waiting only if the buffer is full);
+        the returned future resolves when they are written.
+        """
+        return await get_upsert_buffer(_write_vectors).add(self.index_name, namespace, vectors)
 
     async def query_vectors(
-        self, query_embedding: List[float], filters: Dict, top_k: int, namespace: str
+        self, query_embedding: Vector, filters: Dict, top_k: int, namespace: str
     ):
+        index = await self._get_index()
+        query_embedding = to_list(query_embedding)
         if not filters:
-            results = (await self.index.query(
+            results = (await index.query(
                 namespace=namespace,
                 vector=query_embedding,
                 top_k=top_k,
@@ -35,21 +129,11 @@ class VectorDatabase:
             )).matches
             return results
         
-        # Build combined filter from all filter conditions
-        combined_filter = {}
-        for key, value in filters.items():
-            if isinstance(value, dict) and any(op in value for op in ["$eq", "$in", "$gt", "$lt", "$gte", "$lte"]):
-                # Filter already has operator format, use as is
-                combined_filter[key] = value
-            elif isinstance(value, list):
-                # Convert list to $in operator
-                combined_filter[key] = {"$in": value}
-            else:
-                # Convert single value to $eq operator
-                combined_filter[key] = {"$eq": value}
+        # Lists become $in and single values $eq; operators and $and/$or pass through
+        combined_filter = normalize_filter(filters)
 
         # Execute single query with all filters combined
-        results = (await self.index.query(
+        results = (await index.query(
             namespace=namespace,
             vector=query_embedding,
             top_k=top_k,
@@ -60,6 +144,35 @@ class VectorDatabase:
         
         return results
 
+    async def query_many(
+        self,
+        query_embeddings: Union[np.ndarray, List[Vector]],
+        filters: Union[Dict, List[Dict]],
+        top_k: int,
+        namespace: str,
+    ) -> List[List[Any]]:
+        """Run several queries concurrently; results are aligned to query_embeddings.
+
+        ``filters`` is either shared by every query or a list with one filter per query.
+        """
+        if isinstance(filters, list):
+            if len(filters) != len(query_embeddings):
+                raise ValueError("filters must have one entry per query embedding")
+            per_query_filters = filters
+        else:
+            per_query_filters = [filters] * len(query_embeddings)
+
+        semaphore = asyncio.Semaphore(QUERY_CONCURRENCY)
+
+        async def query(embedding, query_filters):
+            async with semaphore:
+                return await self.query_vectors(embedding, query_filters, top_k, namespace)
+
+        return await asyncio.gather(*[
+            query(embedding, query_filters)
+            for embedding, query_filters in zip(query_embeddings, per_query_filters)
+        ])
+
     async def rerank_vectors(self,query : str, documents: List, top_n: int):
         try:
             reranked_documents = await self.pc.inference.rerank(
@@ -74,6 +187,56 @@ class VectorDatabase:
             print(e)
             return documents
 
+    async def list_ids(self, prefixes: List[str], namespace: str) -> List[List[str]]:
+        """Every vector ID starting with each prefix, aligned to prefixes"""
+        index = await self._get_index()
+        semaphore = asyncio.Semaphore(QUERY_CONCURRENCY)
+
+        async def list_prefix(prefix: str) -> List[str]:
+            async with semaphore:
+                # Each page is a list of IDs
+                pages = index.list(prefix=prefix, namespace=namespace)
+                return [vid async for page in pages for vid in page]
+
+        return await asyncio.gather(*[list_prefix(prefix) for prefix in prefixes])
+
+    async def fetch_vectors(self, ids: List[str], namespace: str) -> Dict[str, Any]:
+        """Stored vectors (values and metadata) by ID; IDs that do not exist are left out"""
+        if not ids:
+            return {}
+        index = await self._get_index()
+        responses = await asyncio.gather(*[
+            index.fetch(ids=ids[i:i + FETCH_BATCH_SIZE], namespace=namespace)
+            for i in range(0, len(ids), FETCH_BATCH_SIZE)
+        ])
+        return {id: vector for response in responses for id, vector in response.vectors.items()}
+
+    async def query_ids(self, filters: Dict, namespace: str) -> List[str]:
+        """IDs of the vectors matching a metadata filter (zero-vector query, no metadata)"""
+        index = await self._get_index()
+        vector_ids = []
+        pagination_token = None
+        while True:
+            query_response = await index.query(
+                vector=[0] * int(os.getenv("EMBEDDING_DIMENSIONS", 1536)),
+                filter=normalize_filter(filters),
+                namespace=namespace,
+                top_k=10000,
+                include_metadata=False,
+                include_values=False,
+                pagination_token=pagination_token,
+            )
+            vector_ids.extend([match.id for match in query_response.matches])
+            pagination_token = query_response.pagination_token
+            if not pagination_token:
+                break
+        return vector_ids
+
+    async def update_metadata(self, id: str, metadata: Dict[str, Any], namespace: str):
+        """Overwrite the given metadata fields of one vector"""
+        index = await self._get_index()
+        await index.update(id=id, set_metadata=metadata, namespace=namespace)
+
     async def delete_vectors(
         self,
         ids: List[str],
@@ -81,6 +244,7 @@ class VectorDatabase:
         delete_all: bool = False,
         filters: Dict = {},
     ):
+        index = await self._get_index()
         if filters:
             # Build the filter conditions
             filter_conditions = []
@@ -94,28 +258,20 @@ class VectorDatabase:
             final_filter = (
                 {"$and": filter_conditions} if len(filter_conditions) > 1 else filter_conditions[0]
             )
-            vector_ids = []
-            pagination_token = None
-            while True:
-                query_response = await self.index.query(
-                    vector=[0] * int(os.getenv("EMBEDDING_DIMENSIONS", 1536)),
-                    filter=final_filter,
-                    namespace=namespace,
-                    top_k=10000,
-                    include_metadata=False,
-                    include_values=False,
-                    pagination_token=pagination_token,
-                )
-                vector_ids.extend([match.id for match in query_response.matches])
-                pagination_token = query_response.pagination_token
-                if not pagination_token:
-                    break
-
-            if vector_ids:
-                await self.index.delete(ids=vector_ids, namespace=namespace)
+            vector_ids = await self.query_ids(final_filter, namespace)
+
+            await self.delete_ids(vector_ids, namespace)
+        elif delete_all:
+            await index.delete(delete_all=True, namespace=namespace)
         else:
-            await self.index.delete(
-                ids=ids if not delete_all else None,
-                delete_all=delete_all,
-                namespace=namespace,
-            )
+            await self.delete_ids(ids, namespace)
+
+    async def delete_ids(self, ids: List[str], namespace: str):
+        """Delete by ID in concurrent requests of DELETE_BATCH_SIZE"""
+        if not ids:
+            return
+        index = await self._get_index()
+        await asyncio.gather(*[
+            index.delete(ids=ids[i:i + DELETE_BATCH_SIZE], namespace=namespace)
+            for i in range(0, len(ids), DELETE_BATCH_SIZE)
+        ])
@@ -19,6 +19,7 @@ class FileStatus(str, Enum):
     CREATED = "created"
     PROCESSING = "processing"
     PARSED = "parsed"
+    VECTORIZED = "vectorized"  # parsed, and its vectors are written
     FAILED = "failed"
 
 @dataclass
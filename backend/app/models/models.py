@@ -21,6 +21,7 @@ class FileStatus(str, Enum):
     CREATED = "created"
     PROCESSING = "processing"
     PARSED = "parsed"
+    VECTORIZED = "vectorized"  # parsed, and its vectors are written
     FAILED = "failed"
 
 
@@ -2,13 +2,14 @@ from fastapi import APIRouter, HTTPException, Body
 from typing import List, Optional, Literal, Any, Dict
 from pydantic import BaseModel
 import json, traceback
+from app.services.lexical_index import LEXICAL_SEARCH_ENABLED
 from app.services.search_service import query_index, format_search_results_with_file_metadata
 # from app.models.models import SearchResponse
 
 # Request model for search
 class SearchRequest(BaseModel):
     query: str
-    search_type: Literal["lexical", "semantic", "hybrid"] = "lexical"
+    search_type: Literal["lexical", "semantic", "hybrid"] = "semantic"
     filters: Optional[Dict[str, Any]] = {}
     order_by: Optional[dict] = None
     limit: Optional[int] = 10
@@ -46,6 +47,10 @@ async def search_index(
     valid_indexes = ["documents", "images", "tables", "curated_qas"]
     if index_name not in valid_indexes:
         raise HTTPException(status_code=400, detail=f"Invalid index name. Must be one of: {valid_indexes}")
+
+    # The BM25 index is per instance; see lexical_index
+    if request.search_type != "semantic" and not LEXICAL_SEARCH_ENABLED:
+        raise HTTPException(status_code=400, detail="Lexical and hybrid search are disabled (LEXICAL_SEARCH_ENABLED)")
     
     # Use the filters directly from the request
     filters_dict = request.filters or {}
@@ -58,7 +63,8 @@ async def search_index(
             request.query, 
             filters_dict, 
             request.limit, 
-            request.offset
+            request.offset,
+            request.search_type,
         )
         
         # Format results with appropriate content type
@@ -0,0 +1,443 @@
+"""
+Near-duplicate chunk suppression with MinHash LSH
+
+RFP corpora repeat the same boilerplate (legal terms, headers and footers,
+the appendix attached to every addendum). Each copy used to be embedded,
+stored and retrieved. Before embedding, sync_file_vectors now signs every
+new chunk with MinHash over word shingles and looks it up in an LSH index of
+the user's canonical chunks. A chunk whose estimated Jaccard similarity to
+a canonical one reaches CHUNK_DEDUP_THRESHOLD is not embedded; it is stored
+as an occurrence (a back-reference with its own chunk ID, file, scope and
+pages) of that canonical vector.
+
+Occurrences live in the canonical vector's Pinecone metadata, so every
+instance sees them: "occurrences" holds one JSON object per occurrence and
+"file_ids" / "project_ids" / "dossier_ids" list the vector's own scope
+values and its occurrences'. Pinecone's $eq/$in match list elements, so
+expand_filters only rewrites the filter; remap_matches reports a canonical
+hit outside the query's scope as its in-scope occurrence. Deleting a
+canonical vector that still has occurrences moves it to its first
+occurrence's chunk ID instead.
+
+The LSH index (signatures and band buckets) is a per-instance cache under
+LOCAL_DATA_DIR: an instance that has not seen a canonical just embeds the
+duplicate, and a cached canonical deleted elsewhere is detected when the
+occurrence is recorded. Off by default (CHUNK_DEDUP_ENABLED).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.config.local_storage import local_data_path
+from app.config.vector_db import VectorDatabase
+from app.vector.filters import compile_filter, normalize_filter
+
+CHUNK_DEDUP_ENABLED = os.getenv("CHUNK_DEDUP_ENABLED", "false").lower() == "true"
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.8"))
+# Shorter chunks are always embedded; a few shared words say little
+CHUNK_DEDUP_MIN_WORDS = int(os.getenv("CHUNK_DEDUP_MIN_WORDS", "8"))
+# Pinecone caps metadata at 40 KB per vector; further duplicates are embedded
+CHUNK_DEDUP_MAX_OCCURRENCES = int(os.getenv("CHUNK_DEDUP_MAX_OCCURRENCES", "100"))
+
+SHINGLE_WORDS = 3
+BANDS, ROWS = 20, 6  # candidates from ~0.6 Jaccard; verified against the threshold
+NUM_PERM = BANDS * ROWS
+# Metadata keys queries scope by, and the list field recording each on canonical vectors
+SCOPE_KEYS = ("file_id", "project_id", "dossier_id")
+SCOPE_LIST_KEYS = {key: f"{key}s" for key in SCOPE_KEYS}
+OCCURRENCES_KEY = "occurrences"
+# Canonicals verified per chunk
+MAX_CANDIDATES = 50
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240611)  # fixed: signatures are persisted
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+_stats = {"occurrences_recorded": 0, "occurrences_rejected": 0, "rehomed_vectors": 0}
+_lock: Optional[asyncio.Lock] = None
+_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash of the text's lower-cased word shingles, NUM_PERM uint32 values"""
+    words = _WORD.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & _PRIME for s in shingles), dtype=np.uint64)
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One LSH bucket per band; the band number is part of the hash"""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "big", signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+
+def dedup_eligible(text: str) -> bool:
+    return len(_WORD.findall(text)) >= CHUNK_DEDUP_MIN_WORDS
+
+
+class DedupIndex:
+    """Per-instance LSH cache of canonical chunk signatures"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+            CREATE TABLE IF NOT EXISTS canonicals (
+                index_name TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                PRIMARY KEY (index_name, namespace, vector_id)
+            )
+            """)
+            self.db.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                index_name TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                vector_id TEXT NOT NULL
+            )
+            """)
+            self.db.execute("""
+            CREATE INDEX IF NOT EXISTS buckets_by_bucket
+            ON buckets (index_name, namespace, user_id, bucket)
+            """)
+            self.db.execute("""
+            CREATE INDEX IF NOT EXISTS buckets_by_id ON buckets (index_name, namespace, vector_id)
+            """)
+
+    def match(
+        self, index_name: str, namespace: str, user_id: str, chunk_ids: Sequence[str], texts: Sequence[str]
+    ) -> Tuple[List[Optional[str]], List[Optional[np.ndarray]]]:
+        """Canonical ID for each chunk that duplicates one (None otherwise), and the signatures.
+
+        Chunks are matched against the user's canonical chunks and against
+        earlier unmatched chunks of the same call, which become canonical
+        once uploaded. Ineligible chunks get no signature.
+        """
+        matches: List[Optional[str]] = []
+        signatures: List[Optional[np.ndarray]] = []
+        pending: Dict[int, List[int]] = {}  # bucket -> positions of this call's unmatched chunks
+        with self._lock:
+            for position, text in enumerate(texts):
+                if not dedup_eligible(text):
+                    matches.append(None)
+                    signatures.append(None)
+                    continue
+                signature = minhash_signature(text)
+                buckets = band_buckets(signature)
+                # Canonicals sharing the most bands first; the planner otherwise walks buckets_by_id
+                candidates = {
+                    vector_id: np.frombuffer(signature, dtype=np.uint32)
+                    for vector_id, signature in self.db.execute(
+                        f"SELECT b.vector_id, c.signature FROM buckets b INDEXED BY buckets_by_bucket JOIN canonicals c "
+                        f"ON c.index_name = b.index_name AND c.namespace = b.namespace AND c.vector_id = b.vector_id "
+                        f"WHERE b.index_name = ? AND b.namespace = ? AND b.user_id = ? "
+                        f"AND b.bucket IN ({','.join('?' * len(buckets))}) "
+                        f"GROUP BY b.vector_id ORDER BY COUNT(*) DESC LIMIT {MAX_CANDIDATES}",
+                        [index_name, namespace, user_id, *buckets],
+                    )
+                }
+                local = {p for bucket in buckets for p in pending.get(bucket, [])}
+                scored = [(similarity(signature, s), vector_id) for vector_id, s in candidates.items()]
+                scored += [(similarity(signature, signatures[p]), chunk_ids[p]) for p in local]
+                best = max(scored, default=(0.0, None))
+                if best[0] >= CHUNK_DEDUP_THRESHOLD:
+                    matches.append(best[1])
+                else:
+                    matches.append(None)
+                    for bucket in buckets:
+                        pending.setdefault(bucket, []).append(position)
+                signatures.append(signature)
+        return matches, signatures
+
+    def add_canonicals(
+        self, index_name: str, namespace: str, user_id: str, rows: Iterable[Tuple[str, np.ndarray]]
+    ) -> None:
+        """Register uploaded vectors as canonical: (vector_id, signature)"""
+        canonicals, buckets = [], []
+        for vector_id, signature in rows:
+            canonicals.append((index_name, namespace, vector_id, user_id, signature.tobytes()))
+            buckets.extend((index_name, namespace, user_id, bucket, vector_id) for bucket in band_buckets(signature))
+        if not canonicals:
+            return
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO canonicals VALUES (?, ?, ?, ?, ?)", canonicals)
+            self.db.executemany("INSERT INTO buckets VALUES (?, ?, ?, ?, ?)", buckets)
+
+    def rename(self, index_name: str, namespace: str, renamed: Dict[str, str]) -> None:
+        """Follow canonical vectors moved to a new ID (see release)"""
+        with self._lock, self.db:
+            for table in ("canonicals", "buckets"):
+                self.db.executemany(
+                    f"UPDATE {table} SET vector_id = ? WHERE index_name = ? AND namespace = ? AND vector_id = ?",
+                    [(new, index_name, namespace, old) for old, new in renamed.items()],
+                )
+
+    def forget(self, index_name: str, namespace: str, vector_ids: List[str]) -> None:
+        with self._lock, self.db:
+            for table in ("canonicals", "buckets"):
+                self.db.executemany(
+                    f"DELETE FROM {table} WHERE index_name = ? AND namespace = ? AND vector_id = ?",
+                    [(index_name, namespace, vector_id) for vector_id in vector_ids],
+                )
+
+    def clear(self, index_name: str, namespace: str) -> None:
+        with self._lock, self.db:
+            for table in ("canonicals", "buckets"):
+                self.db.execute(
+                    f"DELETE FROM {table} WHERE index_name = ? AND namespace = ?", (index_name, namespace)
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            canonicals = self.db.execute("SELECT COUNT(*) FROM canonicals").fetchone()[0]
+        recorded = _stats["occurrences_recorded"]
+        return {
+            "cached_canonical_vectors": canonicals,
+            **_stats,
+            # Vectors not stored by this instance, as a share of the chunks that would have been
+            "index_size_reduction": round(recorded / (recorded + canonicals), 4) if recorded else 0.0,
+            "embedding_calls_saved": recorded,
+        }
+
+
+_index: Optional[DedupIndex] = None
+
+
+def get_dedup_index() -> Optional[DedupIndex]:
+    """Process-wide LSH cache stored under LOCAL_DATA_DIR; None when disabled"""
+    global _index
+    if not CHUNK_DEDUP_ENABLED:
+        return None
+    if _index is None:
+        _index = DedupIndex(local_data_path("chunk_dedup_lsh.db"))
+    return _index
+
+
+def _metadata_lock() -> asyncio.Lock:
+    """Serializes this process's read-modify-writes of canonical metadata"""
+    global _lock, _lock_loop
+    loop = asyncio.get_running_loop()
+    if _lock is None or _lock_loop is not loop:
+        _lock = asyncio.Lock()
+        _lock_loop = loop
+    return _lock
+
+
+def occurrences_of(metadata: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """A canonical vector's occurrences, each with its chunk_id and metadata"""
+    return [json.loads(occurrence) for occurrence in (metadata or {}).get(OCCURRENCES_KEY) or []]
+
+
+def occurrence_fields(metadata: Dict[str, Any], occurrences: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Metadata fields recording a canonical vector's occurrences"""
+    fields: Dict[str, Any] = {
+        OCCURRENCES_KEY: [json.dumps(occurrence, default=str, sort_keys=True) for occurrence in occurrences]
+    }
+    for key, list_key in SCOPE_LIST_KEYS.items():
+        values = (str(item[key]) for item in (metadata, *occurrences) if item.get(key))
+        fields[list_key] = list(dict.fromkeys(values))
+    return fields
+
+
+async def file_occurrences(db: VectorDatabase, namespace: str, file_id: str) -> Dict[str, str]:
+    """{chunk_id: canonical vector ID} of a file's recorded occurrences"""
+    ids = await db.query_ids({SCOPE_LIST_KEYS["file_id"]: str(file_id)}, namespace)
+    canonicals = await db.fetch_vectors(ids, namespace)
+    return {
+        occurrence["chunk_id"]: id
+        for id, vector in canonicals.items()
+        for occurrence in occurrences_of(vector.metadata)
+        if str(occurrence.get("file_id")) == str(file_id)
+    }
+
+
+async def attach_occurrences(
+    db: VectorDatabase,
+    namespace: str,
+    rows: List[Tuple[str, str, Dict[str, Any]]],
+    uploaded: Dict[str, Dict[str, Any]] = {},
+) -> List[str]:
+    """Record (chunk_id, canonical_id, metadata) occurrences on their canonical vectors.
+
+    ``uploaded`` has the metadata of canonicals written by the caller, which
+    may not be readable yet. Returns the chunk IDs that were not recorded
+    (canonical deleted meanwhile, or full); they must be embedded.
+    """
+    if not rows:
+        return []
+    async with _metadata_lock():
+        wanted = list({canonical_id for _, canonical_id, _ in rows if canonical_id not in uploaded})
+        canonicals = {
+            id: vector.metadata or {} for id, vector in (await db.fetch_vectors(wanted, namespace)).items()
+        }
+        canonicals.update(uploaded)
+        changed: Dict[str, List[Dict[str, Any]]] = {}
+        rejected = []
+        for chunk_id, canonical_id, metadata in rows:
+            if canonical_id not in canonicals:
+                rejected.append(chunk_id)
+                continue
+            if canonical_id not in changed:
+                changed[canonical_id] = [
+                    occurrence for occurrence in occurrences_of(canonicals[canonical_id])
+                    if occurrence.get("chunk_id") != chunk_id
+                ]
+            occurrences = changed[canonical_id]
+            if len(occurrences) >= CHUNK_DEDUP_MAX_OCCURRENCES:
+                rejected.append(chunk_id)
+                continue
+            occurrences.append({"chunk_id": chunk_id, **metadata})
+        await asyncio.gather(*[
+            db.update_metadata(id, occurrence_fields(canonicals[id], occurrences), namespace)
+            for id, occurrences in changed.items()
+        ])
+    _stats["occurrences_recorded"] += len(rows) - len(rejected)
+    _stats["occurrences_rejected"] += len(rejected)
+    return rejected
+
+
+async def detach_occurrences(db: VectorDatabase, namespace: str, occurrences: Dict[str, str]) -> None:
+    """Remove {chunk_id: canonical_id} occurrences from their canonical vectors"""
+    if not occurrences:
+        return
+    async with _metadata_lock():
+        canonicals = await db.fetch_vectors(list(set(occurrences.values())), namespace)
+        updates = []
+        for id, vector in canonicals.items():
+            current = occurrences_of(vector.metadata)
+            kept = [occurrence for occurrence in current if occurrence.get("chunk_id") not in occurrences]
+            if len(kept) != len(current):
+                updates.append(db.update_metadata(id, occurrence_fields(vector.metadata or {}, kept), namespace))
+        await asyncio.gather(*updates)
+
+
+async def release(
+    db: VectorDatabase,
+    namespace: str,
+    vector_ids: List[str],
+    scope: Optional[Tuple[str, List[str]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Prepare vectors for deletion.
+
+    ``scope`` is the (key, values) of deleted files, projects or dossiers:
+    their occurrences are removed from every canonical vector. A deleted
+    canonical vector that still has occurrences is copied to its first
+    occurrence's chunk ID with that occurrence's metadata and the remaining
+    occurrences. Returns {deleted vector ID: vector written in its place};
+    the deleted IDs themselves are left to the caller.
+    """
+    deleting: Set[str] = set(vector_ids)
+    scope_key, scope_values = None, set()
+    if scope and scope[0] in SCOPE_KEYS:
+        scope_key, scope_values = scope[0], {str(value) for value in scope[1]}
+
+    def dropped(item: Dict[str, Any]) -> bool:
+        return scope_key is not None and str(item.get(scope_key)) in scope_values
+
+    async with _metadata_lock():
+        # Only vectors that ever had occurrences carry the list fields; without
+        # a scope the deleted vectors themselves are the only candidates
+        if scope_key:
+            candidates = await db.query_ids({SCOPE_LIST_KEYS[scope_key]: list(scope_values)}, namespace)
+        else:
+            candidates = vector_ids
+        vectors = await db.fetch_vectors(candidates, namespace)
+
+        successors, updates = {}, []
+        for id, vector in vectors.items():
+            metadata = vector.metadata or {}
+            current = occurrences_of(metadata)
+            kept = [occurrence for occurrence in current if not dropped(occurrence)]
+            if id in deleting or dropped(metadata):
+                if kept:
+                    successors[id] = (metadata, kept)
+            elif len(kept) != len(current):
+                updates.append(db.update_metadata(id, occurrence_fields(metadata, kept), namespace))
+        await asyncio.gather(*updates)
+
+        rehomed = {}
+        for id, (metadata, kept) in successors.items():
+            successor, rest = kept[0], kept[1:]
+            moved = {
+                key: value for key, value in metadata.items()
+                if key not in (OCCURRENCES_KEY, *SCOPE_LIST_KEYS.values())
+            }
+            moved.update({key: value for key, value in successor.items() if key != "chunk_id"})
+            moved["id"] = successor["chunk_id"]
+            moved.update(occurrence_fields(moved, rest))
+            rehomed[id] = {"id": successor["chunk_id"], "values": vectors[id].values, "metadata": moved}
+        # Written before the caller deletes the old IDs, so the chunks never drop out of search
+        if rehomed:
+            await db.upsert_vectors(list(rehomed.values()), namespace)
+    _stats["rehomed_vectors"] += len(rehomed)
+    return rehomed
+
+
+def expand_filters(filters: Dict) -> Tuple[Dict, Optional[Callable[[Dict[str, Any]], bool]]]:
+    """Widen a file/project/dossier-scoped filter to canonical vectors with an occurrence in scope.
+
+    Each $eq/$in scope condition also matches the canonical vectors' list
+    field. Returns the filter to query with and a predicate for the scope
+    part of the filter (for remap_matches); filters without a scope
+    condition are returned unchanged.
+    """
+    normalized = normalize_filter(filters)
+    scope = {}
+    for key in SCOPE_KEYS:
+        condition = normalized.get(key)
+        if isinstance(condition, dict) and len(condition) == 1 and ("$eq" in condition or "$in" in condition):
+            scope[key] = condition
+    if not scope:
+        return filters, None
+
+    clauses = [{"$or": [{key: condition}, {SCOPE_LIST_KEYS[key]: condition}]} for key, condition in scope.items()]
+    rest = {key: value for key, value in normalized.items() if key not in scope}
+    if rest:
+        clauses.insert(0, rest)
+    expanded = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    return expanded, compile_filter(scope)
+
+
+def remap_matches(matches: List[Any], in_scope: Optional[Callable[[Dict[str, Any]], bool]]) -> List[Any]:
+    """Report canonical hits outside the query's scope as their in-scope occurrence"""
+    if in_scope is None:
+        return matches
+    remapped = []
+    for match in matches:
+        metadata = match.metadata or {}
+        if not in_scope(metadata):
+            occurrence = next((item for item in occurrences_of(metadata) if in_scope(item)), None)
+            if occurrence is None:
+                # Scope conditions met by different occurrences
+                continue
+            match.metadata = {**metadata, **{key: value for key, value in occurrence.items() if key != "chunk_id"}}
+        remapped.append(match)
+    return remapped
@@ -0,0 +1,138 @@
+"""
+Process pool for CPU-bound markdown chunking
+
+Header splitting, table/image detection and token counting are pure CPU work;
+run inside the event loop they stall WebSocket progress and every other
+request while a large file is chunked. This module runs them in a shared
+ProcessPoolExecutor (sized from the CPU count) and streams per-file results
+back to the async embedding stage as they complete.
+
+Workers are spawned rather than forked, so they do not inherit the parent's
+gRPC/HTTP client state, and import only the chunker.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.services.markdown_chunker import MarkdownChunker, PageChunk
+
+logger = logging.getLogger(__name__)
+
+# 0 chunks in a thread of this process instead
+CHUNKING_WORKERS = int(os.getenv("CHUNKING_WORKERS") or max(1, (os.cpu_count() or 2) - 1))
+
+CHUNKING_METHODS = ("hybrid_chunk_markdown_with_headers", "hybrid_chunk_markdown_with_pages")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_chunker: Optional[MarkdownChunker] = None
+
+
+def _init_worker() -> None:
+    global _chunker
+    _chunker = MarkdownChunker()
+    # Load the encoding once per worker instead of in the first task
+    _chunker.count_tokens("")
+
+
+def _chunk(method: str, pages_markdown: Dict[str, str], kwargs: Dict[str, Any]) -> List[PageChunk]:
+    chunker = _chunker or MarkdownChunker()
+    return getattr(chunker, method)(pages_markdown, **kwargs)
+
+
+def get_chunking_executor() -> Optional[ProcessPoolExecutor]:
+    """Shared pool, started on first use; None when CHUNKING_WORKERS is 0"""
+    global _executor
+    if CHUNKING_WORKERS <= 0:
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=CHUNKING_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def chunk_markdown(
+    pages_markdown: Dict[str, str], method: str = "hybrid_chunk_markdown_with_headers", **kwargs
+) -> List[PageChunk]:
+    """Run a MarkdownChunker method off the event loop and return its chunks"""
+    if method not in CHUNKING_METHODS:
+        raise ValueError(f"Unknown chunking method: {method}")
+    executor = get_chunking_executor()
+    if executor is None:
+        return await asyncio.to_thread(_chunk, method, pages_markdown, kwargs)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, _chunk, method, pages_markdown, kwargs)
+    except BrokenProcessPool:
+        # A worker died (OOM kill, segfault); start a fresh pool for later calls
+        logger.warning("Chunking worker died; restarting the pool")
+        _discard_executor(executor)
+        return await loop.run_in_executor(get_chunking_executor(), _chunk, method, pages_markdown, kwargs)
+
+
+async def iter_chunked_files(
+    files: Iterable[dict],
+    method: str = "hybrid_chunk_markdown_with_headers",
+    max_pending: Optional[int] = None,
+    **kwargs,
+) -> AsyncIterator[Tuple[dict, List[PageChunk]]]:
+    """Chunk every file's markdown in parallel, yielding (file, chunks) as each finishes.
+
+    Files without markdown are skipped. A file whose chunking fails is
+    yielded with the exception in place of its chunks so one bad document
+    does not stop the batch. With ``max_pending``, at most that many files
+    are being chunked or waiting to be taken; a consumer that stops pulling
+    stops the chunking.
+    """
+
+    async def run(file: dict) -> Tuple[dict, Any]:
+        try:
+            return file, await chunk_markdown(file["markdown"], method, **kwargs)
+        except Exception as e:
+            return file, e
+
+    queued = iter([file for file in files if file.get("markdown")])
+    limit = max_pending if max_pending and max_pending > 0 else float("inf")
+    pending, ready = set(), []
+    try:
+        while True:
+            while len(pending) + len(ready) < limit:
+                file = next(queued, None)
+                if file is None:
+                    break
+                pending.add(asyncio.ensure_future(run(file)))
+            if not ready:
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                ready.extend(task.result() for task in done)
+            yield ready.pop(0)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def shutdown_chunking_pool() -> None:
+    """Stop the worker processes (app shutdown)"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
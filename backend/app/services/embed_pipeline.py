@@ -0,0 +1,130 @@
+"""
+Bounded producer/consumer pipeline for embed-and-upsert
+
+embed_and_upload used to embed a batch, wait for its upsert, then embed the
+next, leaving the network idle half the time. Here a producer embeds batches
+into a bounded asyncio.Queue and upsert workers drain it, so the next batch
+is embedded while the previous one is being written. A full queue blocks the
+producer, and vectorize_files_batch stops pulling chunked files while its
+embedding slots are taken, so the pressure reaches chunking too.
+
+Each stage records items, busy time and time blocked on the queue. A
+producer that is mostly blocked means upserts are the bottleneck; upsert
+workers that are mostly blocked mean embedding is.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Embedded batches waiting for an upsert worker
+EMBED_QUEUE_DEPTH = int(os.getenv("EMBED_QUEUE_DEPTH", "4"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "2"))
+# Files embedding at once; chunked files wait (and chunking pauses) beyond this
+VECTORIZE_FILES_IN_FLIGHT = int(os.getenv("VECTORIZE_FILES_IN_FLIGHT", "10"))
+# Files being chunked or chunked but not yet picked up for embedding
+CHUNKED_FILES_QUEUE_DEPTH = int(os.getenv("CHUNKED_FILES_QUEUE_DEPTH", "4"))
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy: float = 0.0  # seconds doing the stage's work
+    blocked: float = 0.0  # seconds waiting on the queue (put for the producer, get for workers)
+
+    @property
+    def throughput(self) -> float:
+        """Items per busy second"""
+        return self.items / self.busy if self.busy else 0.0
+
+    def merge(self, other: "StageStats") -> None:
+        self.items += other.items
+        self.busy += other.busy
+        self.blocked += other.blocked
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.items} batches, busy {self.busy:.2f}s "
+            f"({self.throughput:.1f}/s), blocked on queue {self.blocked:.2f}s"
+        )
+
+
+# Process-wide totals across pipeline runs
+_totals: Dict[str, StageStats] = {}
+
+
+def get_pipeline_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-stage totals: batches, busy and queue-blocked seconds, batches per busy second"""
+    return {
+        name: {
+            "batches": stats.items,
+            "busy_seconds": round(stats.busy, 3),
+            "blocked_seconds": round(stats.blocked, 3),
+            "batches_per_sec": round(stats.throughput, 3),
+        }
+        for name, stats in _totals.items()
+    }
+
+
+async def run_pipeline(
+    items: Iterable[Any],
+    produce: Callable[[Any], Awaitable[Any]],
+    consume: Callable[[Any], Awaitable[None]],
+    depth: int = EMBED_QUEUE_DEPTH,
+    workers: int = UPSERT_WORKERS,
+    names: Tuple[str, str] = ("embed", "upsert"),
+) -> Tuple[StageStats, StageStats]:
+    """Run produce over items and consume the results concurrently.
+
+    At most ``depth`` produced results wait for ``workers`` consumers. The
+    first failure in either stage cancels the other and is raised.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, depth))
+    producer_stats, consumer_stats = StageStats(names[0]), StageStats(names[1])
+    workers = max(1, workers)
+
+    async def producer() -> None:
+        for item in items:
+            started = time.perf_counter()
+            result = await produce(item)
+            produced = time.perf_counter()
+            await queue.put(result)
+            producer_stats.busy += produced - started
+            producer_stats.blocked += time.perf_counter() - produced
+            producer_stats.items += 1
+        for _ in range(workers):
+            await queue.put(_DONE)
+
+    async def consumer() -> None:
+        while True:
+            started = time.perf_counter()
+            result = await queue.get()
+            got = time.perf_counter()
+            consumer_stats.blocked += got - started
+            if result is _DONE:
+                return
+            await consume(result)
+            consumer_stats.busy += time.perf_counter() - got
+            consumer_stats.items += 1
+
+    tasks = [asyncio.ensure_future(producer())] + [asyncio.ensure_future(consumer()) for _ in range(workers)]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    for stats in (producer_stats, consumer_stats):
+        _totals.setdefault(stats.name, StageStats(stats.name)).merge(stats)
+    logger.info(f"Pipeline {producer_stats}; {consumer_stats}")
+    return producer_stats, consumer_stats
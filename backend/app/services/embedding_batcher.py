@@ -0,0 +1,196 @@
+"""
+Token-aware adaptive batching for embedding provider requests
+
+Texts are packed in order into requests bounded by the provider's per-request
+token and input limits, and a bounded number of requests run concurrently.
+Both bounds adapt AIMD-style: they grow additively while requests succeed
+under the latency target and are cut multiplicatively on rate limiting (429 /
+RESOURCE_EXHAUSTED) or slow responses. State lives per provider for the whole
+process, so what one upload learns carries over to the next, and the
+concurrency limit holds across all concurrent uploads and queries.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.token_counter import count_tokens
+from app.vector.base import as_float32
+
+EMBEDDING_LATENCY_TARGET = float(os.getenv("EMBEDDING_LATENCY_TARGET", "5"))  # seconds per request
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "16"))
+RATE_LIMIT_RETRIES = 6
+RATE_LIMIT_BACKOFF = 1.0  # seconds, doubled per retry
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """429s from the OpenAI client, google-genai or anything that mentions them"""
+    for attr in ("status_code", "code", "status"):
+        if getattr(error, attr, None) in (429, "RESOURCE_EXHAUSTED"):
+            return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "rate limit" in message.lower()
+
+
+class AdaptiveBatcher:
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        max_tokens_per_request: int,
+        max_inputs_per_request: int,
+        max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+        initial_concurrency: int = 4,
+        max_tokens_per_input: Optional[int] = None,
+    ):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens_per_request
+        self.max_inputs = max_inputs_per_request
+        self.max_tokens_per_input = max_tokens_per_input
+        self.max_concurrency = max_concurrency
+        # Adapted limits; start below the provider maximum and grow into it
+        self.token_budget = max(1, max_tokens_per_request // 4)
+        self.concurrency = float(min(initial_concurrency, max_concurrency))
+
+        self.chunks = 0
+        self.tokens = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.busy_seconds = 0.0
+        self.latency = 0.0  # EWMA, seconds per request
+        self._active_runs = 0
+        self._busy_since = 0.0
+        # Requests in flight across all runs, bounded by the adapted concurrency
+        self._in_flight = 0
+        self._slots: Optional[asyncio.Condition] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _on_success(self, latency: float) -> None:
+        self.latency = latency if not self.latency else 0.8 * self.latency + 0.2 * latency
+        if latency > EMBEDDING_LATENCY_TARGET:
+            self.token_budget = max(1, int(self.token_budget * 0.75))
+            return
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+        self.token_budget = min(self.max_tokens, self.token_budget + max(1, self.max_tokens // 16))
+
+    def _on_rate_limited(self) -> None:
+        self.rate_limited += 1
+        self.concurrency = max(1.0, self.concurrency / 2)
+        self.token_budget = max(1, self.token_budget // 2)
+
+    def _next_batch(self, token_counts: Sequence[int], start: int) -> int:
+        """End index of the request starting at ``start`` (always at least one input)"""
+        end, tokens = start, 0
+        while end < len(token_counts) and end - start < self.max_inputs:
+            if end > start and tokens + token_counts[end] > self.token_budget:
+                break
+            tokens += token_counts[end]
+            end += 1
+        return end
+
+    def _get_slots(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Condition()
+            self._slots_loop = loop
+            self._in_flight = 0
+        return self._slots
+
+    async def _send(
+        self, batch: List[str], tokens: int, send: Callable[[List[str]], Awaitable[Any]]
+    ) -> np.ndarray:
+        slots = self._get_slots()
+        async with slots:
+            await slots.wait_for(lambda: self._in_flight < int(self.concurrency))
+            self._in_flight += 1
+        try:
+            attempt = 0
+            while True:
+                started = time.monotonic()
+                try:
+                    vectors = await send(batch)
+                    break
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt == RATE_LIMIT_RETRIES:
+                        raise
+                    self._on_rate_limited()
+                    await asyncio.sleep(RATE_LIMIT_BACKOFF * 2 ** attempt * (0.5 + random.random()))
+                    attempt += 1
+        finally:
+            async with slots:
+                self._in_flight -= 1
+                slots.notify_all()
+        self._on_success(time.monotonic() - started)
+        self.requests += 1
+        self.chunks += len(batch)
+        self.tokens += tokens
+        # Convert per request so the provider's float lists are freed early
+        return as_float32(vectors)
+
+    async def run(self, texts: List[str], send: Callable[[List[str]], Awaitable[Any]]) -> np.ndarray:
+        """Embed texts through ``send`` (one provider request per call) into a float32 (n, d) matrix"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        token_counts = [count_tokens(self.model, text) for text in texts]
+        if self.max_tokens_per_input:
+            token_counts = [min(count, self.max_tokens_per_input) for count in token_counts]
+
+        if self._active_runs == 0:
+            self._busy_since = time.monotonic()
+        self._active_runs += 1
+        results: Dict[int, np.ndarray] = {}
+        in_flight: Dict[asyncio.Future, int] = {}
+        position = 0
+        try:
+            while position < len(texts) or in_flight:
+                while position < len(texts) and len(in_flight) < int(self.concurrency):
+                    end = self._next_batch(token_counts, position)
+                    task = asyncio.ensure_future(
+                        self._send(texts[position:end], sum(token_counts[position:end]), send)
+                    )
+                    in_flight[task] = position
+                    position = end
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results[in_flight.pop(task)] = task.result()
+            return np.concatenate([results[start] for start in sorted(results)])
+        finally:
+            for task in in_flight:
+                task.cancel()
+            self._active_runs -= 1
+            if self._active_runs == 0:
+                self.busy_seconds += time.monotonic() - self._busy_since
+
+    def get_stats(self) -> Dict[str, Any]:
+        busy = self.busy_seconds + (time.monotonic() - self._busy_since if self._active_runs else 0.0)
+        return {
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "chunks_per_sec": self.chunks / busy if busy else 0.0,
+            "token_budget": self.token_budget,
+            "concurrency": int(self.concurrency),
+            "in_flight": self._in_flight,
+            "latency": self.latency,
+        }
+
+
+_batchers: Dict[str, AdaptiveBatcher] = {}
+
+
+def get_batcher(provider: str, model: str, **limits) -> AdaptiveBatcher:
+    """Process-wide batcher for one provider/model; limits apply on first use"""
+    name = f"{provider}:{model}"
+    if name not in _batchers:
+        _batchers[name] = AdaptiveBatcher(name, model, **limits)
+    return _batchers[name]
+
+
+def get_batcher_stats() -> Dict[str, Dict[str, Any]]:
+    """Throughput and adapted limits per provider/model"""
+    return {name: batcher.get_stats() for name, batcher in _batchers.items()}
@@ -0,0 +1,218 @@
+"""
+Embedding caches: persistent for documents, in-memory for queries
+
+Document embeddings are keyed by (model, dimensions, sha256(text)) so
+reprocessing a file, resaving a curated QA or re-uploading a knowledge-hub
+item only embeds chunks whose text actually changed. Vectors are stored as
+float32 bytes in SQLite.
+
+Query embeddings are held in a small LRU with a TTL; repeated searches and
+ticket regeneration send the same queries over and over.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config.local_storage import local_data_path
+from app.services.token_counter import count_tokens
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))  # seconds
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                digest BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                tokens INTEGER NOT NULL,
+                PRIMARY KEY (model, dimensions, digest)
+            ) WITHOUT ROWID
+            """)
+        self.lookups = 0
+        self.hits = 0
+        self.saved_tokens = 0
+        self.embedded_tokens = 0
+
+    def get_many(self, model: str, dimensions: int, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached float32 vectors (read-only views of the stored bytes) aligned to texts, None for misses"""
+        digests = [content_hash(text) for text in texts]
+        found: Dict[bytes, Any] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(digests))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                found.update(
+                    (digest, (vector, tokens))
+                    for digest, vector, tokens in self.db.execute(
+                        f"SELECT digest, vector, tokens FROM embeddings "
+                        f"WHERE model = ? AND dimensions = ? AND digest IN ({','.join('?' * len(chunk))})",
+                        [model, dimensions, *chunk],
+                    )
+                )
+
+            results: List[Optional[np.ndarray]] = []
+            for digest in digests:
+                entry = found.get(digest)
+                if entry is None:
+                    results.append(None)
+                    continue
+                results.append(np.frombuffer(entry[0], dtype=np.float32))
+                self.hits += 1
+                self.saved_tokens += entry[1]
+            self.lookups += len(digests)
+        return results
+
+    def put_many(
+        self, model: str, dimensions: int, texts: Sequence[str], vectors: np.ndarray
+    ) -> None:
+        rows = []
+        for text, vector in zip(texts, vectors):
+            tokens = count_tokens(model, text)
+            rows.append((model, dimensions, content_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), tokens))
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            self.embedded_tokens += sum(row[4] for row in rows)
+
+    def clear(self) -> None:
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM embeddings")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and tokens saved since process start"""
+        with self._lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "entries": entries,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "misses": self.lookups - self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "saved_tokens": self.saved_tokens,
+                "embedded_tokens": self.embedded_tokens,
+            }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache under LOCAL_DATA_DIR, or None when disabled"""
+    global _cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(local_data_path("embedding_cache.db"))
+        return _cache
+
+
+class QueryEmbeddingCache:
+    """Size-bounded LRU of query embeddings with a TTL and single-flight misses.
+
+    Concurrent misses for the same key share one provider call. Cached
+    vectors are read-only float32 arrays shared between callers.
+    """
+
+    def __init__(self, max_size: int = QUERY_EMBEDDING_CACHE_SIZE, ttl: float = QUERY_EMBEDDING_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, vector: Any) -> np.ndarray:
+        # Own copy, frozen so no caller can change what others get back
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self._entries[key] = (time.monotonic() + self.ttl, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return vector
+
+    async def get_or_embed(self, key: Hashable, embed: Callable[[], Awaitable[Any]]) -> np.ndarray:
+        vector = self.get(key)
+        if vector is not None:
+            return vector
+
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+        else:
+            self.misses += 1
+
+            async def fetch() -> np.ndarray:
+                try:
+                    return self.put(key, await embed())
+                finally:
+                    if self._inflight.get(key) is task:
+                        del self._inflight[key]
+
+            task = self._inflight[key] = asyncio.ensure_future(fetch())
+        # shield: a cancelled caller must not cancel the call others are waiting on
+        return await asyncio.shield(task)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+_query_cache: Optional[QueryEmbeddingCache] = None
+
+
+def get_query_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    """Process-wide query cache, or None when QUERY_EMBEDDING_CACHE_SIZE is 0"""
+    global _query_cache
+    if QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache()
+        return _query_cache
@@ -1,44 +1,83 @@
-from google import genai
-from google.genai.types import EmbedContentConfig
-from google.oauth2 import service_account
+try:
+    from google import genai
+    from google.genai.types import EmbedContentConfig
+    from google.oauth2 import service_account
+except ImportError:
+    genai = None
+
+try:
+    from langchain_openai import OpenAIEmbeddings
+except ImportError:
+    OpenAIEmbeddings = None
 
-from langchain_openai import OpenAIEmbeddings
 from typing import List, Dict, Any, Union
 from abc import ABC, abstractmethod
+from functools import lru_cache, partial
 import os
+import re
 import json
 import asyncio
+import zlib
+
+import numpy as np
+
+from app.config.provider_registry import get_provider
+from app.services.embedding_batcher import get_batcher
+from app.services.embedding_cache import get_embedding_cache, get_query_embedding_cache
+from app.vector.base import as_float32
 
 class EmbeddingProvider(ABC):
-    """Abstract base class for embedding providers"""
+    """Abstract base class for embedding providers.
+
+    Embeddings are returned as contiguous float32 arrays: (n, d) for batches,
+    (d,) for a single query.
+    """
     
     @abstractmethod
-    async def embed_documents(self, documents: List[str], **kwargs) -> List[List[float]]:
+    async def embed_documents(self, documents: List[str], **kwargs) -> np.ndarray:
         pass
     
     @abstractmethod
-    async def embed_query(self, query: str, **kwargs) -> List[float]:
+    async def embed_query(self, query: str, **kwargs) -> np.ndarray:
         pass
 
+    async def embed_queries(self, queries: List[str], **kwargs) -> np.ndarray:
+        """Embed several queries; providers override this with a single batched request"""
+        return as_float32(await asyncio.gather(*[self.embed_query(query, **kwargs) for query in queries]))
+
 class OpenAIProvider(EmbeddingProvider):
     """OpenAI embedding provider implementation"""
     
     def __init__(self, model: str = "text-embedding-3-small", dimensions: int = 1024, batch_size: int = 10, **kwargs):
+        if OpenAIEmbeddings is None:
+            raise ImportError("langchain-openai package is required for the openai embedding provider")
         self.model = model
         self.dimensions = dimensions
         self.batch_size = batch_size
+        # Requests are sized by the batcher; keep langchain from splitting them again
+        kwargs.setdefault("chunk_size", 2048)
         self.embeddings = OpenAIEmbeddings(model=model, dimensions=dimensions, **kwargs)
+        self.batcher = get_batcher(
+            "openai", model,
+            max_tokens_per_request=300_000, max_inputs_per_request=2048, max_tokens_per_input=8191,
+        )
     
-    async def embed_documents(self, documents: List[str], **kwargs) -> List[List[float]]:
-        return await self.embeddings.aembed_documents(documents)
+    async def embed_documents(self, documents: List[str], **kwargs) -> np.ndarray:
+        return await self.batcher.run(documents, self.embeddings.aembed_documents)
     
-    async def embed_query(self, query: str, **kwargs) -> List[float]:
-        return await self.embeddings.aembed_query(query)
+    async def embed_query(self, query: str, **kwargs) -> np.ndarray:
+        return as_float32(await self.embeddings.aembed_query(query))
+
+    async def embed_queries(self, queries: List[str], **kwargs) -> np.ndarray:
+        # OpenAI embeds queries and documents identically; the batcher keeps requests within limits
+        return await self.batcher.run(queries, self.embeddings.aembed_documents)
 
 class GoogleProvider(EmbeddingProvider):
     """Google embedding provider implementation"""
 
     def __init__(self, model: str = "gemini-embedding-001", dimensions: int = 1024, batch_size: int = 10, **kwargs):
+        if genai is None:
+            raise ImportError("google-genai package is required for the google embedding provider")
         self.model = model
         self.dimensions = dimensions
         self.batch_size = batch_size
@@ -59,43 +98,41 @@ class GoogleProvider(EmbeddingProvider):
                 credentials=self.credentials
             )
 
+        if self.model == "gemini-embedding-001":
+            self.batcher = get_batcher(
+                "google", model,
+                max_tokens_per_request=2048, max_inputs_per_request=1, max_tokens_per_input=2048,
+                initial_concurrency=batch_size,
+            )
+        else:
+            self.batcher = get_batcher(
+                "google", model,
+                max_tokens_per_request=20_000, max_inputs_per_request=250, max_tokens_per_input=2048,
+            )
+
+
+    async def _embed_batch(self, documents: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> np.ndarray:
+        response = await self.client.aio.models.embed_content(
+            model=self.model,
+            # gemini-embedding-001 accepts a single input per request
+            contents=documents[0] if self.model == "gemini-embedding-001" else documents,
+            config=EmbedContentConfig(
+                task_type=task_type,
+                output_dimensionality=self.dimensions,  
+            )
+        )
+        return as_float32([emd.values for emd in response.embeddings])
 
     async def embed_documents(
             self, 
             documents: List[str], 
-            **kwargs) -> List[List[float]]:  
-           
-        embeddings = []
-        
-        if self.model == "gemini-embedding-001":
-            for i in range(0, len(documents), self.batch_size):
-                tasks = [self.client.aio.models.embed_content(
-                    model=self.model,
-                    contents=doc,
-                    config=EmbedContentConfig(
-                        task_type="RETRIEVAL_DOCUMENT",  
-                        output_dimensionality=self.dimensions,  
-                    )
-                ) for doc in documents[i:i+self.batch_size]]
-                responses = await asyncio.gather(*tasks)
-                embeddings.extend([response.embeddings[0].values for response in responses])
-        else:
-            response = await self.client.aio.models.embed_content(
-                model=self.model,
-                contents=documents,
-                config=EmbedContentConfig(
-                    task_type="RETRIEVAL_DOCUMENT",  
-                    output_dimensionality=self.dimensions,  
-                )
-            )
-            for emd in response.embeddings:
-                embeddings.append(emd.values)
-        return embeddings
+            **kwargs) -> np.ndarray:  
+        return await self.batcher.run(documents, self._embed_batch)
     
     async def embed_query(
             self, 
             query: str, 
-            **kwargs) -> List[float]:
+            **kwargs) -> np.ndarray:
         response = await self.client.aio.models.embed_content(
             model=self.model,
             contents=query,
@@ -104,7 +141,84 @@ class GoogleProvider(EmbeddingProvider):
                 output_dimensionality=self.dimensions,    
             )
         )
-        return response.embeddings[0].values
+        return as_float32(response.embeddings[0].values)
+
+    async def embed_queries(
+            self,
+            queries: List[str],
+            **kwargs) -> np.ndarray:
+        # Same request limits as documents (one input for gemini-embedding-001, 250 otherwise)
+        return await self.batcher.run(queries, partial(self._embed_batch, task_type="RETRIEVAL_QUERY"))
+
+
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str) -> np.ndarray:
+    """crc32 hashes of a token and its boundary-marked character trigrams"""
+    marked = f"#{token}#"
+    features = [zlib.crc32(token.encode())]
+    features.extend(zlib.crc32(marked[i:i + 3].encode()) for i in range(len(marked) - 2))
+    return np.array(features, dtype=np.uint64)
+
+
+class LocalHashProvider(EmbeddingProvider):
+    """Deterministic offline embeddings from hashed word and n-gram features.
+
+    Texts sharing words or word fragments get similar vectors, which is
+    enough to load-test ingestion and retrieval without network access. The
+    hashing trick maps word unigrams (weight 1), word bigrams (0.5) and
+    character trigrams (0.25 each) onto ``dimensions`` signed buckets; vectors
+    are L2-normalized. Not a substitute for a real model's retrieval quality.
+    """
+
+    def __init__(self, model: str = "local-hash", dimensions: int = 1024, batch_size: int = 10, **kwargs):
+        if not model.startswith("local"):
+            raise ValueError(f"Model '{model}' is not a local embedding model (use e.g. 'local-hash')")
+        self.model = model
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    def _embed(self, text: str) -> np.ndarray:
+        tokens = _WORD.findall(text.lower())
+        vector = np.zeros(self.dimensions, dtype=np.float64)
+        if tokens:
+            per_token = [_token_features(token) for token in tokens]
+            words = np.array([features[0] for features in per_token], dtype=np.uint64)
+            grams = np.concatenate([features[1:] for features in per_token])
+            bigrams = (words[:-1] * np.uint64(1000003)) ^ words[1:]
+            hashes = np.concatenate([words, bigrams, grams])
+            weights = np.concatenate([
+                np.ones(len(words)), np.full(len(bigrams), 0.5), np.full(len(grams), 0.25)
+            ])
+            # Bucket from the low bits, sign from a multiplicative remix of the hash
+            signs = np.where((hashes * np.uint64(2654435761)) & np.uint64(1 << 31), -1.0, 1.0)
+            vector = np.bincount(
+                (hashes % np.uint64(self.dimensions)).astype(np.int64),
+                weights=weights * signs,
+                minlength=self.dimensions,
+            )
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def _embed_many(self, texts: List[str]) -> np.ndarray:
+        matrix = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self._embed(text)
+        return matrix
+
+    async def embed_documents(self, documents: List[str], **kwargs) -> np.ndarray:
+        # CPU-bound; keep large batches off the event loop
+        if len(documents) > self.batch_size:
+            return await asyncio.to_thread(self._embed_many, documents)
+        return self._embed_many(documents)
+
+    async def embed_query(self, query: str, **kwargs) -> np.ndarray:
+        return self._embed(query)
+
+    async def embed_queries(self, queries: List[str], **kwargs) -> np.ndarray:
+        return await self.embed_documents(queries)
 
 
 class EmbeddingsService:
@@ -113,36 +227,95 @@ class EmbeddingsService:
     # Provider mapping for easy extension
     PROVIDERS = {
         "openai": OpenAIProvider,
-        "google": GoogleProvider
+        "google": GoogleProvider,
+        "local": LocalHashProvider,
+    }
+
+    DEFAULT_MODELS = {
+        "openai": "text-embedding-3-small",
+        "google": "gemini-embedding-001",
+        "local": "local-hash",
     }
     
     def __init__(self, provider: str = "openai", model: str = None, dimensions: int = 1024, batch_size: int = 10, **kwargs):
         self.provider_name = provider
-        self.dimensions = dimensions
+        # Env-configured callers may pass the dimension as a string
+        self.dimensions = dimensions = int(dimensions)
+        self.cache = get_embedding_cache()
+        self.query_cache = get_query_embedding_cache()
         
         # Set default models if not provided
         if not model:
-            model = "text-embedding-3-small" if provider == "openai" else "gemini-embedding-001"
+            model = self.DEFAULT_MODELS.get(provider)
         
         # Initialize the appropriate provider
         provider_class = self.PROVIDERS.get(provider)
         if not provider_class:
             raise ValueError(f"Provider '{provider}' not supported. Available: {list(self.PROVIDERS.keys())}")
         
-        self.provider = provider_class(model=model, dimensions=dimensions, batch_size=batch_size, **kwargs)
+        self.model = model
+        # Providers (SDK clients, credentials, HTTP pools) are shared process-wide
+        self.provider = get_provider(
+            ("embedding", provider, model, dimensions, batch_size, kwargs),
+            lambda: provider_class(model=model, dimensions=dimensions, batch_size=batch_size, **kwargs),
+        )
     
-    async def embed_documents(self, documents: List[str], **kwargs) -> List[List[float]]:
-        """Generate embeddings for a list of documents"""
+    async def embed_documents(self, documents: List[str], **kwargs) -> np.ndarray:
+        """Embed documents into a float32 (n, d) matrix; only texts missing from the cache hit the provider"""
         if not documents:
-            return []
-        return await self.provider.embed_documents(documents, **kwargs)
+            return np.empty((0, self.dimensions), dtype=np.float32)
+        if self.cache is None:
+            return await self.provider.embed_documents(documents, **kwargs)
+
+        cached = await asyncio.to_thread(self.cache.get_many, self.model, self.dimensions, documents)
+        missing = list(dict.fromkeys(doc for doc, embedding in zip(documents, cached) if embedding is None))
+        if not missing:
+            return np.stack(cached)
+
+        fresh = await self.provider.embed_documents(missing, **kwargs)
+        await asyncio.to_thread(self.cache.put_many, self.model, self.dimensions, missing, fresh)
+        if len(missing) == len(documents):
+            return fresh
+        row_of = {doc: row for row, doc in enumerate(missing)}
+        embeddings = np.empty((len(documents), fresh.shape[1]), dtype=np.float32)
+        for row, (doc, embedding) in enumerate(zip(documents, cached)):
+            embeddings[row] = fresh[row_of[doc]] if embedding is None else embedding
+        return embeddings
     
-    async def embed_query(self, query: str, **kwargs) -> List[float]:
+    async def embed_query(self, query: str, **kwargs) -> np.ndarray:
 
-        """Generate embedding for a single query"""
+        """Generate a float32 embedding for a single query"""
         if not query:
             raise ValueError("Query cannot be empty")
-        return await self.provider.embed_query(query, **kwargs)
+        if self.query_cache is None:
+            return await self.provider.embed_query(query, **kwargs)
+        return await self.query_cache.get_or_embed(
+            self._query_key(query), lambda: self.provider.embed_query(query, **kwargs)
+        )
+
+    async def embed_queries(self, queries: List[str], **kwargs) -> np.ndarray:
+        """Generate a float32 (n, d) matrix for many queries in one provider batch, aligned to the input"""
+        if not queries:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+        if not all(queries):
+            raise ValueError("Query cannot be empty")
+        if self.query_cache is None:
+            return await self.provider.embed_queries(queries, **kwargs)
+
+        cached = [self.query_cache.get(self._query_key(query)) for query in queries]
+        missing = list(dict.fromkeys(query for query, embedding in zip(queries, cached) if embedding is None))
+        by_query = {}
+        if missing:
+            self.query_cache.misses += len(missing)
+            fresh = await self.provider.embed_queries(missing, **kwargs)
+            by_query = {
+                query: self.query_cache.put(self._query_key(query), embedding)
+                for query, embedding in zip(missing, fresh)
+            }
+        return np.stack([by_query[query] if embedding is None else embedding for query, embedding in zip(queries, cached)])
+
+    def _query_key(self, query: str):
+        return (self.provider_name, self.model, self.dimensions, query)
     
     @classmethod
     def get_supported_providers(cls) -> List[str]:
@@ -154,6 +327,9 @@ class EmbeddingsService:
         return {
             "provider": self.provider_name,
             "dimensions": self.dimensions,
-            "provider_class": type(self.provider).__name__
+            "provider_class": type(self.provider).__name__,
+            "cache": self.cache.get_stats() if self.cache else None,
+            "query_cache": self.query_cache.get_stats() if self.query_cache else None,
+            "batching": self.provider.batcher.get_stats() if hasattr(self.provider, "batcher") else None,
         }
     
\ No newline at end of file
@@ -6,6 +6,7 @@ from app.models.curated_qa_models import LLMCuratedQAs
 from typing import List, Dict, Optional, Tuple
 from app.services.prompts import CURATED_QA_PROMPT
 from app.services.vectorization_service import VectorizationService, PageChunk
+from app.services.chunking_pool import chunk_markdown
 from app.services.websocket_manager import ws_manager
 import asyncio
 from uuid import uuid4
@@ -91,7 +92,7 @@ class CuratedQAExtractor:
                 return [], 0
             
             # Chunk the document for processing
-            chunks = self.vectorization_service.hybrid_chunk_markdown_with_pages(file.get("markdown", {}))
+            chunks = await chunk_markdown(file.get("markdown", {}), "hybrid_chunk_markdown_with_pages")
             total_chunks = len(chunks)
             
             if total_chunks == 0:
@@ -234,7 +235,7 @@ class CuratedQAExtractor:
             file = files[0]
             
             # Check if file needs processing first
-            if file.get("status") != FileStatus.PARSED.value:
+            if file.get("status") not in (FileStatus.PARSED.value, FileStatus.VECTORIZED.value):
                 print(f"File {file_id} is not parsed, processing...")
                 # data = {file.get("id"): {"status": FileStatus.PROCESSING.value, "progress": 0}}
                 await process_files(
@@ -1,14 +1,16 @@
 import asyncio
 import traceback
-import pandas as pd
 import re
 from uuid import uuid4
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Union
 
 from app.config.firebase import firebase_manager
-from app.config.mistral import mistral_client
-from app.services.vectorization_service import VectorizationService
+from app.services.vectorization_service import PageChunk, VectorizationService
+from app.services.chunking_pool import iter_chunked_files
+from app.services.embed_pipeline import CHUNKED_FILES_QUEUE_DEPTH, VECTORIZE_FILES_IN_FLIGHT
+from app.services.markdown_structure import parse_markdown
 from app.config.llm_factory import LLMModel
+from app.services.file.ocr_providers.factory import OCRProviderFactory
 from app.services.file.image import extract_context_around_image_id, convert_image_to_structured_output, maybe_compress_base64_image
 from app.models.files_models import TextContent, TableContent, ImageContent, BoundingBox
 from app.models.images_models import ChartContent
@@ -59,72 +61,39 @@ def extract_tables_from_markdown(markdown: str, table_index: int = 0) -> Tuple[s
     """Extract tables and return modified markdown with table reference tags and list of table data."""
     markdown = markdown.replace('\r\n', '\n')
     markdown = _clean_latex_math(markdown)
-    table_pattern = re.compile(
-        r"""(
-            (?:^\|.*\|\s*\n)+
-            ^\|(?:\s*:?-+:?\s*\|)+\s*\n
-            (?:^\|.*\|\s*\n?)*
-        )""",
-        re.MULTILINE | re.VERBOSE
-    )
 
     extracted_tables = []
-    # table_index = 0
-    modified_markdown = markdown
-    offset = 0  # tracks character offset from prior replacements
-
-    for match in table_pattern.finditer(markdown):
-        table_markdown = match.group(0)
-        start, end = match.span()
-        start += offset
-        end += offset
-
-        lines = table_markdown.strip().splitlines()
-        lines = [line for line in lines if not re.match(r'^\|\s*:?-+:?\s*\|', line)]
-        rows = [re.split(r'\s*\|\s*', line.strip('|')) for line in lines]
-        rows = [[cell.strip() for cell in row] for row in rows]
+    parts = []
+    position = 0
 
+    for table in parse_markdown(markdown).tables:
+        rows = table.rows
         if not rows:
             continue
 
         header = [col if col else f"{_EMPTY_COLUMN_PREFIX}{i}" for i, col in enumerate(rows[0])]
-        data_rows = rows[1:]
-
         normalized_rows = [
             row + [''] * (len(header) - len(row)) if len(row) < len(header) else row[:len(header)]
-            for row in data_rows
+            for row in rows[1:]
         ]
+        table_id = f"{_TABLE_REFERENCE_PREFIX}{table_index}"
+
+        extracted_tables.append({
+            "columns": [
+                    {"key": col, "label": "" if col.startswith(_EMPTY_COLUMN_PREFIX) else col}
+                    for col in header
+                ],
+            "fields": [dict(zip(header, row)) for row in normalized_rows]
+        })
 
-        try:
-            df = pd.DataFrame(normalized_rows, columns=header)
-            table_id = f"{_TABLE_REFERENCE_PREFIX}{table_index}"
-
-            extracted_tables.append({
-                # "table_id": table_id,
-                # "table_markdown": table_markdown,
-                "columns": [
-                        {"key": col, "label": "" if col.startswith(_EMPTY_COLUMN_PREFIX) else col}
-                        for col in df.columns
-                    ],
-                "fields": df.to_dict(orient='records')
-            })
-
-            # Inject a reference tag after the table
-            replacement = f"<!--TABLE_REFERENCE: {table_id}-->\n{table_markdown.strip()}\n"
-            modified_markdown = (
-                modified_markdown[:start]
-                + replacement
-                + modified_markdown[end:]
-            )
-
-            offset += len(replacement) - (end - start)
-            table_index += 1
-
-        except Exception:
-            traceback.print_exc()
-            continue
+        # Inject a reference tag after the table
+        parts.append(markdown[position:table.start])
+        parts.append(f"<!--TABLE_REFERENCE: {table_id}-->\n{markdown[table.start:table.end].strip()}\n")
+        position = table.end
+        table_index += 1
 
-    return modified_markdown, extracted_tables
+    parts.append(markdown[position:])
+    return "".join(parts), extracted_tables
 
 def process_batch_pages(pages: List, file_id: str, llm_model: LLMModel = LLMModel.GEMINI_2_FLASH):
     """Process a batch of pages and extract text, tables, and images."""
@@ -294,49 +263,42 @@ async def process_single_file(
         data: dict = None
         ):
     """Process a single file using the specified OCR provider."""
+    done_pages, num_pages = 0, 0
     try:
-        response = await mistral_client.ocr.process_async(
-            model="mistral-ocr-latest",
-            document={
-                "type": "document_url", 
-                "document_url": file_url
-                },
-            include_image_base64=True
-        )
-
-        pages = response.pages
-        num_pages = len(pages)
-        
-        for i in range(0, num_pages, batch_size):
-            try:
-                batch_pages = pages[i:i + batch_size]
-                batch_results = process_batch_pages(batch_pages, file_id, llm_model_for_images)
-
-                if analyze_image and batch_results["image_tasks"]:
-                    try:
-                        analyzed_images = await asyncio.gather(*batch_results["image_tasks"], return_exceptions=True)
-                        for img, result in zip(batch_results["images"], analyzed_images):
-                            if isinstance(result, Exception):
-                                print(f"Image analysis failed: {result}")
-                                continue
-                            if result and result.image_summary:
-                                img.markdown = result.image_summary
-                                img.structured_output = result.image_data.model_dump()
-                                enrich_markdown_with_image(img, batch_results["text"])
-                    except Exception:
-                        traceback.print_exc()
-
-                await build_bulk_operations(batch_results["text"], batch_results["tables"], batch_results["images"])
-                await update_progress(file_id, round((min(i+batch_size, num_pages)/ num_pages)*100,2), FileStatus.PROCESSING, channel_id, data)
-            except Exception as e:
-                traceback.print_exc()
-                print(f"Error processing file {file_id} in batch {i}: {e}")
+        # Born-digital pages come from the PDF text layer; the rest are OCR'd
+        # in concurrent page shards, each processed as soon as it arrives
+        async for pages, num_pages in OCRProviderFactory.get_default_provider().iter_pages(file_url):
+            for i in range(0, len(pages), batch_size):
+                try:
+                    batch_pages = pages[i:i + batch_size]
+                    batch_results = process_batch_pages(batch_pages, file_id, llm_model_for_images)
+
+                    if analyze_image and batch_results["image_tasks"]:
+                        try:
+                            analyzed_images = await asyncio.gather(*batch_results["image_tasks"], return_exceptions=True)
+                            for img, result in zip(batch_results["images"], analyzed_images):
+                                if isinstance(result, Exception):
+                                    print(f"Image analysis failed: {result}")
+                                    continue
+                                if result and result.image_summary:
+                                    img.markdown = result.image_summary
+                                    img.structured_output = result.image_data.model_dump()
+                                    enrich_markdown_with_image(img, batch_results["text"])
+                        except Exception:
+                            traceback.print_exc()
+
+                    await build_bulk_operations(batch_results["text"], batch_results["tables"], batch_results["images"])
+                except Exception as e:
+                    traceback.print_exc()
+                    print(f"Error processing file {file_id} in batch starting at page {batch_pages[0].index + 1}: {e}")
+                done_pages += len(batch_pages)
+                await update_progress(file_id, round(min(done_pages, num_pages) / num_pages * 100, 2), FileStatus.PROCESSING, channel_id, data)
 
         await update_progress(file_id, 100, FileStatus.PARSED, channel_id, data)
         return file_id
     except Exception as e:
         traceback.print_exc()
-        await update_progress(file_id, round((min(i+batch_size, num_pages)/ num_pages)*100,2), FileStatus.FAILED, channel_id, data)
+        await update_progress(file_id, round(min(done_pages, num_pages) / num_pages * 100, 2) if num_pages else 0, FileStatus.FAILED, channel_id, data)
         raise Exception(f"Error processing file {file_id}: {e}")
 
         
@@ -368,13 +330,15 @@ async def enrich_files_with_markdown(files_ids):
 async def vectorize_files_batch(files_ids: List[str]):
     """Vectorize a batch of files."""
     if not files_ids:
-        return 
+        return {"success": True, "vectorized": []}
     
     vectorization_service = VectorizationService()      
-    async def _vectorize_file(file: dict):
+    vectorized = []
+
+    async def _vectorize_file(file: dict, chunks: Union[List[PageChunk], Exception]):
         try:
-           
-            markdown = file.get("markdown")
+            if isinstance(chunks, Exception):
+                raise chunks
             metadata = {
                 "file_id": file.get("id", ""),
                 "dossier_id": file.get("dossier_id", ""),
@@ -385,19 +349,39 @@ async def vectorize_files_batch(files_ids: List[str]):
                 "type": file.get("type", "")
             }
 
-            if markdown:
-                chunks = vectorization_service.hybrid_chunk_markdown_with_headers(markdown, max_tokens=500, add_image_metadata=True, add_table_metadata=True)
-                await vectorization_service.embed_and_upload(
-                    chunks=chunks, metadata=metadata, batch_size=50
-                )
+            counts = await vectorization_service.sync_file_vectors(
+                file.get("id", ""), chunks, metadata=metadata, batch_size=50
+            )
+            print(f"Vectorized file {file.get('name')}: {counts}")
+            # sync_file_vectors returns once the file's vectors are written
+            await firebase_manager.update_document(
+                file_collection, file.get("id"), {"status": FileStatus.VECTORIZED.value, "progress": 100}
+            )
+            vectorized.append(file.get("id"))
         except Exception as e:
             traceback.print_exc()
             print(f"Error vectorizing file {file.get('name')}: {e}")
     
     files = await enrich_files_with_markdown(files_ids)
     print(f"Vectorizing files: {files_ids}")
-    await asyncio.gather(*(_vectorize_file(file) for file in files))    
-    return {"success": True}
+    # Chunk in worker processes and start embedding each file as its chunks
+    # arrive; while every embedding slot is taken, chunking waits too
+    slots = asyncio.Semaphore(VECTORIZE_FILES_IN_FLIGHT)
+
+    async def _vectorize_in_slot(file: dict, chunks: Union[List[PageChunk], Exception]):
+        try:
+            await _vectorize_file(file, chunks)
+        finally:
+            slots.release()
+
+    tasks = []
+    async for file, chunks in iter_chunked_files(
+        files, max_pending=CHUNKED_FILES_QUEUE_DEPTH, max_tokens=500, add_image_metadata=True, add_table_metadata=True
+    ):
+        await slots.acquire()
+        tasks.append(asyncio.create_task(_vectorize_in_slot(file, chunks)))
+    await asyncio.gather(*tasks)
+    return {"success": True, "vectorized": vectorized}
 
 async def process_files(
         file_ids: List[str], 
@@ -437,18 +421,21 @@ async def process_files(
                 else:
                     processed_files.append(result)
                     
-            if vectorize:
-                await vectorize_files_batch(processed_files)
+            vectorized = set()
+            if vectorize and processed_files:
+                vectorized.update((await vectorize_files_batch(processed_files))["vectorized"])
 
+            # Vectorized files were already marked as such
             ops =  [
                 {
                     "type": "update",
                     "collection": file_collection,
                     "document_id": file,
                     "data": {"status": FileStatus.PARSED.value, "progress": 100}
-                } for file in processed_files
+                } for file in processed_files if file not in vectorized
             ]
-            await firebase_manager.batch_operation(ops)
+            if ops:
+                await firebase_manager.batch_operation(ops)
         return file_ids
     except Exception:
         traceback.print_exc()
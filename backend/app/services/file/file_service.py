@@ -12,7 +12,9 @@ from uuid import uuid4
 
 import traceback
 from app.models.models import Collections, File, FileStatus
-from app.services.vectorization_service import VectorizationService
+from app.services.vectorization_service import PageChunk, VectorizationService
+from app.services.chunking_pool import iter_chunked_files
+from app.services.embed_pipeline import CHUNKED_FILES_QUEUE_DEPTH, VECTORIZE_FILES_IN_FLIGHT
 from app.services.file.mistral_ocr import ocr_mistral_batch
 
 from app.services.websocket_manager import ws_manager
@@ -124,11 +126,16 @@ async def create_project_files(
 
 async def vectorize_files_batch(files_ids: List[str]):
     vectorization_service = VectorizationService()
-    async def _vectorize_file(file: dict):
+    # Embed at most VECTORIZE_FILES_IN_FLIGHT files at a time; while every
+    # slot is taken, chunking waits too
+    slots = asyncio.Semaphore(VECTORIZE_FILES_IN_FLIGHT)
+
+    async def _vectorize_file(file: dict, chunks: Union[List[PageChunk], Exception]):
         
         try:
+            if isinstance(chunks, Exception):
+                raise chunks
             print(f"Start vectorizing file name:  {file.get('name')}")
-            markdown = file.get("markdown")
             metadata = {
                 "file_id": file.get("id", ""),
                 "dossier_id": file.get("dossier_id", ""),
@@ -136,22 +143,30 @@ async def vectorize_files_batch(files_ids: List[str]):
                 "user_id": file.get("user_id", ""),
             }
 
-            if markdown:
-                chunks = vectorization_service.hybrid_chunk_markdown_with_headers(markdown, max_tokens=500)
-                await vectorization_service.embed_and_upload(
-                    chunks=chunks, metadata=metadata, batch_size=50
-                )
+            counts = await vectorization_service.sync_file_vectors(
+                file.get("id", ""), chunks, metadata=metadata, batch_size=50
+            )
+            print(f"Vectorized file {file.get('name')}: {counts}")
+            # sync_file_vectors returns once the file's vectors are written
+            await firebase_manager.update_document(
+                file_collection, file.get("id"), {"status": FileStatus.VECTORIZED.value, "progress": 100}
+            )
         except Exception as e:
             traceback.print_exc()
             print(f"Error vectorizing file {file.get('name')}: {e}")
+        finally:
+            slots.release()
 
     files = await firebase_manager.get_documents(file_collection, files_ids)
 
     print(f"Vectorizing files: {files_ids}")
     
-    # Process files in batches of 10
-    for batch in [files[i:i+10] for i in range(0, len(files), 10)]:
-        await asyncio.gather(*(_vectorize_file(file) for file in batch))
+    # Chunk in worker processes and start embedding each file as its chunks arrive
+    tasks = []
+    async for file, chunks in iter_chunked_files(files, max_pending=CHUNKED_FILES_QUEUE_DEPTH, max_tokens=500):
+        await slots.acquire()
+        tasks.append(asyncio.create_task(_vectorize_file(file, chunks)))
+    await asyncio.gather(*tasks)
     
     return {"success": True}
 
@@ -368,19 +383,16 @@ async def delete_files(
         return {"error": str(e)}
     
 async def delete_files_metadata(file_ids: List[str]):
+    # Vectors are kept: vectorize_files_batch diffs the reprocessed chunks
+    # against them and only re-embeds what changed
     try:
-        vectorization_service = VectorizationService()
-
         data_deletions = [{
             "type": "delete",
             "collection": file_data_collection,
             "document_id": id,
         } for id in file_ids]
         
-        await asyncio.gather(
-            firebase_manager.batch_operation(data_deletions),
-            vectorization_service.delete_data(filters={"file_id": file_ids})
-        )
+        await firebase_manager.batch_operation(data_deletions)
 
         return {"success": True}
     except Exception as e:
@@ -42,6 +42,29 @@ def parse_mistral_response(
     }
 
 
+async def ocr_mistral_document(
+    document: Dict[str, any],
+    ocr_model: str = "mistral-ocr-latest",
+    include_image_base64: bool = True
+):
+    """
+    Run Mistral OCR on one document (a URL or an inline PDF shard).
+
+    Args:
+        document: Mistral document, e.g. {"type": "document_url", "document_url": ...}
+        ocr_model: OCR model to use
+        include_image_base64: Whether to return the page images
+
+    Returns:
+        Raw Mistral OCR response
+    """
+    return await mistral_client.ocr.process_async(
+        model=ocr_model,
+        document=document,
+        include_image_base64=include_image_base64
+    )
+
+
 async def ocr_mistral_single_file(
     file: Dict[str, any],
     ocr_model: str = "mistral-ocr-latest",
@@ -1,6 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
-from app.models.models import FileStatus
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 
 class OCRProvider(ABC):
     """Base class for OCR providers"""
@@ -25,6 +24,15 @@ class OCRProvider(ABC):
         """Process multiple files in batch and return the results"""
         pass
     
+    @abstractmethod
+    def iter_pages(self, file_url: str) -> AsyncIterator[Tuple[List[Any], int]]:
+        """Yield (pages, total pages) as pages become available.
+
+        Pages carry .index (0-based, document-wide), .markdown, .images and
+        .dimensions like Mistral OCR pages.
+        """
+        pass
+    
     @abstractmethod
     def parse_response(
         self,
@@ -1,12 +1,15 @@
 from typing import Dict, Type
 from .base import OCRProvider
 from .mistral import MistralOCRProvider
+from .local import LocalTextLayerOCRProvider
+from app.services.file.text_layer import OCR_TEXT_LAYER_ENABLED
 
 class OCRProviderFactory:
     """Factory class for creating OCR providers"""
     
     _providers: Dict[str, Type[OCRProvider]] = {
         "mistral": MistralOCRProvider,
+        "local": LocalTextLayerOCRProvider,
         # Add more providers here as they are implemented
     }
     
@@ -31,6 +34,22 @@ class OCRProviderFactory:
         
         return provider_class(**kwargs)
     
+    @classmethod
+    def get_default_provider(cls, **kwargs) -> OCRProvider:
+        """
+        Get the provider used for file ingestion
+        
+        The local text-layer provider (which sends scanned and low-quality
+        pages to Mistral) unless OCR_TEXT_LAYER_ENABLED is off
+        
+        Args:
+            **kwargs: Additional arguments to pass to the provider constructor
+            
+        Returns:
+            An instance of the default OCR provider
+        """
+        return cls.get_provider("local" if OCR_TEXT_LAYER_ENABLED else "mistral", **kwargs)
+    
     @classmethod
     def register_provider(cls, name: str, provider_class: Type[OCRProvider]):
         """
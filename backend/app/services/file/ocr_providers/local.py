@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.models.models import FileStatus
+from app.services.file.ocr_shards import Fetch, OCRCall, fetch_document
+from app.services.file.text_layer import iter_text_layer_pages
+from app.services.websocket_manager import ws_manager
+from .base import OCRProvider
+from .mistral import MistralOCRProvider
+
+
+class LocalTextLayerOCRProvider(OCRProvider):
+    """Reads born-digital pages from the PDF text layer and OCRs only the rest"""
+
+    def __init__(self, ocr: Optional[OCRCall] = None, fetch: Fetch = fetch_document):
+        self.ocr = ocr or MistralOCRProvider().ocr_document
+        self.fetch = fetch
+
+    async def iter_pages(self, file_url: str) -> AsyncIterator[Tuple[List[Any], int]]:
+        """Text-layer pages first (while the OCR shards run), then OCR'd pages as they finish"""
+        async for pages, total in iter_text_layer_pages(file_url, self.ocr, fetch=self.fetch):
+            yield pages, total
+
+    async def process_single_file(
+        self,
+        file: Dict[str, Any],
+        channel_id: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Read a file's pages (text layer or OCR) into the provider response format"""
+        try:
+            pages = []
+            async for batch, _ in self.iter_pages(file["url"]):
+                pages.extend(batch)
+
+            document = self.parse_response(
+                raw=SimpleNamespace(pages=sorted(pages, key=lambda page: page.index)),
+                file_id=file.get("id"),
+                dossier_id=file.get("dossier_id", ""),
+                project_id=file.get("project_id", "")
+            )
+
+            if channel_id and data:
+                file_id = file.get("id")
+                if file_id in data:
+                    data[file_id].update({
+                        "progress": 100,
+                        "status": FileStatus.PARSED.value
+                    })
+                    await ws_manager.send(
+                        channel_id=channel_id,
+                        event="files_processing_progress",
+                        data=data
+                    )
+
+            return document
+        except Exception as e:
+            print(f"Error processing file {file.get('id')}: {str(e)}")
+            raise
+
+    async def process_batch(
+        self,
+        files: List[Dict[str, Any]],
+        channel_id: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Process multiple files in parallel"""
+        return await asyncio.gather(*[
+            self.process_single_file(file, channel_id=channel_id, data=data)
+            for file in files
+        ])
+
+    def parse_response(
+        self,
+        raw: Any,
+        file_id: str,
+        dossier_id: str,
+        project_id: str,
+        provider: str = "local"
+    ) -> Dict[str, Any]:
+        """Pages (text layer and OCR) in the same structure as the Mistral provider"""
+        return {
+            "id": file_id,
+            "dossier_id": dossier_id,
+            "project_id": project_id,
+            "status": FileStatus.PARSED.value,
+            "progress": 100,
+            "provider": provider,
+            "markdown": {f"page_{page.index + 1}": page.markdown for page in raw.pages}
+        }
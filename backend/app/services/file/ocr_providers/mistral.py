@@ -1,8 +1,10 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple
 import asyncio
 from app.config.mistral import mistral_client
 from app.models.models import FileStatus
 from app.services.websocket_manager import ws_manager
+from app.services.file.mistral_ocr import ocr_mistral_document
+from app.services.file.ocr_shards import iter_ocr_pages
 from .base import OCRProvider
 
 class MistralOCRProvider(OCRProvider):
@@ -11,6 +13,15 @@ class MistralOCRProvider(OCRProvider):
     def __init__(self, ocr_model: str = "mistral-ocr-latest"):
         self.ocr_model = ocr_model
     
+    async def ocr_document(self, document: Dict[str, Any]) -> Any:
+        """OCR one document (URL or inline PDF shard), page images included"""
+        return await ocr_mistral_document(document, ocr_model=self.ocr_model)
+    
+    async def iter_pages(self, file_url: str) -> AsyncIterator[Tuple[List[Any], int]]:
+        """OCR the file, in concurrent page shards when it is a large PDF"""
+        async for pages, total in iter_ocr_pages(file_url, self.ocr_document):
+            yield pages, total
+    
     def parse_response(
         self,
         raw: Any,
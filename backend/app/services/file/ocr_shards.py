@@ -0,0 +1,169 @@
+"""
+Page-sharded OCR for large PDFs
+
+process_single_file used to send the whole document in one OCR request and
+wait for every page before any page was processed. PDFs of at least
+OCR_SHARD_MIN_PAGES pages are now split locally (pymupdf) into shards of
+OCR_SHARD_PAGES pages, the shards are OCR'd concurrently and
+iter_ocr_pages yields each shard's pages as soon as it finishes, with page
+indexes relative to the whole document. At most OCR_CONCURRENCY requests
+are in flight per process, across all files.
+
+Smaller PDFs, other file types and files that cannot be downloaded go in
+one request by URL, as before; URLs naming a non-PDF file are not
+downloaded at all. The OCR call is passed in (see
+mistral_ocr.ocr_mistral_document), so the pipeline can run without the
+provider.
+"""
+import asyncio
+import base64
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import httpx
+import pymupdf
+
+OCR_SHARD_PAGES = int(os.getenv("OCR_SHARD_PAGES", "20"))
+# Below this the document goes in a single request
+OCR_SHARD_MIN_PAGES = int(os.getenv("OCR_SHARD_MIN_PAGES", "40"))
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "8"))
+
+# OCR request for a Mistral-style document ({"type": "document_url", ...});
+# returns a response whose .pages carry .index
+OCRCall = Callable[[Dict[str, Any]], Awaitable[Any]]
+Fetch = Callable[[str], Awaitable[bytes]]
+
+_limit: Optional[asyncio.Semaphore] = None
+_limit_loop: Optional[asyncio.AbstractEventLoop] = None
+_stats = {"documents": 0, "sharded_documents": 0, "shards": 0, "pages": 0, "ocr_seconds": 0.0}
+
+
+def _ocr_limit() -> asyncio.Semaphore:
+    """Process-wide OCR concurrency limit for the running event loop"""
+    global _limit, _limit_loop
+    loop = asyncio.get_running_loop()
+    if _limit is None or _limit_loop is not loop:
+        _limit = asyncio.Semaphore(max(1, OCR_CONCURRENCY))
+        _limit_loop = loop
+    return _limit
+
+
+async def fetch_document(url: str) -> bytes:
+    async with httpx.AsyncClient(timeout=300, follow_redirects=True) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.content
+
+
+def may_be_pdf(url: str) -> bool:
+    """False when the URL's file name has an extension other than .pdf"""
+    name = unquote(urlparse(url).path).rsplit("/", 1)[-1]
+    return os.path.splitext(name)[1].lower() in ("", ".pdf")
+
+
+def split_pdf(
+    pdf_bytes: bytes,
+    shard_pages: int = OCR_SHARD_PAGES,
+    min_pages: int = OCR_SHARD_MIN_PAGES,
+    pages: Optional[List[int]] = None,
+) -> Tuple[int, List[Tuple[List[int], bytes]]]:
+    """Page count and (page indexes, PDF bytes) per shard.
+
+    Shards cover `pages` (every page by default); a whole document of fewer
+    than min_pages pages gets no shards.
+    """
+    with pymupdf.Document(stream=pdf_bytes, filetype="pdf") as doc:
+        if pages is None:
+            if doc.page_count < max(min_pages, 2):
+                return doc.page_count, []
+            pages = list(range(doc.page_count))
+        shards = []
+        for start in range(0, len(pages), shard_pages):
+            selected = pages[start:start + shard_pages]
+            with pymupdf.Document() as shard:
+                # One insert per run of consecutive pages keeps shared resources shared
+                run_start = 0
+                for position in range(1, len(selected) + 1):
+                    if position == len(selected) or selected[position] != selected[position - 1] + 1:
+                        shard.insert_pdf(doc, from_page=selected[run_start], to_page=selected[position - 1])
+                        run_start = position
+                shards.append((selected, shard.tobytes(garbage=1, deflate=True)))
+        return doc.page_count, shards
+
+
+def pdf_data_url(pdf_bytes: bytes) -> Dict[str, Any]:
+    return {
+        "type": "document_url",
+        "document_url": f"data:application/pdf;base64,{base64.b64encode(pdf_bytes).decode('ascii')}",
+    }
+
+
+async def _ocr(ocr: OCRCall, document: Dict[str, Any], pages: Optional[List[int]] = None) -> List[Any]:
+    async with _ocr_limit():
+        started = time.perf_counter()
+        response = await ocr(document)
+        _stats["ocr_seconds"] += time.perf_counter() - started
+    results = list(response.pages)
+    if pages is not None:
+        # Shard page i is document page pages[i]
+        for page in results:
+            page.index = pages[page.index]
+    _stats["pages"] += len(results)
+    return results
+
+
+def start_ocr_shards(ocr: OCRCall, shards: List[Tuple[List[int], bytes]]) -> List["asyncio.Task[List[Any]]"]:
+    """Start OCR of every shard (bounded by OCR_CONCURRENCY)"""
+    _stats["shards"] += len(shards)
+    return [asyncio.create_task(_ocr(ocr, pdf_data_url(shard), pages)) for pages, shard in shards]
+
+
+async def iter_completed(tasks: List["asyncio.Task[List[Any]]"]) -> AsyncIterator[List[Any]]:
+    """Pages of each shard as it finishes; the first error cancels the rest"""
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def iter_ocr_pages(
+    file_url: str,
+    ocr: OCRCall,
+    fetch: Fetch = fetch_document,
+    shard_pages: int = OCR_SHARD_PAGES,
+    min_pages: int = OCR_SHARD_MIN_PAGES,
+) -> AsyncIterator[Tuple[List[Any], int]]:
+    """Yield (pages, total pages in the document) per shard, in completion order.
+
+    Raises the first shard error after cancelling the shards still running.
+    """
+    _stats["documents"] += 1
+    shards: List[Tuple[List[int], bytes]] = []
+    try:
+        content = await fetch(file_url) if may_be_pdf(file_url) else b""
+        if content[:5] == b"%PDF-":
+            total, shards = await asyncio.to_thread(split_pdf, content, shard_pages, min_pages)
+    except Exception as e:
+        print(f"Could not shard {file_url}, sending it whole: {e}")
+
+    if not shards:
+        pages = await ocr_whole_document(ocr, file_url)
+        yield pages, len(pages)
+        return
+
+    _stats["sharded_documents"] += 1
+    async for pages in iter_completed(start_ocr_shards(ocr, shards)):
+        yield pages, total
+
+
+async def ocr_whole_document(ocr: OCRCall, file_url: str) -> List[Any]:
+    return await _ocr(ocr, {"type": "document_url", "document_url": file_url})
+
+
+def get_ocr_stats() -> Dict[str, Any]:
+    return {**_stats, "ocr_seconds": round(_stats["ocr_seconds"], 2)}
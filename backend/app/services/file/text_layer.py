@@ -0,0 +1,396 @@
+"""
+Text-layer fast path for born-digital PDFs
+
+Most RFPs are born-digital PDFs whose text layer is already exact, yet every
+page went through remote OCR. iter_text_layer_pages opens the PDF with
+pymupdf and routes each page:
+
+- blank pages (no text, images or drawings) are skipped;
+- scanned pages (no text, or mostly covered by images) and pages whose text
+  layer scores below TEXT_LAYER_MIN_QUALITY (unmapped glyphs, garbled words)
+  are sent to the OCR call, in concurrent shards holding only those pages;
+- every other page is converted to markdown locally: headings from font
+  sizes, bullets, repaired hyphenation, ruled tables rebuilt as markdown
+  tables and embedded images extracted the way Mistral returns them.
+
+Files that are not PDFs are OCR'd whole. get_text_layer_stats reports the
+pages read locally and the OCR cost saved. Used by
+ocr_providers.local.LocalTextLayerOCRProvider.
+"""
+import asyncio
+import base64
+import bisect
+import os
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import pymupdf
+
+from app.services.file.ocr_shards import (
+    OCR_SHARD_MIN_PAGES,
+    OCR_SHARD_PAGES,
+    Fetch,
+    OCRCall,
+    fetch_document,
+    iter_completed,
+    may_be_pdf,
+    ocr_whole_document,
+    split_pdf,
+    start_ocr_shards,
+)
+
+OCR_TEXT_LAYER_ENABLED = os.getenv("OCR_TEXT_LAYER_ENABLED", "true").lower() == "true"
+# Share of characters and words that must look right to trust the text layer
+TEXT_LAYER_MIN_QUALITY = float(os.getenv("TEXT_LAYER_MIN_QUALITY", "0.9"))
+# Pages at least this much covered by images are treated as scans
+SCANNED_IMAGE_COVERAGE = float(os.getenv("SCANNED_IMAGE_COVERAGE", "0.7"))
+MISTRAL_OCR_COST_PER_PAGE = float(os.getenv("MISTRAL_OCR_COST_PER_PAGE", "0.001"))  # USD
+
+# Images under this share of the page (logos, icons) are not extracted
+MIN_IMAGE_AREA = 0.02
+# Ruling lines closer than this (points) are the same line
+_LINE_SNAP = 2.0
+# More line segments than this is a vector graphic, not a table
+MAX_RULING_SEGMENTS = 2000
+# A page with no text or images but more drawings than this (outlined text,
+# vector charts) is not blank
+BLANK_MAX_DRAWINGS = 4
+
+_WORD = re.compile(r"[^\W\d_]+|\d+")
+_VOWELS = frozenset("aeiouyàáâãäåæèéêëìíîïòóôõöøœùúûüýÿ")
+_BULLET = re.compile(r"^[•·▪●◦■□➢►‣⁃–-]\s*")
+
+_stats = {"documents": 0, "pages_text_layer": 0, "pages_ocr": 0, "pages_blank": 0}
+
+
+@dataclass
+class PageDimensions:
+    dpi: int
+    height: float
+    width: float
+
+
+@dataclass
+class TextLayerImage:
+    id: str
+    top_left_x: float
+    top_left_y: float
+    bottom_right_x: float
+    bottom_right_y: float
+    image_base64: str
+
+
+@dataclass
+class TextLayerPage:
+    """Page read from the text layer, shaped like a Mistral OCR page"""
+    index: int
+    markdown: str
+    images: List[TextLayerImage] = field(default_factory=list)
+    dimensions: Optional[PageDimensions] = None
+
+
+def _plausible_word(word: str) -> bool:
+    # Acronyms (SLA, RFP) and non-Latin scripts have no vowels to check
+    if word.isdigit() or (word.isupper() and len(word) <= 6):
+        return True
+    return len(word) <= 25 and (not _VOWELS.isdisjoint(word.lower()) or max(word) > "\u024f")
+
+
+def text_quality(text: str) -> float:
+    """Share of the text that reads as real characters and words, 0-1"""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 0.0
+    broken = sum(1 for c in chars if c == "\ufffd" or unicodedata.category(c) in ("Cc", "Co", "Cn", "Cs"))
+    words = [word for word in _WORD.findall(text) if len(word) > 1]
+    if not words:
+        return 0.0
+    return min(1 - broken / len(chars), sum(map(_plausible_word, words)) / len(words))
+
+
+def classify_page(page: "pymupdf.Page") -> Tuple[str, float]:
+    """("blank" | "text" | "ocr", text-layer quality) for one page"""
+    text = page.get_text("text")
+    area = abs(page.rect) or 1.0
+    coverage = min(1.0, sum(abs(pymupdf.Rect(info["bbox"]) & page.rect) for info in page.get_image_info()) / area)
+    if not text.strip():
+        if coverage == 0 and len(page.get_cdrawings()) <= BLANK_MAX_DRAWINGS:
+            return "blank", 0.0
+        return "ocr", 0.0
+    quality = text_quality(text)
+    if coverage >= SCANNED_IMAGE_COVERAGE or quality < TEXT_LAYER_MIN_QUALITY:
+        return "ocr", quality
+    return "text", quality
+
+
+def classify_pages(pdf_bytes: bytes) -> List[str]:
+    with pymupdf.Document(stream=pdf_bytes, filetype="pdf") as doc:
+        return [classify_page(page)[0] for page in doc]
+
+
+def _snap(values: List[float]) -> List[float]:
+    """Sorted values with near-equal ones merged"""
+    snapped: List[float] = []
+    for value in sorted(values):
+        if not snapped or value - snapped[-1] > _LINE_SNAP:
+            snapped.append(value)
+    return snapped
+
+
+def _ruling_segments(page: "pymupdf.Page") -> Tuple[List[Tuple[float, float, float]], List[Tuple[float, float, float]]]:
+    """Horizontal (y, x0, x1) and vertical (x, y0, y1) ruling lines, from lines and rectangle edges"""
+    horizontal, vertical = set(), set()
+
+    def add(x0: float, y0: float, x1: float, y1: float) -> None:
+        if abs(y1 - y0) <= _LINE_SNAP and abs(x1 - x0) > _LINE_SNAP:
+            horizontal.add((round((y0 + y1) / 2, 1), round(min(x0, x1), 1), round(max(x0, x1), 1)))
+        elif abs(x1 - x0) <= _LINE_SNAP and abs(y1 - y0) > _LINE_SNAP:
+            vertical.add((round((x0 + x1) / 2, 1), round(min(y0, y1), 1), round(max(y0, y1), 1)))
+
+    for drawing in page.get_cdrawings():
+        for item in drawing["items"]:
+            if item[0] == "l":
+                add(*item[1], *item[2])
+            elif item[0] == "re":
+                x0, y0, x1, y1 = item[1]
+                if abs(y1 - y0) <= _LINE_SNAP or abs(x1 - x0) <= _LINE_SNAP:
+                    add(x0, y0, x1, y1)  # a rule drawn as a thin rectangle
+                else:
+                    add(x0, y0, x1, y0)
+                    add(x0, y1, x1, y1)
+                    add(x0, y0, x0, y1)
+                    add(x1, y0, x1, y1)
+    return list(horizontal), list(vertical)
+
+
+def find_ruled_tables(page: "pymupdf.Page") -> List[Tuple["pymupdf.Rect", List[List[str]]]]:
+    """(bbox, rows of cell text) for each grid of crossing ruling lines.
+
+    Crossing horizontal and vertical lines are grouped into grids; a grid
+    with at least two rows and two columns is a table and each word goes in
+    the cell holding its center. Merged cells keep their text in the first
+    sub-cell it falls in; tables without rulings are left as text.
+    """
+    horizontal, vertical = _ruling_segments(page)
+    if not horizontal or not vertical or len(horizontal) + len(vertical) > MAX_RULING_SEGMENTS:
+        return []
+
+    parent = list(range(len(horizontal) + len(vertical)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for h, (y, x0, x1) in enumerate(horizontal):
+        for v, (x, y0, y1) in enumerate(vertical):
+            if x0 - _LINE_SNAP <= x <= x1 + _LINE_SNAP and y0 - _LINE_SNAP <= y <= y1 + _LINE_SNAP:
+                parent[find(h)] = find(len(horizontal) + v)
+    grids: Dict[int, Tuple[List[float], List[float]]] = {}
+    for i in range(len(parent)):
+        ys, xs = grids.setdefault(find(i), ([], []))
+        if i < len(horizontal):
+            ys.append(horizontal[i][0])
+        else:
+            xs.append(vertical[i - len(horizontal)][0])
+
+    tables = []
+    words = None
+    for ys, xs in grids.values():
+        ys, xs = _snap(ys), _snap(xs)
+        if len(ys) < 3 or len(xs) < 3:
+            continue
+        if words is None:
+            words = page.get_text("words")
+        cells = [[[] for _ in xs[1:]] for _ in ys[1:]]
+        for x0, y0, x1, y1, word, *_ in words:
+            row = bisect.bisect(ys, (y0 + y1) / 2) - 1
+            column = bisect.bisect(xs, (x0 + x1) / 2) - 1
+            if 0 <= row < len(cells) and 0 <= column < len(cells[0]):
+                cells[row][column].append(word)
+        tables.append((
+            pymupdf.Rect(xs[0], ys[0], xs[-1], ys[-1]),
+            [[" ".join(cell).replace("|", "/") for cell in row] for row in cells],
+        ))
+    return tables
+
+
+def table_markdown(rows: List[List[str]]) -> str:
+    rows = [row for row in rows if any(row)]
+    filled = [column for column in range(max((len(row) for row in rows), default=0)) if any(row[column] for row in rows)]
+    rows = [[row[column] for column in filled] for row in rows]
+    if len(rows) < 2 or len(filled) < 2:
+        return "\n".join(" ".join(row) for row in rows)
+    lines = ["| " + " | ".join(row) + " |" for row in rows]
+    lines.insert(1, "|" + "|".join([" --- "] * len(filled)) + "|")
+    return "\n".join(lines)
+
+
+def _join(current: str, line: str) -> str:
+    if current.endswith("-") and line[:1].islower():
+        return current[:-1] + line
+    return f"{current} {line}"
+
+
+def block_markdown(block: Dict[str, Any], body_size: float) -> str:
+    """Markdown for one text block: a heading, bullet items or a paragraph"""
+    lines, spans = [], []
+    for line in block["lines"]:
+        text = "".join(span["text"] for span in line["spans"]).strip()
+        if text:
+            lines.append(text)
+            spans.extend(span for span in line["spans"] if span["text"].strip())
+    if not lines:
+        return ""
+
+    text = lines[0]
+    for line in lines[1:]:
+        text = _join(text, line)
+    size = max(span["size"] for span in spans)
+    words = len(text.split())
+    if body_size and words <= 20 and not _BULLET.match(text):
+        if size >= body_size * 1.6:
+            return f"# {text}"
+        if size >= body_size * 1.25:
+            return f"## {text}"
+        if len(lines) == 1 and words <= 12 and all(span["flags"] & pymupdf.TEXT_FONT_BOLD for span in spans):
+            return f"### {text}"
+
+    items: List[str] = []
+    for line in lines:
+        bullet = _BULLET.match(line)
+        if bullet and len(line) > bullet.end():
+            items.append("- " + line[bullet.end():])
+        elif items:
+            items[-1] = _join(items[-1], line)
+        else:
+            items.append(line)
+    return "\n".join(items)
+
+
+def _image(block: Dict[str, Any], name: str) -> Optional[TextLayerImage]:
+    data, ext = block["image"], block["ext"]
+    if ext not in ("png", "jpeg", "jpg"):
+        try:
+            pixmap = pymupdf.Pixmap(data)
+            if pixmap.n - pixmap.alpha > 3:
+                pixmap = pymupdf.Pixmap(pymupdf.csRGB, pixmap)
+            data, ext = pixmap.tobytes("png"), "png"
+        except Exception:
+            return None
+    x0, y0, x1, y1 = block["bbox"]
+    return TextLayerImage(
+        id=f"{name}.{ext}",
+        top_left_x=x0,
+        top_left_y=y0,
+        bottom_right_x=x1,
+        bottom_right_y=y1,
+        image_base64=f"data:image/{'jpeg' if ext == 'jpg' else ext};base64,{base64.b64encode(data).decode('ascii')}",
+    )
+
+
+def page_to_markdown(page: "pymupdf.Page") -> TextLayerPage:
+    """Markdown of a page from its text layer, in content-stream reading order"""
+    blocks = page.get_text("dict", flags=pymupdf.TEXTFLAGS_DICT | pymupdf.TEXT_PRESERVE_IMAGES)["blocks"]
+    area = abs(page.rect) or 1.0
+
+    tables = find_ruled_tables(page)
+
+    sizes: Counter = Counter()
+    for block in blocks:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    body_size = sizes.most_common(1)[0][0] if sizes else 0
+
+    parts, images, emitted = [], [], set()
+    for block in blocks:
+        rect = pymupdf.Rect(block["bbox"])
+        center = (rect.tl + rect.br) / 2
+        table = next((i for i, (table_rect, _) in enumerate(tables) if center in table_rect), None)
+        if table is not None:
+            if table not in emitted:
+                emitted.add(table)
+                parts.append(table_markdown(tables[table][1]))
+            continue
+        if block["type"] == 1:
+            if abs(rect & page.rect) / area < MIN_IMAGE_AREA:
+                continue
+            image = _image(block, f"img-{page.number + 1}-{len(images)}")
+            if image:
+                images.append(image)
+                parts.append(f"![{image.id}]({image.id})")
+            continue
+        text = block_markdown(block, body_size)
+        if text:
+            parts.append(text)
+    parts.extend(table_markdown(rows) for i, (_, rows) in enumerate(tables) if i not in emitted)
+
+    return TextLayerPage(
+        index=page.number,
+        markdown="\n\n".join(part for part in parts if part),
+        images=images,
+        dimensions=PageDimensions(dpi=72, height=page.rect.height, width=page.rect.width),
+    )
+
+
+def read_text_layer(pdf_bytes: bytes, pages: List[int]) -> List[TextLayerPage]:
+    with pymupdf.Document(stream=pdf_bytes, filetype="pdf") as doc:
+        return [page_to_markdown(doc[index]) for index in pages]
+
+
+async def iter_text_layer_pages(
+    file_url: str, ocr: OCRCall, fetch: Fetch = fetch_document
+) -> AsyncIterator[Tuple[List[Any], int]]:
+    """Yield (pages, total pages kept): text-layer pages first while the OCR shards run, then OCR'd pages as they finish"""
+    _stats["documents"] += 1
+    routes: List[str] = []
+    try:
+        content = await fetch(file_url) if may_be_pdf(file_url) else b""
+        if content[:5] == b"%PDF-":
+            routes = await asyncio.to_thread(classify_pages, content)
+    except Exception as e:
+        print(f"Could not read the text layer of {file_url}, sending it to OCR: {e}")
+
+    if not routes:
+        pages = await ocr_whole_document(ocr, file_url)
+        _stats["pages_ocr"] += len(pages)
+        yield pages, len(pages)
+        return
+
+    local = [index for index, route in enumerate(routes) if route == "text"]
+    remote = [index for index, route in enumerate(routes) if route == "ocr"]
+    _stats["pages_text_layer"] += len(local)
+    _stats["pages_ocr"] += len(remote)
+    _stats["pages_blank"] += len(routes) - len(local) - len(remote)
+    total = len(local) + len(remote)
+
+    tasks = []
+    try:
+        if len(remote) == len(routes) and len(routes) < OCR_SHARD_MIN_PAGES:
+            # Nothing to read locally or skip: one request by URL, as before
+            tasks = [asyncio.create_task(ocr_whole_document(ocr, file_url))]
+        elif remote:
+            _, shards = await asyncio.to_thread(split_pdf, content, OCR_SHARD_PAGES, OCR_SHARD_MIN_PAGES, remote)
+            tasks = start_ocr_shards(ocr, shards)
+
+        for start in range(0, len(local), OCR_SHARD_PAGES):
+            yield await asyncio.to_thread(read_text_layer, content, local[start:start + OCR_SHARD_PAGES]), total
+        async for pages in iter_completed(tasks):
+            yield pages, total
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def get_text_layer_stats() -> Dict[str, Any]:
+    saved = _stats["pages_text_layer"] + _stats["pages_blank"]
+    return {
+        **_stats,
+        "ocr_pages_saved": saved,
+        "ocr_cost_saved_usd": round(saved * MISTRAL_OCR_COST_PER_PAGE, 4),
+    }
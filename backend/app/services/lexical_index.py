@@ -0,0 +1,248 @@
+"""
+BM25 inverted index over chunk text, persisted in SQLite
+
+Built incrementally by VectorizationService.embed_and_upload next to the
+Pinecone upsert so lexical search never needs an embedding call. Exact
+identifiers such as part numbers ("AB-1234") or clause IDs ("4.2.1") are kept
+as whole tokens as well as split into their parts.
+
+The index is per instance: it holds only the chunks this process uploaded
+since LOCAL_DATA_DIR was last wiped, and it is not rebuilt from Pinecone. On
+a multi-instance deployment (Cloud Run) lexical and hybrid search would
+miss documents indexed elsewhere, so they are off unless
+LEXICAL_SEARCH_ENABLED=true (single instance with a persistent
+LOCAL_DATA_DIR).
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config.local_storage import local_data_path
+from app.vector.base import SearchResult
+from app.vector.filters import compile_filter
+
+LEXICAL_SEARCH_ENABLED = os.getenv("LEXICAL_SEARCH_ENABLED", "false").lower() == "true"
+
+# BM25 parameters (Okapi defaults)
+K1 = 1.2
+B = 0.75
+
+# Reciprocal-rank fusion constant used by hybrid search
+RRF_K = 60
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-./_][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the
+their there these this to was were will with which who what when where how
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound identifiers also yield their parts"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in _PART.findall(token) if part not in STOPWORDS)
+    return tokens
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Any]], limit: int, k: int = RRF_K) -> List[SearchResult]:
+    """Fuse ranked lists of hits (anything with .id/.metadata) by reciprocal rank.
+
+    Scores are scaled so that a hit ranked first in every list scores 1.0.
+    """
+    scores: Dict[str, float] = {}
+    hits: Dict[str, Any] = {}
+    for results in result_lists:
+        for rank, hit in enumerate(results, start=1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + 1.0 / (k + rank)
+            hits.setdefault(hit.id, hit)
+
+    best_possible = len(result_lists) / (k + 1)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [
+        SearchResult(
+            id=doc_id,
+            content=(hits[doc_id].metadata or {}).get("text", ""),
+            metadata=hits[doc_id].metadata or {},
+            score=score / best_possible,
+        )
+        for doc_id, score in ranked
+    ]
+
+
+class LexicalIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id TEXT PRIMARY KEY,
+                length INTEGER NOT NULL,
+                file_id TEXT,
+                kh_item_id TEXT,
+                metadata TEXT NOT NULL
+            )
+            """)
+            # doc length is denormalized into postings so scoring is a single scan
+            self.db.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                doc_length INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS postings_by_doc ON postings (doc_id)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS docs_by_file ON docs (file_id)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS docs_by_kh_item ON docs (kh_item_id)")
+        self.doc_count, self.total_length = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs"
+        ).fetchone()
+
+    def _remove_ids(self, doc_ids: List[str]) -> None:
+        for start in range(0, len(doc_ids), 500):
+            chunk = doc_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            removed, removed_length = self.db.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE id IN ({placeholders})", chunk
+            ).fetchone()
+            self.db.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", chunk)
+            self.db.execute(f"DELETE FROM docs WHERE id IN ({placeholders})", chunk)
+            self.doc_count -= removed
+            self.total_length -= removed_length
+
+    def add(self, vectors: Iterable[Dict[str, Any]]) -> None:
+        """Index Pinecone upsert payloads ({"id", "metadata": {"text", ...}}); re-adding replaces"""
+        docs, postings = [], []
+        for vector in vectors:
+            metadata = vector.get("metadata", {})
+            terms = Counter(tokenize(metadata.get("text", "")))
+            length = sum(terms.values())
+            docs.append((
+                vector["id"], length, metadata.get("file_id") or None,
+                metadata.get("kh_item_id") or None, json.dumps(metadata, default=str),
+            ))
+            postings.extend((term, vector["id"], tf, length) for term, tf in terms.items())
+        if not docs:
+            return
+
+        with self._lock, self.db:
+            self._remove_ids([doc[0] for doc in docs])
+            self.db.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?)", docs)
+            self.db.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", postings)
+            self.doc_count += len(docs)
+            self.total_length += sum(doc[1] for doc in docs)
+
+    def update_metadata(self, doc_id: str, metadata: Dict[str, Any]) -> None:
+        """Merge metadata fields into an indexed doc (its text and postings are unchanged)"""
+        with self._lock, self.db:
+            row = self.db.execute("SELECT metadata FROM docs WHERE id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return
+            merged = {**json.loads(row[0]), **metadata}
+            self.db.execute(
+                "UPDATE docs SET file_id = ?, kh_item_id = ?, metadata = ? WHERE id = ?",
+                (merged.get("file_id") or None, merged.get("kh_item_id") or None,
+                 json.dumps(merged, default=str), doc_id),
+            )
+
+    def remove(self, doc_ids: List[str]) -> None:
+        with self._lock, self.db:
+            self._remove_ids(list(doc_ids))
+
+    def remove_by(self, key: str, values: List[str]) -> None:
+        """Remove every doc whose file_id / kh_item_id is in values"""
+        if key not in ("file_id", "kh_item_id"):
+            raise ValueError(f"Unsupported key '{key}'")
+        with self._lock, self.db:
+            doc_ids = []
+            for start in range(0, len(values), 500):
+                chunk = [str(value) for value in values[start:start + 500]]
+                doc_ids.extend(row[0] for row in self.db.execute(
+                    f"SELECT id FROM docs WHERE {key} IN ({','.join('?' * len(chunk))})", chunk
+                ))
+            self._remove_ids(doc_ids)
+
+    def clear(self) -> None:
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM postings")
+            self.db.execute("DELETE FROM docs")
+            self.doc_count, self.total_length = 0, 0
+
+    def _scores(self, terms: List[str]) -> Dict[str, float]:
+        if not terms or not self.doc_count:
+            return {}
+        avgdl = self.total_length / self.doc_count
+        rows = self.db.execute(
+            f"SELECT term, doc_id, tf, doc_length FROM postings WHERE term IN ({','.join('?' * len(terms))})",
+            terms,
+        ).fetchall()
+
+        df = Counter(row[0] for row in rows)
+        idf = {
+            term: math.log((self.doc_count - count + 0.5) / (count + 0.5) + 1.0)
+            for term, count in df.items()
+        }
+        scores: Dict[str, float] = {}
+        for term, doc_id, tf, doc_length in rows:
+            norm = tf + K1 * (1 - B + B * doc_length / avgdl)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf[term] * tf * (K1 + 1) / norm
+        return scores
+
+    def search(self, query: str, filters: Optional[Dict[str, Any]] = None, top_k: int = 10) -> List[SearchResult]:
+        """BM25 top_k, honoring Pinecone-style metadata filters"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        predicate = compile_filter(filters)
+
+        with self._lock:
+            scores = self._scores(terms)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+            results: List[SearchResult] = []
+            for start in range(0, len(ranked), 200):
+                chunk = ranked[start:start + 200]
+                metadata_by_id = dict(self.db.execute(
+                    f"SELECT id, metadata FROM docs WHERE id IN ({','.join('?' * len(chunk))})",
+                    [doc_id for doc_id, _ in chunk],
+                ))
+                for doc_id, score in chunk:
+                    metadata = json.loads(metadata_by_id[doc_id])
+                    if predicate and not predicate(metadata):
+                        continue
+                    results.append(SearchResult(
+                        id=doc_id, content=metadata.get("text", ""), metadata=metadata, score=score
+                    ))
+                    if len(results) == top_k:
+                        return results
+            return results
+
+
+_indexes: Dict[Tuple[str, str], LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(index_name: str, namespace: str) -> Optional[LexicalIndex]:
+    """Process-wide lexical index for one Pinecone index + namespace; None when disabled"""
+    if not LEXICAL_SEARCH_ENABLED:
+        return None
+    key = (index_name or "default", namespace)
+    with _indexes_lock:
+        if key not in _indexes:
+            filename = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{key[0]}__{key[1]}") + ".db"
+            _indexes[key] = LexicalIndex(local_data_path("lexical", filename))
+        return _indexes[key]
@@ -123,6 +123,21 @@ async def generate_context_for_rfp_tickets(
     docs = await vectorization_service.query_context(
         user_prompt, filters=filters, aggregation=False, top_k=top_k
     )
+    return _format_rfp_ticket_context(docs)
+
+
+async def generate_contexts_for_rfp_tickets(
+    user_prompts: List[str], filters: Dict[str, Any], top_k: int = 1
+) -> List[tuple[str, Dict[str, int]]]:
+    """generate_context_for_rfp_tickets for many tickets with one embedding request"""
+    vectorization_service = VectorizationService()
+    docs_per_prompt = await vectorization_service.search_many(
+        user_prompts, filters=filters, top_k=top_k
+    )
+    return [_format_rfp_ticket_context(docs) for docs in docs_per_prompt]
+
+
+def _format_rfp_ticket_context(docs: List) -> tuple[str, Dict[str, int]]:
     context, files_pages = "", {}
     for doc in docs:
         context += (
@@ -0,0 +1,226 @@
+"""
+Header- and page-aware markdown chunking
+
+Kept free of embedding and vector-store clients so it can run in worker
+processes (see chunking_pool).
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.text_splitter import MarkdownHeaderTextSplitter, MarkdownTextSplitter
+
+from .markdown_structure import MarkdownStructure, parse_markdown
+from .token_counter import get_token_counter
+
+
+@dataclass
+class PageChunk:
+    content: str
+    page_numbers: List[int]
+    metadata: Dict[str, Any] = None
+    structure: Optional[MarkdownStructure] = None
+
+
+class MarkdownChunker:
+    model_max_tokens = 8192
+
+    def count_tokens(self, text: str, model: str = "gpt-4") -> int:
+        return get_token_counter(model).count(text)
+
+    def has_header(self, metadata: Dict) -> bool:
+        return any("header" in key.lower() for key in metadata.keys())
+    
+    def has_image(self, chunk: str) -> bool:
+        return bool(parse_markdown(chunk).images)
+    
+    def has_table(self, chunk: str) -> bool:
+        return bool(parse_markdown(chunk).tables)
+    
+    def hybrid_chunk_markdown_with_headers(
+    self,
+    pages_markdown: Dict[int, str],
+    max_tokens: int = 500,
+    chunk_overlap: int = 100,
+    model: str = "gpt-4",
+    add_image_metadata: bool = False,    
+    add_table_metadata: bool = False
+) -> List[PageChunk]:
+        headers_to_split_on = [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")]
+        markdown_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=headers_to_split_on, strip_headers=True
+        )
+
+        # Each chunk is counted once; merges only re-count the seam
+        counter = get_token_counter(model)
+        all_chunks: List[PageChunk] = []
+        chunk_tokens: List[int] = []
+
+        # Step 1: Split each page into header-aware chunks
+        for i in range(len(pages_markdown)):
+            page_key = f"page_{i+1}"
+            page_content = pages_markdown[page_key]
+            split_chunks = markdown_splitter.split_text(page_content)
+            for split in split_chunks:
+                page_metadata = split.metadata
+                split_tokens = counter.count(split.page_content)
+                if split_tokens > self.model_max_tokens:
+                    print(f"Page {page_key} has {split_tokens} tokens > {self.model_max_tokens}")
+                    splitter = MarkdownTextSplitter(chunk_size=2000, chunk_overlap=100)
+                    for chunk in splitter.split_text(split.page_content):
+                        all_chunks.append(PageChunk(
+                            content=chunk,
+                            page_numbers=[page_key],
+                            metadata=page_metadata
+                        ))
+                        chunk_tokens.append(counter.count(chunk))
+                else:
+                    all_chunks.append(PageChunk(
+                        content=split.page_content,
+                        page_numbers=[page_key],
+                        metadata=page_metadata
+                    ))
+                    chunk_tokens.append(split_tokens)
+
+        merged_chunks: List[PageChunk] = []
+        current_chunk: Optional[PageChunk] = None
+        # (page, offset its text starts at) for each merged chunk
+        merged_pages: List[List[Tuple[str, int]]] = []
+
+        def inject_headers(chunk: PageChunk, metadata: Dict):
+            headers = []
+            for level in ["Header 1", "Header 2", "Header 3"]:
+                value = metadata.get(level)
+                if value:
+                    prefix = "#" * int(level[-1])  
+                    headers.append(f"{prefix} {value}")
+            if headers:
+                chunk.content = "\n".join(headers) + "\n" + chunk.content
+            return chunk
+
+
+        # Step 2: Merge adjacent chunks when safe
+        for chunk, tokens in zip(all_chunks, chunk_tokens):
+            if current_chunk is None:
+                current_chunk, current_tokens = chunk, tokens
+                current_pages = [(chunk.page_numbers[0], 0)]
+                continue
+
+            should_merge = not self.has_header(chunk.metadata)
+            combined_content = f"{current_chunk.content}\n{chunk.content}"
+            combined_tokens = (
+                counter.count_joined(current_chunk.content, current_tokens, chunk.content, tokens)
+                if should_merge else None
+            )
+
+            if should_merge and combined_tokens <= max_tokens:
+                if chunk.page_numbers[0] != current_pages[-1][0]:
+                    current_pages.append((chunk.page_numbers[0], len(current_chunk.content) + 1))
+                current_chunk.content = combined_content
+                current_tokens = combined_tokens
+                current_chunk.page_numbers = sorted(
+                    set(current_chunk.page_numbers + chunk.page_numbers)
+                )
+                if chunk.metadata:
+                    if current_chunk.metadata is None:
+                        current_chunk.metadata = {}
+                    current_chunk.metadata.update(chunk.metadata)
+            else:
+                merged_chunks.append(current_chunk)
+                merged_pages.append(current_pages)
+                if not chunk.metadata:
+                    chunk.metadata = current_chunk.metadata
+                current_chunk, current_tokens = chunk, tokens
+                current_pages = [(chunk.page_numbers[0], 0)]
+
+        if current_chunk is not None:
+            merged_chunks.append(current_chunk)
+            merged_pages.append(current_pages)
+
+       
+        # Step 3: Re-inject headers for each chunk (if missing from content)
+        # and parse its final text once; the flags and names below come from
+        # that parse and are stored with the chunk, so nothing re-scans it
+        for chunk, pages in zip(merged_chunks, merged_pages):
+            body_length = len(chunk.content)
+            chunk = inject_headers(chunk, chunk.metadata)
+            shift = len(chunk.content) - body_length
+            chunk.structure = parse_markdown(
+                chunk.content, [(page, start + shift if start else 0) for page, start in pages]
+            )
+            # Split metadata dicts can be shared between chunks
+            chunk.metadata = dict(chunk.metadata or {})
+            if add_image_metadata:
+                chunk.metadata["has_image"] = bool(chunk.structure.images)
+                if chunk.structure.images:
+                    chunk.metadata["image_names"] = chunk.structure.image_names
+            if add_table_metadata:
+                chunk.metadata["has_table"] = bool(chunk.structure.tables)
+                if chunk.structure.table_references:
+                    chunk.metadata["table_names"] = chunk.structure.table_names
+
+        return merged_chunks
+
+    def hybrid_chunk_markdown_with_pages(
+        self,
+        pages_markdown: Dict[int, str],
+        max_tokens: int = 1024,
+        chunk_overlap: int = 100,
+        model: str = "gpt-4",
+    ) -> List[PageChunk]:
+        headers_to_split_on = [("#", "Header 1"),("##", "Header 2"), ("###", "Header 3")]
+        markdown_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=headers_to_split_on, strip_headers=False
+        )
+        counter = get_token_counter(model)
+        all_chunks = []
+        chunk_tokens = []
+
+        for i in range(len(pages_markdown)):
+            page_num, page_content = f"page_{i+1}", pages_markdown.get(f"page_{i+1}")
+            splits = markdown_splitter.split_text(page_content)
+            for split in splits:
+                chunk = PageChunk(
+                    content=split.page_content,
+                    page_numbers=[page_num],
+                    metadata=split.metadata,
+                )
+                all_chunks.append(chunk)
+                chunk_tokens.append(counter.count(split.page_content))
+
+        # return all_chunks
+        merged_chunks = []
+
+        current_chunk = None
+
+        for chunk, tokens in zip(all_chunks, chunk_tokens):
+            if current_chunk is None:
+                current_chunk, current_tokens = chunk, tokens
+                continue
+
+            should_try_merge = (
+                not self.has_header(chunk.metadata)
+                or chunk.page_numbers[0] == current_chunk.page_numbers[0]
+            )
+
+            if should_try_merge:
+                combined_content = current_chunk.content + "\n" + chunk.content
+                combined_tokens = counter.count_joined(current_chunk.content, current_tokens, chunk.content, tokens)
+                if combined_tokens <= max_tokens:
+                    current_chunk.content = combined_content
+                    current_tokens = combined_tokens
+                    current_chunk.page_numbers = sorted(
+                        set(current_chunk.page_numbers + chunk.page_numbers)
+                    )
+                    if chunk.metadata:
+                        if current_chunk.metadata is None:
+                            current_chunk.metadata = {}
+                        current_chunk.metadata.update(chunk.metadata)
+                    continue
+
+            merged_chunks.append(current_chunk)
+            current_chunk, current_tokens = chunk, tokens
+
+        if current_chunk is not None:
+            merged_chunks.append(current_chunk)
+
+        return merged_chunks
@@ -0,0 +1,159 @@
+"""
+Single-pass markdown structure parser
+
+One walk over the lines finds headers, tables (as row lists) and page
+boundaries; one precompiled scan finds the inline tokens (image references
+and the table reference tags left by extract_tables_from_markdown). Chunks
+carry the result, so table/image detection, table extraction and search-time
+name lookup do not re-scan the text with their own regexes.
+
+Table detection matches the multiline table regex used elsewhere in the
+codebase: a run of lines that start and end with "|" (blank lines allowed in
+between) whose second or later line is a "|---|:--:|" separator.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+_INLINE_PATTERN = re.compile(
+    r"!\[(?P<alt>[^\]]*)\]\((?P<src>[^)]+)\)|<!--TABLE_REFERENCE:\s*(?P<table>[^>]+)-->"
+)
+_SEPARATOR_LINE = re.compile(r"\|(?:\s*:?-+:?\s*\|)+\s*")
+_SEPARATOR_ROW = re.compile(r"^\|\s*:?-+:?\s*\|")
+_CELL_SPLIT = re.compile(r"\s*\|\s*")
+_HEADER_LINE = re.compile(r"(#{1,6})(?:[ \t]+(.*?))?[ \t#]*")
+
+
+@dataclass
+class MarkdownHeader:
+    level: int
+    title: str
+    start: int
+
+
+@dataclass
+class MarkdownTable:
+    start: int
+    end: int  # includes the whitespace after the last row, like the table regex
+    rows: List[List[str]]  # header row first, separator rows dropped
+
+    @property
+    def header(self) -> List[str]:
+        return self.rows[0] if self.rows else []
+
+
+@dataclass
+class MarkdownImage:
+    alt: str
+    src: str
+    start: int
+
+    @property
+    def name(self) -> str:
+        return self.src.split("/")[-1]
+
+
+@dataclass
+class MarkdownStructure:
+    headers: List[MarkdownHeader] = field(default_factory=list)
+    tables: List[MarkdownTable] = field(default_factory=list)
+    images: List[MarkdownImage] = field(default_factory=list)
+    table_references: List[str] = field(default_factory=list)
+    # (page key, offset where that page's text starts)
+    pages: List[Tuple[str, int]] = field(default_factory=list)
+
+    @property
+    def image_names(self) -> List[str]:
+        return sorted({image.name for image in self.images})
+
+    @property
+    def table_names(self) -> List[str]:
+        return sorted(set(self.table_references))
+
+
+def table_rows(table_markdown: str) -> List[List[str]]:
+    """Cell rows of a markdown table, separator rows dropped"""
+    lines = [line for line in table_markdown.strip().splitlines() if not _SEPARATOR_ROW.match(line)]
+    return [[cell.strip() for cell in _CELL_SPLIT.split(line.strip("|"))] for line in lines]
+
+
+def _is_table_line(line: str) -> bool:
+    stripped = line.rstrip()
+    return len(stripped) >= 2 and stripped[0] == "|" and stripped[-1] == "|"
+
+
+def parse_markdown(text: str, pages: Optional[List[Tuple[str, int]]] = None) -> MarkdownStructure:
+    """Headers, tables, images and table references of text in one pass.
+
+    pages, when the caller knows them (chunks merged across pages), is
+    stored as is.
+    """
+    structure = MarkdownStructure(pages=list(pages or []))
+
+    # Block structure: walk the lines once
+    offset = 0
+    in_code_block = False
+    fence = ""
+    run: List[Tuple[int, int, bool]] = []  # (start, end, is separator) of table lines in the current run
+    run_has_table = False
+
+    def close_run(end: int) -> None:
+        nonlocal run, run_has_table
+        if run_has_table:
+            start = run[0][0]
+            structure.tables.append(MarkdownTable(start, end, table_rows(text[start:end])))
+        run, run_has_table = [], False
+
+    length = len(text)
+    while offset < length or (offset == length and run):
+        newline = text.find("\n", offset)
+        line_end = length if newline == -1 else newline
+        line = text[offset:line_end]
+        next_offset = line_end + 1
+
+        if _is_table_line(line):
+            is_separator = bool(_SEPARATOR_LINE.fullmatch(line)) and newline != -1
+            if is_separator and run:
+                run_has_table = True
+            run.append((offset, line_end, is_separator))
+        elif line.strip():
+            pipe = line.rfind("|")
+            if run_has_table and line.startswith("|") and pipe > 0:
+                # Like the table regex, take a last row that runs on past its final "|"
+                rest = line[pipe + 1:]
+                close_run(offset + pipe + 1 + len(rest) - len(rest.lstrip()))
+            elif run:
+                # The table swallows the whitespace up to the next text, or
+                # up to its last newline when it ends on the separator row
+                close_run(offset if run[-1][2] else offset + len(line) - len(line.lstrip()))
+        if offset >= length:
+            break
+
+        stripped = line.strip()
+        if not in_code_block:
+            if stripped.startswith("```") and stripped.count("```") == 1:
+                in_code_block, fence = True, "```"
+            elif stripped.startswith("~~~"):
+                in_code_block, fence = True, "~~~"
+            elif stripped.startswith("#"):
+                match = _HEADER_LINE.fullmatch(stripped)
+                if match:
+                    structure.headers.append(MarkdownHeader(len(match.group(1)), match.group(2) or "", offset))
+        elif stripped.startswith(fence):
+            in_code_block, fence = False, ""
+        offset = next_offset
+    if run:
+        close_run(text.rfind("\n") + 1 if run[-1][2] else length)
+
+    # Inline tokens: one scan for images and table reference tags
+    for match in _INLINE_PATTERN.finditer(text):
+        if match.group("src") is not None:
+            structure.images.append(MarkdownImage(match.group("alt"), match.group("src"), match.start()))
+        elif match.group("table").strip():
+            structure.table_references.append(match.group("table").strip())
+    return structure
+
+
+def parse_pages(pages_markdown: Dict[str, str]) -> Dict[str, MarkdownStructure]:
+    """Structure of each page of a {"page_N": markdown} document"""
+    return {page: parse_markdown(markdown, [(page, 0)]) for page, markdown in pages_markdown.items()}
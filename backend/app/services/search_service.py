@@ -1,4 +1,5 @@
 from app.services.vectorization_service import VectorizationService
+from app.services.lexical_index import reciprocal_rank_fusion
 from app.config.firebase import firebase_manager
 from typing import Dict, Any, List, Literal, Optional
 from datetime import datetime
@@ -172,14 +173,17 @@ def extract_table_markdown(text: str) -> str:
     
     return ""
 
+# Markdown image syntax: ![alt](src)
+_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+# Table reference syntax: <!--TABLE_REFERENCE: table-0-->
+_TABLE_REFERENCE_PATTERN = re.compile(r'<!--TABLE_REFERENCE:\s*([^>]+)-->')
+
 def extract_image_names(text: str) -> List[str]:
     """Extract image names from markdown image syntax."""
     if not text:
         return []
     
-    # Pattern to match markdown image syntax: ![alt](src)
-    image_pattern = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
-    matches = image_pattern.findall(text)
+    matches = _IMAGE_PATTERN.findall(text)
     
     if matches:
         # Extract image filenames from the src part
@@ -198,9 +202,7 @@ def extract_table_names(text: str) -> List[str]:
     if not text:
         return []
     
-    # Pattern to match table reference syntax: <!--TABLE_REFERENCE: table-0-->
-    table_pattern = re.compile(r'<!--TABLE_REFERENCE:\s*([^>]+)-->')
-    matches = table_pattern.findall(text)
+    matches = _TABLE_REFERENCE_PATTERN.findall(text)
     
     if matches:
         # Extract table names from the reference
@@ -266,8 +268,20 @@ async def fetch_image_data(file_id: str, image_names: List[str]) -> List[Dict[st
     
     return images
 
-async def query_index(user_id: str, index_name: str, query: str, filters: Dict[str, Any], limit: int, offset: int) -> List[Dict[str, Any]]:
-    """Query the vector index for relevant documents based on index type."""
+async def query_index(
+    user_id: str,
+    index_name: str,
+    query: str,
+    filters: Dict[str, Any],
+    limit: int,
+    offset: int,
+    search_type: Literal["lexical", "semantic", "hybrid"] = "semantic",
+) -> List[Dict[str, Any]]:
+    """Query the index for relevant documents based on index type.
+
+    semantic: dense vector query; lexical: BM25 over chunk text (no
+    embedding call); hybrid: both, fused with reciprocal-rank fusion.
+    """
     
     # Ensure filters is always a dictionary
     if not filters:
@@ -285,11 +299,21 @@ async def query_index(user_id: str, index_name: str, query: str, filters: Dict[s
     # For "documents" or any other index_name, no additional filters needed
 
     # VECTOR_DB_NAME = "magic-dossier-pdfs"
-    print(f"Searching {index_name} with query: '{query}'")
+    print(f"Searching {index_name} ({search_type}) with query: '{query}'")
     
     vectorization_service = VectorizationService()
-    results = await vectorization_service.query_context(query, filters, aggregation=False, top_k=limit)
-    print(f"Found {len(results) if results else 0} raw results from vector database")
+    if search_type == "lexical":
+        results = await vectorization_service.lexical_search(query, filters, top_k=limit)
+    elif search_type == "hybrid":
+        # Fuse deeper candidate lists so documents ranked lower by one retriever can surface
+        lexical_results, dense_results = await asyncio.gather(
+            vectorization_service.lexical_search(query, filters, top_k=limit * 2),
+            vectorization_service.query_context(query, filters, aggregation=False, top_k=limit * 2),
+        )
+        results = reciprocal_rank_fusion([lexical_results, dense_results], limit)
+    else:
+        results = await vectorization_service.query_context(query, filters, aggregation=False, top_k=limit)
+    print(f"Found {len(results) if results else 0} raw results from {search_type} search")
     
     # Ensure results is always a list
     if not results:
@@ -415,14 +439,15 @@ async def format_search_results_with_file_metadata(search_results: List[Dict[str
                     if table_content:  # Only check if table content exists, not if it's meaningful
                         file_groups[file_id]['all_tables'].append(table_content)
                     
-                    # Extract table names for fetching from Firebase
-                    table_names = extract_table_names(metadata['text'])
+                    # Table names for fetching from Firebase; stored with the
+                    # chunk at vectorization, parsed here for older vectors
+                    table_names = metadata.get('table_names') or extract_table_names(metadata['text'])
                     if table_names:
                         file_groups[file_id]['all_table_names'].update(table_names)
                 
                 # Extract image names if this is an image search
                 if content_type == "image":
-                    image_names = extract_image_names(metadata['text'])
+                    image_names = metadata.get('image_names') or extract_image_names(metadata['text'])
                     if image_names:
                         file_groups[file_id]['all_image_names'].update(image_names)
 
@@ -23,11 +23,12 @@ from app.services.explanation import (
     get_pdf_text,
 )
 from app.services.thread_service import _knowledge_hub_context
-from app.services.vectorization_service import VectorizationService
+from app.services.chunking_pool import chunk_markdown
 from .llm_agents import (
     search_and_answer_from_files,
     generate_answer_for_rfp_tickets,
     generate_context_for_rfp_tickets,
+    generate_contexts_for_rfp_tickets,
 )
 from .websocket_manager import ws_manager
 from app.services.file.file_processing import enrich_files_with_markdown
@@ -153,11 +154,12 @@ async def extract_rfp_tickets(files: list, summary: Context, model: LLMModel = L
         return tickets
     
      # Split dosument by Section
-    vectorization_service = VectorizationService()
     # chunks = []
     tasks = []
-    for file in files:
-        chunks = vectorization_service.hybrid_chunk_markdown_with_pages(file["markdown"])
+    files_chunks = await asyncio.gather(
+        *(chunk_markdown(file["markdown"], "hybrid_chunk_markdown_with_pages") for file in files)
+    )
+    for file, chunks in zip(files, files_chunks):
         tasks.extend([process_page(chunk.page_numbers, chunk.content, summary, file.get("id")) for chunk in chunks])
 
     tickets = await asyncio.gather(*tasks)
@@ -619,20 +621,23 @@ async def _generate_tickets_answer(
     kh_items_content: str,
     custom_instructions: Optional[str],
     model: LLMModel,
+    files_context_result: Optional[Tuple[str, Dict]] = None,
 ) -> str:
     try:
         organization_metadata = build_organization_metadata(user)
         ticket_details = build_ticket_details(ticket, organization_metadata, context, custom_instructions)
-        query = build_query_from_ticket(ticket)
-
-        filters = {
-            "file_id": [item.get("contentId") for item in filesContext if item.get("contentId")]
-        }
 
-        files_context, files_pages = (
-            await generate_context_for_rfp_tickets(query, filters=filters, top_k=3)
-            if filters["file_id"] else ("", {})
-        )
+        if files_context_result is not None:
+            files_context, files_pages = files_context_result
+        else:
+            query = build_query_from_ticket(ticket)
+            filters = {
+                "file_id": [item.get("contentId") for item in filesContext if item.get("contentId")]
+            }
+            files_context, files_pages = (
+                await generate_context_for_rfp_tickets(query, filters=filters, top_k=3)
+                if filters["file_id"] else ("", {})
+            )
 
         full_context = f"{files_context}\n{kh_items_content}"
 
@@ -688,12 +693,31 @@ async def generate_tickets_answer(
         )
         n = len(tickets)
 
+        # Retrieve context for every ticket up front: one embedding request and
+        # concurrent vector queries instead of one round trip pair per ticket
+        filters = {
+            "file_id": [item.get("contentId") for item in filesContext if item.get("contentId")]
+        }
+        files_contexts = [("", {})] * n
+        if filters["file_id"] and tickets:
+            try:
+                files_contexts = await generate_contexts_for_rfp_tickets(
+                    [build_query_from_ticket(ticket) for ticket in tickets], filters=filters, top_k=3
+                )
+            except Exception as e:
+                # Fall back to per-ticket retrieval so one failure doesn't sink the batch
+                print(f"[ERROR] Batched context retrieval failed: {str(e)}")
+                files_contexts = [None] * n
+
         results = []
         for i in range(0, len(tickets), 10):
             batch = tickets[i:i + 10]
             batch_result = await asyncio.gather(*[
-                _generate_tickets_answer(ticket, user, context, filesContext, kh_items_content, custom_instructions, model)
-                for ticket in batch
+                _generate_tickets_answer(
+                    ticket, user, context, filesContext, kh_items_content, custom_instructions, model,
+                    files_context_result=files_contexts[i + j],
+                )
+                for j, ticket in enumerate(batch)
             ], return_exceptions=True)
             results.extend(batch_result)
             
@@ -0,0 +1,87 @@
+"""
+Cached tiktoken encoders and incremental token counting
+
+tiktoken splits text into regex pieces and byte-pair encodes each piece on
+its own, and no piece runs from a letter into following whitespace. Text cut
+right after a letter that is followed by whitespace therefore tokenizes as the
+sum of its two halves, so the count of ``first + separator + second`` is the
+two known counts plus a re-count of the short window between the last such
+cut in ``first`` and the first one in ``second``. Merge loops that grow a
+buffer chunk by chunk count each chunk once instead of re-encoding the buffer.
+"""
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str):
+    """tiktoken encoding for model, built once per process; None when unavailable"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Encodings are downloaded on first use; fall back to an estimate offline
+        return None
+
+
+def count_tokens(model: str, text: str) -> int:
+    """Billable tokens for text (approximate for non-OpenAI models)"""
+    encoder = get_encoder(model)
+    if encoder is None:
+        return max(1, len(text) // 4)
+    return len(encoder.encode_ordinary(text))
+
+
+def _last_cut(text: str) -> int:
+    """Largest i with text[i - 1] a letter and text[i] whitespace, else 0"""
+    for i in range(len(text) - 1, 0, -1):
+        if text[i].isspace() and text[i - 1].isalpha():
+            return i
+    return 0
+
+
+def _first_cut(text: str) -> int:
+    """Smallest i with text[i - 1] a letter and text[i] whitespace, else len(text)"""
+    for i in range(1, len(text)):
+        if text[i].isspace() and text[i - 1].isalpha():
+            return i
+    return len(text)
+
+
+class TokenCounter:
+    """Token counts for one model, with exact counts for joined texts"""
+
+    def __init__(self, model: str = "gpt-4"):
+        self.model = model
+        self.encoder = get_encoder(model)
+
+    def count(self, text: str) -> int:
+        if self.encoder is None:
+            return max(1, len(text) // 4)
+        return len(self.encoder.encode_ordinary(text))
+
+    def count_joined(
+        self, first: str, first_tokens: int, second: str, second_tokens: int, separator: str = "\n"
+    ) -> int:
+        """count(first + separator + second) from the counts of first and second"""
+        if self.encoder is None:
+            return self.count(first + separator + second)
+        cut = _last_cut(first)
+        head = _first_cut(second)
+        tail_tokens = first_tokens if cut == 0 else self.count(first[cut:])
+        head_tokens = second_tokens if head == len(second) else self.count(second[:head])
+        window = self.count(first[cut:] + separator + second[:head])
+        return first_tokens - tail_tokens + window + second_tokens - head_tokens
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model: str = "gpt-4") -> TokenCounter:
+    return TokenCounter(model)
@@ -12,11 +12,19 @@ import asyncio
 
 # Vector database imports
 try:
-    import psycopg2
-    from pgvector.psycopg2 import register_vector
+    import asyncpg
+    from app.vector.index_spec import IndexSpec, load_index_spec
+    from app.vector.pgvector_store import (
+        copy_upsert_documents,
+        dedupe_documents,
+        ensure_collection,
+        init_pgvector_connection,
+        quote_ident,
+        rebuild_collection_index,
+        search_collection,
+    )
 except ImportError:
-    psycopg2 = None
-    register_vector = None
+    asyncpg = None
 
 try:
     from pinecone import Pinecone, Index
@@ -24,6 +32,8 @@ except ImportError:
     Pinecone = None
     Index = None
 
+from app.vector.base import Vector, to_list
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,7 +48,7 @@ class VectorDocument:
     id: str
     content: str
     metadata: Dict[str, Any]
-    embedding: Optional[List[float]] = None
+    embedding: Optional[Vector] = None
 
 
 @dataclass
@@ -80,7 +90,7 @@ class BaseVectorStore(ABC):
     async def search(
         self, 
         collection_name: str, 
-        query_embedding: List[float], 
+        query_embedding: Vector, 
         top_k: int = 10,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[VectorSearchResult]:
@@ -94,37 +104,54 @@ class BaseVectorStore(ABC):
 
 
 class PgVectorStore(BaseVectorStore):
-    """PostgreSQL with pgvector extension implementation"""
+    """PostgreSQL with pgvector extension implementation.
+
+    Every call acquires its own connection from an asyncpg pool, so slow
+    similarity queries only occupy a pool slot and never block the event loop.
+    Concurrent searches run in parallel up to the pool size.
+    """
     
-    def __init__(self, connection_string: str, **kwargs):
+    def __init__(
+        self,
+        connection_string: str,
+        min_pool_size: int = 1,
+        max_pool_size: int = 10,
+        statement_timeout: float = 10.0,
+        acquire_timeout: float = 5.0,
+        recall_target: float = 0.95,
+        **kwargs
+    ):
         super().__init__(**kwargs)
-        if psycopg2 is None:
-            raise ImportError("psycopg2-binary and pgvector packages are required for pgvector")
+        if asyncpg is None:
+            raise ImportError("asyncpg and pgvector packages are required for pgvector")
         
         self.connection_string = connection_string
-        self.connection = None
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.statement_timeout = statement_timeout  # seconds
+        self.acquire_timeout = acquire_timeout  # seconds
+        self.recall_target = recall_target
+        self.pool = None
+        self.index_specs: Dict[str, Optional[IndexSpec]] = {}
     
     async def connect(self) -> None:
-        """Connect to PostgreSQL database"""
+        """Create the connection pool"""
         try:
-            # For async operations, we'll use a connection pool in production
-            # For now, using sync psycopg2 in thread executor
-            loop = asyncio.get_event_loop()
-            self.connection = await loop.run_in_executor(
-                None, 
-                psycopg2.connect, 
-                self.connection_string
+            conn = await asyncpg.connect(self.connection_string)
+            try:
+                await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+            finally:
+                await conn.close()
+
+            self.pool = await asyncpg.create_pool(
+                self.connection_string,
+                min_size=self.min_pool_size,
+                max_size=self.max_pool_size,
+                init=init_pgvector_connection,
+                # Server-side guard so runaway queries are cancelled by Postgres too
+                server_settings={"statement_timeout": str(int(self.statement_timeout * 1000))},
             )
             
-            # Register pgvector extension
-            register_vector(self.connection)
-            
-            # Create extension if not exists
-            cursor = self.connection.cursor()
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            self.connection.commit()
-            cursor.close()
-            
             logger.info("Connected to PostgreSQL with pgvector")
             
         except Exception as e:
@@ -132,72 +159,50 @@ class PgVectorStore(BaseVectorStore):
             raise
     
     async def disconnect(self) -> None:
-        """Disconnect from PostgreSQL"""
-        if self.connection:
-            self.connection.close()
+        """Close the connection pool"""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
             logger.info("Disconnected from PostgreSQL")
     
     async def create_collection(self, collection_name: str, **kwargs) -> None:
-        """Create a new table for storing vectors"""
+        """Create a new table for storing vectors.
+
+        Pass ``index_spec=IndexSpec(...)`` to choose HNSW, IVFFlat or exact
+        search for this collection; defaults come from PGVECTOR_INDEX_* env vars.
+        """
         try:
-            cursor = self.connection.cursor()
-            
-            # Create table with vector column
-            create_table_query = f"""
-            CREATE TABLE IF NOT EXISTS {collection_name} (
-                id TEXT PRIMARY KEY,
-                content TEXT,
-                metadata JSONB,
-                embedding VECTOR({self.embedding_dimension})
-            );
-            """
-            
-            cursor.execute(create_table_query)
-            
-            # Create index for better search performance
-            create_index_query = f"""
-            CREATE INDEX IF NOT EXISTS {collection_name}_embedding_idx 
-            ON {collection_name} USING ivfflat (embedding vector_cosine_ops) 
-            WITH (lists = 100);
-            """
-            
-            cursor.execute(create_index_query)
-            self.connection.commit()
-            cursor.close()
+            spec = kwargs.get("index_spec") or IndexSpec.from_env()
+            async with self.pool.acquire(timeout=self.acquire_timeout) as conn:
+                self.index_specs[collection_name] = await ensure_collection(
+                    conn, collection_name, self.embedding_dimension, spec
+                )
             
-            logger.info(f"Created collection: {collection_name}")
+            logger.info(f"Created collection: {collection_name} ({spec.kind} index)")
             
         except Exception as e:
             logger.error(f"Failed to create collection {collection_name}: {e}")
             raise
     
+    async def rebuild_index(self, collection_name: str, index_spec: Optional["IndexSpec"] = None) -> None:
+        """Rebuild the collection index, e.g. after a bulk load"""
+        async with self.pool.acquire(timeout=self.acquire_timeout) as conn:
+            spec = index_spec or await self._get_index_spec(conn, collection_name) or IndexSpec.from_env()
+            self.index_specs[collection_name] = await rebuild_collection_index(conn, collection_name, spec)
+    
+    async def _get_index_spec(self, conn, collection_name: str) -> Optional["IndexSpec"]:
+        if collection_name not in self.index_specs:
+            self.index_specs[collection_name] = await load_index_spec(conn, collection_name)
+        return self.index_specs[collection_name]
+    
     async def upsert_documents(self, collection_name: str, documents: List[VectorDocument]) -> None:
         """Insert or update documents"""
+        if not documents:
+            return
         try:
-            cursor = self.connection.cursor()
-            
-            for doc in documents:
-                if not doc.embedding:
-                    raise ValueError(f"Document {doc.id} missing embedding")
-                
-                upsert_query = f"""
-                INSERT INTO {collection_name} (id, content, metadata, embedding)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (id) DO UPDATE SET
-                    content = EXCLUDED.content,
-                    metadata = EXCLUDED.metadata,
-                    embedding = EXCLUDED.embedding;
-                """
-                
-                cursor.execute(upsert_query, (
-                    doc.id,
-                    doc.content,
-                    psycopg2.extras.Json(doc.metadata),
-                    doc.embedding
-                ))
-            
-            self.connection.commit()
-            cursor.close()
+            documents = dedupe_documents(documents)
+            async with self.pool.acquire(timeout=self.acquire_timeout) as conn:
+                await copy_upsert_documents(conn, collection_name, documents)
             
             logger.info(f"Upserted {len(documents)} documents to {collection_name}")
             
@@ -208,47 +213,26 @@ class PgVectorStore(BaseVectorStore):
     async def search(
         self, 
         collection_name: str, 
-        query_embedding: List[float], 
+        query_embedding: Vector, 
         top_k: int = 10,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        recall_target: Optional[float] = None
     ) -> List[VectorSearchResult]:
-        """Search for similar vectors using cosine similarity"""
+        """Search for similar vectors using cosine similarity; filters use Pinecone syntax"""
         try:
-            cursor = self.connection.cursor()
-            
-            # Build query with optional metadata filtering
-            where_clause = ""
-            params = [query_embedding, top_k]
-            
-            if filter_metadata:
-                where_conditions = []
-                for key, value in filter_metadata.items():
-                    where_conditions.append(f"metadata->>{%s} = %s")
-                    params.extend([key, str(value)])
-                
-                where_clause = "WHERE " + " AND ".join(where_conditions)
-            
-            search_query = f"""
-            SELECT id, content, metadata, 1 - (embedding <=> %s) as score
-            FROM {collection_name}
-            {where_clause}
-            ORDER BY embedding <=> %s
-            LIMIT %s;
-            """
-            
-            # Adjust params order for the query
-            query_params = [query_embedding] + params[2:] + [query_embedding, top_k]
-            
-            cursor.execute(search_query, query_params)
-            results = cursor.fetchall()
-            cursor.close()
+            async with self.pool.acquire(timeout=self.acquire_timeout) as conn:
+                spec = await self._get_index_spec(conn, collection_name)
+                results = await search_collection(
+                    conn, collection_name, query_embedding, top_k, filter_metadata,
+                    spec, recall_target or self.recall_target, timeout=self.statement_timeout,
+                )
             
             return [
                 VectorSearchResult(
-                    id=row[0],
-                    content=row[1],
-                    metadata=row[2],
-                    score=row[3]
+                    id=row["id"],
+                    content=row["content"],
+                    metadata=row["metadata"] or {},
+                    score=row["score"]
                 )
                 for row in results
             ]
@@ -260,13 +244,9 @@ class PgVectorStore(BaseVectorStore):
     async def delete_documents(self, collection_name: str, document_ids: List[str]) -> None:
         """Delete documents by ID"""
         try:
-            cursor = self.connection.cursor()
-            
-            delete_query = f"DELETE FROM {collection_name} WHERE id = ANY(%s);"
-            cursor.execute(delete_query, (document_ids,))
-            
-            self.connection.commit()
-            cursor.close()
+            delete_query = f"DELETE FROM {quote_ident(collection_name)} WHERE id = ANY($1::text[]);"
+            async with self.pool.acquire(timeout=self.acquire_timeout) as conn:
+                await conn.execute(delete_query, document_ids, timeout=self.statement_timeout)
             
             logger.info(f"Deleted {len(document_ids)} documents from {collection_name}")
             
@@ -334,12 +314,12 @@ class PineconeVectorStore(BaseVectorStore):
         try:
             vectors = []
             for doc in documents:
-                if not doc.embedding:
+                if doc.embedding is None:
                     raise ValueError(f"Document {doc.id} missing embedding")
                 
                 vectors.append({
                     "id": doc.id,
-                    "values": doc.embedding,
+                    "values": to_list(doc.embedding),
                     "metadata": {
                         **doc.metadata,
                         "content": doc.content  # Store content in metadata
@@ -361,7 +341,7 @@ class PineconeVectorStore(BaseVectorStore):
     async def search(
         self, 
         collection_name: str, 
-        query_embedding: List[float], 
+        query_embedding: Vector, 
         top_k: int = 10,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[VectorSearchResult]:
@@ -375,7 +355,7 @@ class PineconeVectorStore(BaseVectorStore):
                     pinecone_filter[key] = {"$eq": value}
             
             response = self.index.query(
-                vector=query_embedding,
+                vector=to_list(query_embedding),
                 top_k=top_k,
                 filter=pinecone_filter,
                 include_metadata=True
@@ -417,6 +397,7 @@ class VectorAdapter:
         self.backend = os.getenv("VECTOR_BACKEND", "pgvector").lower()
         self.store = self._create_vector_store()
         self._connected = False
+        self._connect_lock = asyncio.Lock()
     
     def _create_vector_store(self) -> BaseVectorStore:
         """Create appropriate vector store based on configuration"""
@@ -424,7 +405,13 @@ class VectorAdapter:
             db_url = os.getenv("SUPABASE_DB_URL")
             if not db_url:
                 raise ValueError("SUPABASE_DB_URL environment variable is required for pgvector")
-            return PgVectorStore(db_url)
+            return PgVectorStore(
+                db_url,
+                min_pool_size=int(os.getenv("PGVECTOR_POOL_MIN_SIZE", 1)),
+                max_pool_size=int(os.getenv("PGVECTOR_POOL_MAX_SIZE", 10)),
+                statement_timeout=float(os.getenv("PGVECTOR_STATEMENT_TIMEOUT", 10.0)),
+                recall_target=float(os.getenv("PGVECTOR_RECALL_TARGET", 0.95)),
+            )
         
         elif self.backend == "pinecone":
             api_key = os.getenv("PINECONE_API_KEY")
@@ -438,9 +425,10 @@ class VectorAdapter:
     
     async def connect(self) -> None:
         """Connect to the vector store"""
-        if not self._connected:
-            await self.store.connect()
-            self._connected = True
+        async with self._connect_lock:
+            if not self._connected:
+                await self.store.connect()
+                self._connected = True
     
     async def disconnect(self) -> None:
         """Disconnect from the vector store"""
@@ -466,7 +454,7 @@ class VectorAdapter:
     async def search(
         self, 
         collection_name: str, 
-        query_embedding: List[float], 
+        query_embedding: Vector, 
         top_k: int = 10,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[VectorSearchResult]:
@@ -502,7 +490,7 @@ def get_vector_adapter() -> VectorAdapter:
 # Convenience functions
 async def search_documents(
     collection_name: str,
-    query_embedding: List[float],
+    query_embedding: Vector,
     top_k: int = 10,
     filter_metadata: Optional[Dict[str, Any]] = None
 ) -> List[VectorSearchResult]:
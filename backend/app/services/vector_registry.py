@@ -0,0 +1,129 @@
+"""
+Local registry of vector IDs per file_id / kh_item_id
+
+Pinecone can only delete by ID (or by filter on pod indexes), so deleting a
+file used to page through zero-vector queries to collect its IDs. The
+registry records the IDs at upload time so deletes are a local lookup.
+
+It is per instance and only as complete as what this instance uploaded, so
+it is a cache: file vectors have deterministic "{file_id}#..." IDs and
+VectorizationService lists them from Pinecone by prefix (refreshing the
+registry with set_ids) for file syncs and deletes. The registry serves
+kh_item_id deletes.
+"""
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config.local_storage import local_data_path
+
+# Metadata keys that deletes filter on
+REGISTRY_KEYS = ("file_id", "kh_item_id")
+
+
+class VectorRegistry:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+            CREATE TABLE IF NOT EXISTS vector_ids (
+                index_name TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                PRIMARY KEY (index_name, namespace, key, value, vector_id)
+            )
+            """)
+            self.db.execute("""
+            CREATE INDEX IF NOT EXISTS vector_ids_by_id
+            ON vector_ids (index_name, namespace, vector_id)
+            """)
+
+    def add(self, index_name: str, namespace: str, vectors: Iterable[Dict[str, Any]]) -> None:
+        """Register uploaded vectors (Pinecone upsert payloads) under their keys"""
+        rows = [
+            (index_name, namespace, key, str(vector["metadata"][key]), vector["id"])
+            for vector in vectors
+            for key in REGISTRY_KEYS
+            if vector.get("metadata", {}).get(key)
+        ]
+        if not rows:
+            return
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR IGNORE INTO vector_ids VALUES (?, ?, ?, ?, ?)", rows)
+
+    def lookup(
+        self, index_name: str, namespace: str, key: str, values: List[str]
+    ) -> Tuple[List[str], List[str]]:
+        """Vector IDs registered for ``values`` and the values with no entries.
+
+        Values without entries were uploaded before the registry existed (or
+        have nothing indexed) and need a filter-based delete.
+        """
+        ids, found = [], set()
+        with self._lock:
+            for start in range(0, len(values), 500):
+                chunk = [str(value) for value in values[start:start + 500]]
+                rows = self.db.execute(
+                    f"SELECT value, vector_id FROM vector_ids "
+                    f"WHERE index_name = ? AND namespace = ? AND key = ? "
+                    f"AND value IN ({','.join('?' * len(chunk))})",
+                    [index_name, namespace, key, *chunk],
+                ).fetchall()
+                for value, vector_id in rows:
+                    found.add(value)
+                    ids.append(vector_id)
+        missing = [value for value in values if str(value) not in found]
+        return list(dict.fromkeys(ids)), missing
+
+    def set_ids(self, index_name: str, namespace: str, key: str, value: str, vector_ids: List[str]) -> None:
+        """Replace the IDs registered for one value with an authoritative list"""
+        with self._lock, self.db:
+            self.db.execute(
+                "DELETE FROM vector_ids WHERE index_name = ? AND namespace = ? AND key = ? AND value = ?",
+                (index_name, namespace, key, str(value)),
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO vector_ids VALUES (?, ?, ?, ?, ?)",
+                [(index_name, namespace, key, str(value), vector_id) for vector_id in vector_ids],
+            )
+
+    def remove(self, index_name: str, namespace: str, vector_ids: List[str]) -> None:
+        """Forget vector IDs under every key"""
+        with self._lock, self.db:
+            self.db.executemany(
+                "DELETE FROM vector_ids WHERE index_name = ? AND namespace = ? AND vector_id = ?",
+                [(index_name, namespace, vector_id) for vector_id in vector_ids],
+            )
+
+    def clear(self, index_name: str, namespace: str) -> None:
+        with self._lock, self.db:
+            self.db.execute(
+                "DELETE FROM vector_ids WHERE index_name = ? AND namespace = ?",
+                (index_name, namespace),
+            )
+
+
+_registry: Optional[VectorRegistry] = None
+
+
+def get_vector_registry() -> VectorRegistry:
+    """Process-wide registry stored under LOCAL_DATA_DIR"""
+    global _registry
+    if _registry is None:
+        _registry = VectorRegistry(local_data_path("vector_registry.db"))
+    return _registry
+
+
+def registry_filter(filters: Dict) -> Optional[Tuple[str, List[str]]]:
+    """(key, values) when a delete filter can be served from the registry"""
+    if len(filters) != 1:
+        return None
+    key, values = next(iter(filters.items()))
+    if key not in REGISTRY_KEYS or isinstance(values, (bool, dict)):
+        return None
+    return key, values if isinstance(values, list) else [values]
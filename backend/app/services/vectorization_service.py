@@ -1,235 +1,82 @@
 from app.config.vector_db import VectorDatabase
 from app.config.llm_factory import async_client
 
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
-import tiktoken
-from langchain.text_splitter import MarkdownHeaderTextSplitter, MarkdownTextSplitter
+from typing import List, Dict, Any, Optional, Union
+from .chunk_dedup import (
+    attach_occurrences, detach_occurrences, expand_filters, file_occurrences, get_dedup_index, release,
+    remap_matches,
+)
+from .embed_pipeline import run_pipeline
 from .embeddings_service import EmbeddingsService
+from .lexical_index import get_lexical_index
+from .markdown_chunker import MarkdownChunker, PageChunk
+from .vector_registry import get_vector_registry, registry_filter
 from tqdm import tqdm
 from uuid import uuid4
-import re
+import asyncio
+import hashlib
+import json
 import os
 
 
-@dataclass
-class PageChunk:
-    content: str
-    page_numbers: List[int]
-    metadata: Dict[str, Any] = None
+def chunk_ids(file_id: str, chunks: List[PageChunk], metadata: Dict = {}) -> List[str]:
+    """Deterministic vector IDs from (file_id, first page, hash of what is stored).
 
+    The hash covers the chunk text and its metadata, so an ID only survives a
+    reprocess when the stored vector would be identical. Repeats of the same
+    chunk on a page get an occurrence suffix.
+    """
+    ids, seen = [], {}
+    for chunk in chunks:
+        page = chunk.page_numbers[0] if chunk.page_numbers else ""
+        stored = {"page_numbers": chunk.page_numbers, **(chunk.metadata or {}), **metadata}
+        digest = hashlib.sha256(
+            json.dumps([chunk.content, stored], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:32]
+        occurrence = seen[(page, digest)] = seen.get((page, digest), -1) + 1
+        ids.append(f"{file_id}#{page}#{digest}#{occurrence}")
+    return ids
 
-class VectorizationService:
+
+class VectorizationService(MarkdownChunker):
     def __init__(
         self,
         index_name: str = os.getenv("PINECONE_INDEX_NAME"),
         provider: str = os.getenv("EMBEDDING_PROVIDER", "openai"),
-        embed_model: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
-        dimensions: int = os.getenv("EMBEDDING_DIMENSIONS", 1024),
+        embed_model: str = os.getenv("EMBEDDING_MODEL"),  # unset -> provider default
+        dimensions: int = int(os.getenv("EMBEDDING_DIMENSIONS", 1024)),
     ):
         self.index_name = index_name
         self.embed_model = embed_model
-        self.model_max_tokens = 8192
         self.embeddings_service = EmbeddingsService(
             provider=provider, 
             model=embed_model, 
             dimensions=dimensions)
 
-    def count_tokens(self, text: str, model: str = "gpt-4") -> int:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
-
-    def has_header(self, metadata: Dict) -> bool:
-        return any("header" in key.lower() for key in metadata.keys())
-    
-    def has_image(self, chunk: str) -> bool:
-        # Regex to match markdown image syntax: ![alt](src)
-        pattern = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
-        matches = pattern.findall(chunk)
-        return len(matches) > 0
-    
-    def has_table(self, chunk: str) -> bool:
-        table_pattern = re.compile(
-        r"""(
-            (?:^\|.*\|\s*\n)+
-            ^\|(?:\s*:?-+:?\s*\|)+\s*\n
-            (?:^\|.*\|\s*\n?)*
-        )""",
-        re.MULTILINE | re.VERBOSE
-        )
-        matches = table_pattern.findall(chunk)
-        return len(matches) > 0
-    
-    def hybrid_chunk_markdown_with_headers(
-    self,
-    pages_markdown: Dict[int, str],
-    max_tokens: int = 500,
-    chunk_overlap: int = 100,
-    model: str = "gpt-4",
-    add_image_metadata: bool = False,    
-    add_table_metadata: bool = False
-) -> List[PageChunk]:
-        headers_to_split_on = [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")]
-        markdown_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=headers_to_split_on, strip_headers=True
-        )
-
-        all_chunks: List[PageChunk] = []
-
-        # Step 1: Split each page into header-aware chunks
-        for i in range(len(pages_markdown)):
-            page_key = f"page_{i+1}"
-            page_content = pages_markdown[page_key]
-            split_chunks = markdown_splitter.split_text(page_content)
-            for split in split_chunks:
-                page_metadata = split.metadata
-                if add_image_metadata:
-                    page_metadata["has_image"] = self.has_image(split.page_content)
-                if add_table_metadata:
-                    page_metadata["has_table"] = self.has_table(split.page_content)
-
-                if self.count_tokens(split.page_content) > self.model_max_tokens:
-                    print(f"Page {page_key} has {self.count_tokens(split.page_content)} tokens > {self.model_max_tokens}")
-                    splitter = MarkdownTextSplitter(chunk_size=2000, chunk_overlap=100)
-                    for chunk in splitter.split_text(split.page_content):
-                        all_chunks.append(PageChunk(
-                            content=chunk,
-                            page_numbers=[page_key],
-                            metadata=page_metadata
-                        ))
-                else:
-                    all_chunks.append(PageChunk(
-                        content=split.page_content,
-                        page_numbers=[page_key],
-                        metadata=page_metadata
-                    ))
-
-        merged_chunks: List[PageChunk] = []
-        current_chunk: Optional[PageChunk] = None
-
-        def inject_headers(chunk: PageChunk, metadata: Dict):
-            headers = []
-            for level in ["Header 1", "Header 2", "Header 3"]:
-                value = metadata.get(level)
-                if value:
-                    prefix = "#" * int(level[-1])  
-                    headers.append(f"{prefix} {value}")
-            if headers:
-                chunk.content = "\n".join(headers) + "\n" + chunk.content
-            return chunk
-
-
-        # Step 2: Merge adjacent chunks when safe
-        for chunk in all_chunks:
-            if current_chunk is None:
-                current_chunk = chunk
-                continue
-
-            should_merge = not self.has_header(chunk.metadata)
-            combined_content = f"{current_chunk.content}\n{chunk.content}"
-
-            if should_merge and self.count_tokens(combined_content, model=model) <= max_tokens:
-                current_chunk.content = combined_content
-                current_chunk.page_numbers = sorted(
-                    set(current_chunk.page_numbers + chunk.page_numbers)
-                )
-                if chunk.metadata:
-                    if current_chunk.metadata is None:
-                        current_chunk.metadata = {}
-                    current_chunk.metadata.update(chunk.metadata)
-            else:
-                merged_chunks.append(current_chunk)
-                if not chunk.metadata:
-                    chunk.metadata = current_chunk.metadata
-                current_chunk = chunk
-
-        if current_chunk is not None:
-            merged_chunks.append(current_chunk)
-
-       
-        # Step 3: Re-inject headers for each chunk (if missing from content)
-        for chunk in merged_chunks:
-            chunk = inject_headers(chunk, chunk.metadata)
-
-        return merged_chunks
-
-    def hybrid_chunk_markdown_with_pages(
-        self,
-        pages_markdown: Dict[int, str],
-        max_tokens: int = 1024,
-        chunk_overlap: int = 100,
-        model: str = "gpt-4",
-    ) -> List[PageChunk]:
-        headers_to_split_on = [("#", "Header 1"),("##", "Header 2"), ("###", "Header 3")]
-        markdown_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=headers_to_split_on, strip_headers=False
-        )
-        all_chunks = []
-
-        for i in range(len(pages_markdown)):
-            page_num, page_content = f"page_{i+1}", pages_markdown.get(f"page_{i+1}")
-            splits = markdown_splitter.split_text(page_content)
-            for split in splits:
-                chunk = PageChunk(
-                    content=split.page_content,
-                    page_numbers=[page_num],
-                    metadata=split.metadata,
-                )
-                all_chunks.append(chunk)
-
-        # return all_chunks
-        merged_chunks = []
-
-        current_chunk = None
-
-        for chunk in all_chunks:
-            if current_chunk is None:
-                current_chunk = chunk
-                continue
-
-            should_try_merge = (
-                not self.has_header(chunk.metadata)
-                or chunk.page_numbers[0] == current_chunk.page_numbers[0]
-            )
-
-            if should_try_merge:
-                combined_content = current_chunk.content + "\n" + chunk.content
-                if self.count_tokens(combined_content, model=model) <= max_tokens:
-                    current_chunk.content = combined_content
-                    current_chunk.page_numbers = sorted(
-                        set(current_chunk.page_numbers + chunk.page_numbers)
-                    )
-                    if chunk.metadata:
-                        if current_chunk.metadata is None:
-                            current_chunk.metadata = {}
-                        current_chunk.metadata.update(chunk.metadata)
-                    continue
-
-            merged_chunks.append(current_chunk)
-            current_chunk = chunk
-
-        if current_chunk is not None:
-            merged_chunks.append(current_chunk)
-
-        return merged_chunks
-
     async def embed_and_upload(
         self,
         chunks: List[PageChunk],
         metadata: Dict = {},
         namespace: str = os.getenv("PINECONE_NAMESPACE", "pdfs"),
         batch_size: int = 10,
+        ids: Optional[List[str]] = None,
     ):
-        self.embeddings_service.provider.batch_size = batch_size
+        """Embed and upsert chunks; returns once all of them are written.
+
+        ``ids`` are aligned to chunks, random when omitted. ``batch_size``
+        is the chunks per pipeline stage; the provider is shared by the
+        whole process and its requests are sized by its batcher.
+        """
         async with VectorDatabase(self.index_name) as db:
-            for i in tqdm(range(0, len(chunks), batch_size), desc="Processing batches"):
+
+            async def embed(i: int) -> List[Dict]:
                 batch = chunks[i : i + batch_size]
                 res = await self.embeddings_service.embed_documents(
                     documents=[chunk.content for chunk in batch],
                 )
+                batch_ids = ids[i : i + batch_size] if ids else [str(uuid4()) for _ in batch]
                 vectors = []
-                for d, e in zip(batch, res):
-                    id = str(uuid4())
+                for id, d, e in zip(batch_ids, batch, res):
                     vectors.append({
                         "id": id,
                         "values": e,
@@ -241,7 +88,132 @@ class VectorizationService:
                             **metadata,
                         },
                     })
-                await db.upsert_vectors(vectors, namespace)
+                return vectors
+
+            async def record(durable: asyncio.Future, vectors: List[Dict]) -> None:
+                await durable
+                get_vector_registry().add(self.index_name, namespace, vectors)
+                lexical_index = get_lexical_index(self.index_name, namespace)
+                if lexical_index:
+                    await asyncio.to_thread(lexical_index.add, vectors)
+
+            writes = []
+
+            async def upsert(vectors: List[Dict]) -> None:
+                # Merged with other jobs' vectors into full-size requests
+                durable = await db.buffer_vectors(vectors, namespace)
+                writes.append(asyncio.ensure_future(record(durable, vectors)))
+
+            # The next batch is embedded while the previous one is upserted
+            try:
+                await run_pipeline(
+                    tqdm(range(0, len(chunks), batch_size), desc="Processing batches"), embed, upsert
+                )
+            finally:
+                results = await asyncio.gather(*writes, return_exceptions=True)
+            # Returns only once every chunk is written
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+
+    async def sync_file_vectors(
+        self,
+        file_id: str,
+        chunks: List[PageChunk],
+        metadata: Dict = {},
+        namespace: str = os.getenv("PINECONE_NAMESPACE", "pdfs"),
+        batch_size: int = 10,
+    ) -> Dict[str, int]:
+        """Bring a file's vectors in line with ``chunks``.
+
+        Diffs the deterministic chunk IDs against the file's IDs listed from
+        Pinecone (by their "{file_id}#" prefix) and its duplicate
+        occurrences: only new or changed chunks are processed, and only IDs
+        that no longer occur are removed. New chunks that near-duplicate one
+        of the user's canonical chunks are recorded as occurrences of it
+        instead of being embedded (see chunk_dedup). A file with nothing
+        stored under its prefix (new, or uploaded with random IDs) is cleared
+        by filter first.
+        """
+        ids = chunk_ids(file_id, chunks, metadata)
+        dedup = get_dedup_index()
+        async with VectorDatabase(self.index_name) as db:
+            if dedup:
+                (stored,), occurrences = await asyncio.gather(
+                    db.list_ids([f"{file_id}#"], namespace), file_occurrences(db, namespace, file_id)
+                )
+            else:
+                (stored,), occurrences = await db.list_ids([f"{file_id}#"], namespace), {}
+        # The registry only caches what this instance uploaded
+        get_vector_registry().set_ids(self.index_name, namespace, "file_id", file_id, stored)
+        if not stored and not occurrences:
+            await self.delete_data(namespace=namespace, filters={"file_id": [file_id]})
+
+        known, wanted = set(stored) | set(occurrences), set(ids)
+        added = [(id, chunk) for id, chunk in zip(ids, chunks) if id not in known]
+        stale = [id for id in stored if id not in wanted]
+        stale_occurrences = {id: canonical_id for id, canonical_id in occurrences.items() if id not in wanted}
+
+        def chunk_metadata(chunk: PageChunk) -> Dict:
+            return {"page_numbers": chunk.page_numbers, **(chunk.metadata or {}), **metadata}
+
+        user_id = metadata.get("user_id")
+        duplicates, signatures = [], {}
+        if dedup and user_id and added:
+            matches, chunk_signatures = await asyncio.to_thread(
+                dedup.match, self.index_name, namespace, str(user_id),
+                [id for id, _ in added], [chunk.content for _, chunk in added],
+            )
+            for (id, chunk), canonical_id, signature in zip(added, matches, chunk_signatures):
+                if canonical_id:
+                    duplicates.append((id, canonical_id, chunk_metadata(chunk)))
+                if signature is not None:
+                    signatures[id] = signature
+            duplicate_ids = {id for id, _, _ in duplicates}
+            unique = [(id, chunk) for id, chunk in added if id not in duplicate_ids]
+        else:
+            unique = added
+
+        async with VectorDatabase(self.index_name) as db:
+            if unique:
+                await self.embed_and_upload(
+                    chunks=[chunk for _, chunk in unique],
+                    metadata=metadata,
+                    namespace=namespace,
+                    batch_size=batch_size,
+                    ids=[id for id, _ in unique],
+                )
+            # Canonicals from this file are written by now
+            if duplicates:
+                rejected = set(await attach_occurrences(
+                    db, namespace, duplicates, {id: chunk_metadata(chunk) for id, chunk in unique}
+                ))
+                if rejected:
+                    # Canonical gone or full: embedded after all
+                    retry = [(id, chunk) for id, chunk in added if id in rejected]
+                    await self.embed_and_upload(
+                        chunks=[chunk for _, chunk in retry],
+                        metadata=metadata,
+                        namespace=namespace,
+                        batch_size=batch_size,
+                        ids=[id for id, _ in retry],
+                    )
+                    unique += retry
+                    duplicates = [row for row in duplicates if row[0] not in rejected]
+            if signatures:
+                dedup.add_canonicals(self.index_name, namespace, str(user_id), [
+                    (id, signatures[id]) for id, _ in unique if id in signatures
+                ])
+            # Upsert before deleting so the file never drops out of search
+            await detach_occurrences(db, namespace, stale_occurrences)
+        if stale:
+            await self.delete_data(ids=stale, namespace=namespace)
+        return {
+            "added": len(unique),
+            "deduplicated": len(duplicates),
+            "deleted": len(stale) + len(stale_occurrences),
+            "unchanged": len(ids) - len(added),
+        }
 
     async def query_context(
         self,
@@ -256,7 +228,13 @@ class VectorizationService:
             
             query_embedding = await self.embeddings_service.embed_query(query)
             
-            docs = await db.query_vectors(query_embedding, filters, top_k, namespace)
+            if get_dedup_index():
+                # Scoped queries also reach canonical vectors of deduplicated chunks
+                query_filters, in_scope = expand_filters(filters)
+                docs = await db.query_vectors(query_embedding, query_filters, top_k, namespace)
+                docs = remap_matches(docs, in_scope)
+            else:
+                docs = await db.query_vectors(query_embedding, filters, top_k, namespace)
             if not aggregation:
                 return docs
 
@@ -274,6 +252,49 @@ class VectorizationService:
                 context += "\n" + doc.metadata["text"]
             return context, files_pages
 
+    async def lexical_search(
+        self,
+        query: str,
+        filters: Dict,
+        top_k: int = 3,
+        namespace: str = os.getenv("PINECONE_NAMESPACE", "pdfs"),
+    ):
+        """BM25 search over chunk text; no embedding call.
+
+        Only covers chunks uploaded by this instance (see lexical_index).
+        """
+        index = get_lexical_index(self.index_name, namespace)
+        if index is None:
+            raise ValueError("Lexical search is disabled (LEXICAL_SEARCH_ENABLED)")
+        return await asyncio.to_thread(index.search, query, filters, top_k)
+
+    async def search_many(
+        self,
+        queries: List[str],
+        filters: Union[Dict, List[Dict]],
+        top_k: int = 3,
+        namespace: str = os.getenv("PINECONE_NAMESPACE", "pdfs"),
+    ) -> List[List[Any]]:
+        """Embed all queries in one provider batch and query them concurrently.
+
+        Returns one list of matches per query, in input order. ``filters`` is
+        shared by all queries or given per query.
+        """
+        if not queries:
+            return []
+
+        per_query = filters if isinstance(filters, list) else [filters] * len(queries)
+        if get_dedup_index():
+            expansions = [expand_filters(query_filters) for query_filters in per_query]
+        else:
+            expansions = [(query_filters, None) for query_filters in per_query]
+        async with VectorDatabase(self.index_name) as db:
+            query_embeddings = await self.embeddings_service.embed_queries(queries)
+            results = await db.query_many(
+                query_embeddings, [query_filters for query_filters, _ in expansions], top_k, namespace
+            )
+        return [remap_matches(matches, in_scope) for matches, (_, in_scope) in zip(results, expansions)]
+
     async def rerank_context(self, query: str, documents: List, top_n: int):
         async with VectorDatabase(self.index_name) as db:
             reranked_documents = await db.rerank_vectors(query, documents, top_n)
@@ -287,11 +308,60 @@ class VectorizationService:
         filters: Dict = {},
     ):
         try:
+            registry = get_vector_registry()
+            lexical_index = get_lexical_index(self.index_name, namespace)
+            dedup = get_dedup_index()
+            rehomed = {}
             async with VectorDatabase(self.index_name) as db:
-                await db.delete_vectors(
-                    ids=ids, namespace=namespace, delete_all=delete_all, filters=filters
-                )
-                return True
+                lookup = registry_filter(filters) if filters and not delete_all else None
+                if lookup:
+                    # File IDs are listed from Pinecone by prefix; values with none need a filter scan
+                    key, values = lookup
+                    if key == "file_id":
+                        listed = await db.list_ids([f"{value}#" for value in values], namespace)
+                        ids = [id for value_ids in listed for id in value_ids]
+                        missing = [value for value, value_ids in zip(values, listed) if not value_ids]
+                    else:
+                        # The registry only knows this instance's uploads, so scan as well
+                        registered, _ = registry.lookup(self.index_name, namespace, key, values)
+                        scanned = await db.query_ids({key: {"$in": values}}, namespace)
+                        ids, missing = list(dict.fromkeys(registered + scanned)), []
+                    if dedup:
+                        rehomed = await release(db, namespace, ids, scope=lookup)
+                    await db.delete_ids(ids, namespace)
+                    if missing:
+                        await db.delete_vectors(ids=[], namespace=namespace, filters={key: missing})
+                else:
+                    if dedup and ids and not filters and not delete_all:
+                        rehomed = await release(db, namespace, ids)
+                    await db.delete_vectors(
+                        ids=ids, namespace=namespace, delete_all=delete_all, filters=filters
+                    )
+
+            # Canonical vectors with remaining duplicates moved to one of them
+            if rehomed:
+                registry.add(self.index_name, namespace, list(rehomed.values()))
+                if lexical_index:
+                    await asyncio.to_thread(lexical_index.add, list(rehomed.values()))
+                if dedup:
+                    dedup.rename(self.index_name, namespace, {id: vector["id"] for id, vector in rehomed.items()})
+
+            if delete_all:
+                registry.clear(self.index_name, namespace)
+                if lexical_index:
+                    lexical_index.clear()
+                if dedup:
+                    dedup.clear(self.index_name, namespace)
+            else:
+                if ids:
+                    registry.remove(self.index_name, namespace, ids)
+                    if lexical_index:
+                        lexical_index.remove(ids)
+                    if dedup:
+                        dedup.forget(self.index_name, namespace, ids)
+                if lookup and lexical_index:
+                    lexical_index.remove_by(*lookup)
+            return True
         except Exception as e:
             print(e)
             return False
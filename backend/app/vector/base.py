@@ -1,17 +1,34 @@
 """
 Base vector store interface
 """
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Union
 from dataclasses import dataclass
 
+import numpy as np
+
+# Embeddings travel as contiguous float32 arrays; plain lists are still accepted
+Vector = Union[np.ndarray, Sequence[float]]
+
+
+def as_float32(vectors: Any) -> np.ndarray:
+    """C-contiguous float32 view of vectors; no copy when already in that form"""
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def to_list(vector: Vector) -> List[float]:
+    """Plain floats for JSON APIs (Pinecone); the only place arrays become lists"""
+    return vector.tolist() if isinstance(vector, np.ndarray) else list(vector)
+
+
 @dataclass
 class VectorDocument:
     """Document with vector embedding"""
     id: str
     content: str
     metadata: Dict[str, Any]
-    embedding: Optional[List[float]] = None
+    embedding: Optional[Vector] = None
 
 @dataclass
 class SearchResult:
@@ -57,12 +74,33 @@ class BaseVectorStore(ABC):
     async def search(
         self,
         collection: str,
-        query_vector: List[float],
+        query_vector: Vector,
         limit: int = 10,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[SearchResult]:
         """Search for similar vectors"""
         pass
+
+    async def search_many(
+        self,
+        collection: str,
+        query_vectors: Union[np.ndarray, List[Vector]],
+        limit: int = 10,
+        filter_metadata: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]] = None
+    ) -> List[List[SearchResult]]:
+        """Search several query vectors; results are aligned to query_vectors.
+
+        ``filter_metadata`` is shared by all queries or given per query. The
+        default issues the searches concurrently; stores that can score a
+        batch in one pass override this.
+        """
+        filters = filter_metadata if isinstance(filter_metadata, list) else [filter_metadata] * len(query_vectors)
+        if len(filters) != len(query_vectors):
+            raise ValueError("filter_metadata must have one entry per query vector")
+        return await asyncio.gather(*[
+            self.search(collection, query_vector, limit, query_filter)
+            for query_vector, query_filter in zip(query_vectors, filters)
+        ])
     
     @abstractmethod
     async def delete_documents(
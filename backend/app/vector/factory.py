@@ -3,8 +3,9 @@ Vector store factory for creating appropriate implementation
 """
 import os
 import logging
-from typing import Optional
-from .base import BaseVectorStore
+from typing import Optional, List, Dict, Any
+from .base import BaseVectorStore, VectorDocument, SearchResult, Vector
+from .local_store import LocalVectorStore
 from .pgvector_store import PgVectorStore
 from .pinecone_store import PineconeStore
 
@@ -32,7 +33,12 @@ def create_vector_store() -> BaseVectorStore:
             raise ValueError("SUPABASE_DB_URL environment variable is required for pgvector")
         
         logger.info("Creating PgVector store")
-        return PgVectorStore(db_url)
+        return PgVectorStore(
+            db_url,
+            min_size=int(os.getenv("PGVECTOR_POOL_MIN_SIZE", 1)),
+            max_size=int(os.getenv("PGVECTOR_POOL_MAX_SIZE", 10)),
+            recall_target=float(os.getenv("PGVECTOR_RECALL_TARGET", 0.95)),
+        )
     
     elif backend == "pinecone":
         api_key = os.getenv("PINECONE_API_KEY")
@@ -44,6 +50,20 @@ def create_vector_store() -> BaseVectorStore:
         logger.info("Creating Pinecone store")
         return PineconeStore(api_key, environment)
     
+    elif backend == "local":
+        root_dir = os.getenv("LOCAL_VECTOR_DIR", "./data/vectors")
+
+        logger.info(f"Creating local vector store at {root_dir}")
+        return LocalVectorStore(
+            root_dir,
+            dtype=os.getenv("LOCAL_VECTOR_DTYPE", "float32"),
+            index=os.getenv("LOCAL_VECTOR_INDEX", "flat"),
+            ivf_probes=int(os.getenv("LOCAL_VECTOR_IVF_PROBES", 8)),
+            ivf_min_rows=int(os.getenv("LOCAL_VECTOR_IVF_MIN_ROWS", 10_000)),
+            quantization=os.getenv("LOCAL_VECTOR_QUANTIZATION", "none"),
+            rescore_factor=int(os.getenv("LOCAL_VECTOR_RESCORE_FACTOR", 0)) or None,
+        )
+    
     else:
         raise ValueError(f"Unsupported vector backend: {backend}")
 
@@ -75,7 +95,7 @@ def get_vector_backend_info() -> dict:
 # Convenience functions for common operations
 async def search_documents(
     collection: str,
-    query_vector: List[float],
+    query_vector: Vector,
     limit: int = 10,
     filter_metadata: Optional[Dict[str, Any]] = None
 ) -> List[SearchResult]:
@@ -100,7 +120,3 @@ async def ensure_collection_exists(collection: str, dimension: int = 1536) -> No
         await store.create_collection(collection, dimension)
         logger.info(f"Created collection: {collection}")
 
-# Import here to avoid circular imports
-from typing import List, Dict, Any
-from .base import VectorDocument, SearchResult
-
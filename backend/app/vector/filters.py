@@ -0,0 +1,95 @@
+"""
+Pinecone-style metadata filters evaluated outside Pinecone
+"""
+from typing import Any, Callable, Dict, Optional
+
+COMPARISON_OPERATORS = ("$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte", "$exists")
+LOGICAL_OPERATORS = ("$and", "$or")
+
+
+def normalize_filter(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Expand shorthand conditions the same way VectorDatabase.query_vectors does.
+
+    ``{"file_id": "a"}`` becomes ``{"file_id": {"$eq": "a"}}`` and
+    ``{"file_id": ["a", "b"]}`` becomes ``{"file_id": {"$in": ["a", "b"]}}``.
+    """
+    if not filters:
+        return {}
+
+    normalized: Dict[str, Any] = {}
+    for key, value in filters.items():
+        if key in LOGICAL_OPERATORS:
+            normalized[key] = [normalize_filter(clause) for clause in value]
+        elif isinstance(value, dict) and any(op in value for op in COMPARISON_OPERATORS):
+            normalized[key] = value
+        elif isinstance(value, list):
+            normalized[key] = {"$in": value}
+        else:
+            normalized[key] = {"$eq": value}
+    return normalized
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    # Pinecone list metadata matches $eq/$in when any element matches
+    if isinstance(actual, list) and op in ("$eq", "$ne", "$in", "$nin"):
+        if op == "$eq":
+            return expected in actual
+        if op == "$ne":
+            return expected not in actual
+        if op == "$in":
+            return any(item in expected for item in actual)
+        return not any(item in expected for item in actual)
+
+    if op == "$eq":
+        return actual == expected
+    if op == "$ne":
+        return actual != expected
+    if op == "$in":
+        return actual in expected
+    if op == "$nin":
+        return actual not in expected
+
+    if actual is None or isinstance(actual, (list, dict)):
+        return False
+    try:
+        if op == "$gt":
+            return actual > expected
+        if op == "$gte":
+            return actual >= expected
+        if op == "$lt":
+            return actual < expected
+        if op == "$lte":
+            return actual <= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported filter operator '{op}'")
+
+
+def matches_filter(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Evaluate a normalized filter against one metadata dict"""
+    for key, condition in filters.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        else:
+            for op, expected in condition.items():
+                if op == "$exists":
+                    if (key in metadata) != bool(expected):
+                        return False
+                elif key not in metadata:
+                    if op not in ("$ne", "$nin"):
+                        return False
+                elif not _compare(op, metadata[key], expected):
+                    return False
+    return True
+
+
+def compile_filter(filters: Optional[Dict[str, Any]]) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """Predicate for a (possibly shorthand) filter, or None when nothing is filtered"""
+    normalized = normalize_filter(filters)
+    if not normalized:
+        return None
+    return lambda metadata: matches_filter(metadata, normalized)
@@ -0,0 +1,197 @@
+"""
+Per-collection ANN index configuration for pgvector
+"""
+import json
+import math
+import os
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Optional, List, Tuple, Union
+
+INDEX_KINDS = ("hnsw", "ivfflat", "exact")
+
+# Registry of index specs, one row per pgvector collection
+REGISTRY_TABLE = "vector_collections"
+
+# Memory for HNSW/IVFFlat builds, e.g. "1GB"; the server default when unset
+MAINTENANCE_WORK_MEM = os.getenv("PGVECTOR_MAINTENANCE_WORK_MEM")
+
+# (recall target, hnsw.ef_search) pairs; the smallest entry >= target wins.
+# Defaults measured with benchmarks/pgvector_recall.py (m=16, ef_construction=64,
+# 20k x 256 clustered vectors: ef 40 -> 0.91, 80 -> 0.94, 160 -> 0.96, 320 -> 0.99).
+HNSW_EF_SEARCH: List[Tuple[float, int]] = [
+    (0.90, 40),
+    (0.95, 160),
+    (0.98, 320),
+    (0.99, 400),
+    (1.00, 1000),
+]
+
+# (recall target, multiple of sqrt(lists)) pairs for ivfflat.probes
+IVFFLAT_PROBE_FACTOR: List[Tuple[float, float]] = [
+    (0.90, 1.0),
+    (0.95, 2.0),
+    (0.98, 4.0),
+    (0.99, 8.0),
+]
+
+
+def ivfflat_lists_for_rows(rows: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond"""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def _pick(table: List[Tuple[float, float]], recall_target: float) -> float:
+    for target, value in table:
+        if recall_target <= target:
+            return value
+    return table[-1][1]
+
+
+@dataclass
+class IndexSpec:
+    """How a collection's embedding column is indexed.
+
+    kind:
+        hnsw     graph index, best recall/latency trade-off, can be built empty
+        ivfflat  clustered index, lists derived from the row count at build time
+        exact    no ANN index, sequential scan with exact distances
+    """
+    kind: str = "hnsw"
+    m: int = 16
+    ef_construction: int = 64
+    lists: Optional[int] = None  # None -> derived from row count on build
+    opclass: str = "vector_cosine_ops"
+    built_lists: Optional[int] = field(default=None, compare=False)
+
+    def __post_init__(self):
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unsupported index kind '{self.kind}'. Available: {list(INDEX_KINDS)}")
+
+    @classmethod
+    def from_env(cls) -> "IndexSpec":
+        lists = os.getenv("PGVECTOR_IVFFLAT_LISTS")
+        return cls(
+            kind=os.getenv("PGVECTOR_INDEX_KIND", "hnsw").lower(),
+            m=int(os.getenv("PGVECTOR_HNSW_M", 16)),
+            ef_construction=int(os.getenv("PGVECTOR_HNSW_EF_CONSTRUCTION", 64)),
+            lists=int(lists) if lists else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "IndexSpec":
+        if isinstance(data, str):
+            data = json.loads(data)
+        return cls(**data)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def index_sql(self, table: str, index: str, row_count: int) -> Optional[str]:
+        """CREATE INDEX statement for this spec, or None when no index is wanted.
+
+        ``table`` and ``index`` must already be quoted identifiers. IVFFlat is
+        skipped on empty tables because its centroids are trained on the rows
+        present at build time; call rebuild_index once data is loaded.
+        """
+        if self.kind == "hnsw":
+            return (
+                f"CREATE INDEX {index} ON {table} USING hnsw (embedding {self.opclass}) "
+                f"WITH (m = {int(self.m)}, ef_construction = {int(self.ef_construction)});"
+            )
+        if self.kind == "ivfflat":
+            if row_count == 0:
+                return None
+            self.built_lists = self.lists or ivfflat_lists_for_rows(row_count)
+            return (
+                f"CREATE INDEX {index} ON {table} USING ivfflat (embedding {self.opclass}) "
+                f"WITH (lists = {int(self.built_lists)});"
+            )
+        return None
+
+    def search_settings(self, recall_target: float, limit: int, selectivity: float = 1.0) -> Dict[str, int]:
+        """Per-query planner settings (applied with SET LOCAL) for a recall target.
+
+        ``selectivity`` is the estimated fraction of rows passing a metadata
+        filter applied after the index scan; the scan widens to compensate.
+        """
+        selectivity = min(1.0, max(selectivity, 1e-6))
+        if self.kind == "hnsw":
+            ef_search = int(_pick(HNSW_EF_SEARCH, recall_target))
+            # pgvector never returns more than ef_search rows from the index
+            return {"hnsw.ef_search": min(1000, max(ef_search, math.ceil(limit / selectivity)))}
+        if self.kind == "ivfflat" and self.built_lists:
+            factor = _pick(IVFFLAT_PROBE_FACTOR, recall_target)
+            if recall_target > IVFFLAT_PROBE_FACTOR[-1][0]:
+                return {"ivfflat.probes": self.built_lists}
+            probes = math.ceil(factor * math.sqrt(self.built_lists) / selectivity)
+            return {"ivfflat.probes": max(1, min(self.built_lists, probes))}
+        return {}
+
+
+async def ensure_registry(conn) -> None:
+    await conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+        name TEXT PRIMARY KEY,
+        dimension INT NOT NULL,
+        index_spec JSONB NOT NULL
+    );
+    """)
+
+
+async def load_index_spec(conn, collection: str) -> Optional[IndexSpec]:
+    exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL;", REGISTRY_TABLE)
+    if not exists:
+        return None
+    data = await conn.fetchval(
+        f"SELECT index_spec FROM {REGISTRY_TABLE} WHERE name = $1;", collection
+    )
+    return IndexSpec.from_dict(data) if data else None
+
+
+async def save_index_spec(conn, collection: str, dimension: int, spec: IndexSpec) -> None:
+    await ensure_registry(conn)
+    await conn.execute(f"""
+    INSERT INTO {REGISTRY_TABLE} (name, dimension, index_spec) VALUES ($1, $2, $3)
+    ON CONFLICT (name) DO UPDATE SET
+        dimension = EXCLUDED.dimension,
+        index_spec = EXCLUDED.index_spec;
+    """, collection, dimension, spec.to_dict())
+
+
+async def delete_index_spec(conn, collection: str) -> None:
+    exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL;", REGISTRY_TABLE)
+    if exists:
+        await conn.execute(f"DELETE FROM {REGISTRY_TABLE} WHERE name = $1;", collection)
+
+
+async def lift_build_limits(conn) -> None:
+    """Settings for index builds; must run inside a transaction.
+
+    The pool's statement_timeout is lifted, as a build on a loaded table
+    takes far longer than a query.
+    """
+    await conn.execute("SET LOCAL statement_timeout = 0;")
+    if MAINTENANCE_WORK_MEM:
+        await conn.execute(f"SET LOCAL maintenance_work_mem = '{MAINTENANCE_WORK_MEM}';")
+
+
+async def build_index(conn, table: str, index: str, spec: IndexSpec) -> None:
+    """Drop and recreate the ANN index of a collection according to spec.
+
+    Must run inside a transaction (see lift_build_limits).
+    """
+    await lift_build_limits(conn)
+    await conn.execute(f"DROP INDEX IF EXISTS {index};")
+    row_count = await conn.fetchval(f"SELECT COUNT(*) FROM {table};")
+    index_sql = spec.index_sql(table, index, row_count)
+    if index_sql:
+        await conn.execute(index_sql)
+
+
+async def apply_search_settings(conn, settings: Dict[str, Union[int, str]]) -> None:
+    """SET LOCAL each setting; must run inside a transaction"""
+    for key, value in settings.items():
+        value = value if value in ("on", "off") else int(value)
+        await conn.execute(f"SET LOCAL {key} = {value};")
@@ -0,0 +1,645 @@
+"""
+Embedded vector store: memory-mapped NumPy matrix + SQLite sidecar
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+from .base import BaseVectorStore, VectorDocument, SearchResult, Vector, as_float32
+from .filters import compile_filter, normalize_filter
+from .index_spec import ivfflat_lists_for_rows
+from .quantization import DEFAULT_RESCORE_FACTOR, QUANTIZATION_KINDS, create_quantizer
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.db"
+IVF_FILE = "ivf.npz"
+CODES_FILE = "codes.npy"
+QUANTIZATION_FILE = "quantization.npz"
+
+DTYPES = ("float32", "float16")
+INDEX_KINDS = ("flat", "ivf")
+
+# Rows scored per matmul; bounds the float32 copy made for float16 storage
+SCORE_CHUNK_ROWS = 16_384
+
+# Quantized codes are scanned in cache-sized blocks; converting larger int8
+# blocks to float32 costs more than the matmul itself
+CODE_CHUNK_BYTES = 256 * 1024
+
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def _grow_memmap(path: str, array: np.memmap, capacity: int) -> np.memmap:
+    """Copy a memory-mapped .npy into a larger file and swap it in place"""
+    tmp_path = path + ".tmp"
+    grown = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=array.dtype, shape=(capacity,) + array.shape[1:]
+    )
+    grown[:array.shape[0]] = array
+    grown.flush()
+    del grown
+    del array
+    os.replace(tmp_path, path)
+    return np.lib.format.open_memmap(path, mode="r+")
+
+
+def _normalize(matrix: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.divide(matrix, norms, out=out)
+
+
+class _Collection:
+    """One collection on disk; every method must be called with ``lock`` held"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.vectors = np.lib.format.open_memmap(os.path.join(path, EMBEDDINGS_FILE), mode="r+")
+        self.db = sqlite3.connect(os.path.join(path, DOCUMENTS_FILE), check_same_thread=False)
+
+        capacity = self.vectors.shape[0]
+        self.ids: List[Optional[str]] = [None] * capacity
+        self.metadata: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.row_of: Dict[str, int] = {}
+        self.size = 0  # high-water mark of used rows
+
+        for row, doc_id, metadata in self.db.execute("SELECT row, id, metadata FROM documents"):
+            self.ids[row] = doc_id
+            self.metadata[row] = json.loads(metadata)
+            self.alive[row] = True
+            self.row_of[doc_id] = row
+            self.size = max(self.size, row + 1)
+        self.free = [row for row in range(self.size) if not self.alive[row]]
+
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments: Optional[np.ndarray] = None
+        self.trained_rows = 0
+        ivf_path = os.path.join(path, IVF_FILE)
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                self.centroids = ivf["centroids"]
+                self.assignments = np.full(capacity, -1, dtype=np.int32)
+                self.assignments[:len(ivf["assignments"])] = ivf["assignments"]
+                self.trained_rows = int(ivf["trained_rows"])
+
+        # Quantized codes are scanned first; float vectors are only read to rescore
+        self.quantizer = None
+        self.codes: Optional[np.memmap] = None
+        quantization_path = os.path.join(path, QUANTIZATION_FILE)
+        if os.path.exists(quantization_path):
+            with np.load(quantization_path) as state:
+                self.quantizer = create_quantizer(str(state["kind"]), self.dimension, dict(state))
+            self.codes = np.lib.format.open_memmap(os.path.join(path, CODES_FILE), mode="r+")
+
+        # Filter masks are reused until the next write
+        self._mask_cache: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        dimension: int,
+        dtype: str,
+        quantization: str = "none",
+        capacity: int = 1024,
+    ) -> "_Collection":
+        os.makedirs(path, exist_ok=True)
+        vectors = np.lib.format.open_memmap(
+            os.path.join(path, EMBEDDINGS_FILE), mode="w+", dtype=dtype, shape=(capacity, dimension)
+        )
+        vectors.flush()
+        del vectors
+        quantizer = create_quantizer(quantization, dimension)
+        if quantizer is not None:
+            codes = np.lib.format.open_memmap(
+                os.path.join(path, CODES_FILE), mode="w+",
+                dtype=quantizer.code_dtype, shape=(capacity, quantizer.code_width()),
+            )
+            codes.flush()
+            del codes
+            np.savez(os.path.join(path, QUANTIZATION_FILE), kind=quantization, **quantizer.state())
+        db = sqlite3.connect(os.path.join(path, DOCUMENTS_FILE))
+        with db:
+            db.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                row INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                content TEXT,
+                metadata TEXT NOT NULL
+            )
+            """)
+        db.close()
+        return cls(path)
+
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def count(self) -> int:
+        return len(self.row_of)
+
+    def close(self) -> None:
+        self.vectors.flush()
+        self.db.close()
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self.vectors = _grow_memmap(os.path.join(self.path, EMBEDDINGS_FILE), self.vectors, new_capacity)
+        if self.codes is not None:
+            self.codes = _grow_memmap(os.path.join(self.path, CODES_FILE), self.codes, new_capacity)
+
+        extra = new_capacity - capacity
+        self.ids.extend([None] * extra)
+        self.metadata.extend([None] * extra)
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        if self.assignments is not None:
+            self.assignments = np.concatenate([self.assignments, np.full(extra, -1, dtype=np.int32)])
+
+    def upsert(self, documents: List[VectorDocument]) -> None:
+        latest: Dict[str, VectorDocument] = {}
+        for doc in documents:
+            if doc.embedding is None:
+                raise ValueError(f"Document {doc.id} missing embedding")
+            latest[doc.id] = doc
+        documents = list(latest.values())
+
+        matrix = np.stack([as_float32(doc.embedding) for doc in documents])
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embedding dimension {matrix.shape[1]} does not match collection dimension {self.dimension}"
+            )
+
+        rows = []
+        for doc in documents:
+            row = self.row_of.get(doc.id)
+            if row is None:
+                row = self.free.pop() if self.free else self.size
+                self.size = max(self.size, row + 1)
+            rows.append(row)
+        self._grow(self.size)
+
+        rows_array = np.asarray(rows)
+        # np.stack made a private copy, so normalize it in place
+        _normalize(matrix, out=matrix)
+        self.vectors[rows_array] = matrix.astype(self.vectors.dtype, copy=False)
+        self.vectors.flush()
+        if self.quantizer is not None:
+            self._encode(rows_array, matrix)
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO documents (row, id, content, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (row, doc.id, doc.content, json.dumps(doc.metadata or {}))
+                    for row, doc in zip(rows, documents)
+                ],
+            )
+
+        for row, doc in zip(rows, documents):
+            self.ids[row] = doc.id
+            self.metadata[row] = doc.metadata or {}
+            self.alive[row] = True
+            self.row_of[doc.id] = row
+        self._mask_cache.clear()
+
+        if self.centroids is not None:
+            self.assignments[rows_array] = self._assign(rows_array)
+
+    def _encode(self, rows: np.ndarray, matrix: np.ndarray) -> None:
+        if self.quantizer.update(matrix):
+            # The int8 range widened: re-encode what is already stored
+            for start in range(0, self.size, SCORE_CHUNK_ROWS):
+                stop = min(start + SCORE_CHUNK_ROWS, self.size)
+                self.codes[start:stop] = self.quantizer.encode(self.vectors[start:stop].astype(np.float32))
+            np.savez(
+                os.path.join(self.path, QUANTIZATION_FILE),
+                kind=self.quantizer.kind, **self.quantizer.state(),
+            )
+        self.codes[rows] = self.quantizer.encode(matrix)
+        self.codes.flush()
+
+    def delete(self, document_ids: List[str]) -> None:
+        rows = [self.row_of.pop(doc_id) for doc_id in document_ids if doc_id in self.row_of]
+        if not rows:
+            return
+        with self.db:
+            self.db.executemany("DELETE FROM documents WHERE row = ?", [(row,) for row in rows])
+        for row in rows:
+            self.ids[row] = None
+            self.metadata[row] = None
+            self.alive[row] = False
+            if self.assignments is not None:
+                self.assignments[row] = -1
+        self.free.extend(rows)
+        self._mask_cache.clear()
+
+    def get(self, document_id: str) -> Optional[VectorDocument]:
+        row = self.row_of.get(document_id)
+        if row is None:
+            return None
+        content = self.db.execute("SELECT content FROM documents WHERE row = ?", (row,)).fetchone()[0]
+        return VectorDocument(
+            id=document_id,
+            content=content,
+            metadata=self.metadata[row],
+            embedding=self.vectors[row].astype(np.float32).tolist(),
+        )
+
+    def _filter_mask(self, filter_metadata: Optional[Dict[str, Any]]) -> np.ndarray:
+        normalized = normalize_filter(filter_metadata)
+        if not normalized:
+            return self.alive[:self.size]
+
+        key = json.dumps(normalized, sort_keys=True, default=str)
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            predicate = compile_filter(normalized)
+            mask = np.fromiter(
+                (
+                    self.alive[row] and predicate(self.metadata[row])
+                    for row in range(self.size)
+                ),
+                dtype=bool,
+                count=self.size,
+            )
+            self._mask_cache[key] = mask
+        return mask
+
+    def _scores(self, rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Dot products against ``rows`` (or all used rows when None).
+
+        ``query`` is a vector, or a (dimension, n_queries) matrix for batches.
+        """
+        total = self.size if rows is None else len(rows)
+        scores = np.empty((total,) + query.shape[1:], dtype=np.float32)
+        for start in range(0, total, SCORE_CHUNK_ROWS):
+            stop = min(start + SCORE_CHUNK_ROWS, total)
+            block = self.vectors[start:stop] if rows is None else self.vectors[rows[start:stop]]
+            scores[start:stop] = block.astype(np.float32, copy=False) @ query
+        return scores
+
+    def _approx_scores(self, rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """First-pass scores from the quantized codes"""
+        prepared = self.quantizer.prepare_query(query)
+        total = self.size if rows is None else len(rows)
+        chunk_rows = max(256, CODE_CHUNK_BYTES // self.codes.strides[0])
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, chunk_rows):
+            stop = min(start + chunk_rows, total)
+            block = self.codes[start:stop] if rows is None else self.codes[rows[start:stop]]
+            scores[start:stop] = self.quantizer.scores(block, prepared)
+        return scores
+
+    def _assign(self, rows: np.ndarray) -> np.ndarray:
+        assignments = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), SCORE_CHUNK_ROWS):
+            block = self.vectors[rows[start:start + SCORE_CHUNK_ROWS]].astype(np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def train_ivf(self, lists: Optional[int] = None, iterations: int = 10, seed: int = 0) -> None:
+        """Spherical k-means over a sample of rows, then assign every row to a list"""
+        rows = np.flatnonzero(self.alive[:self.size])
+        if len(rows) == 0:
+            return
+        lists = min(len(rows), lists or ivfflat_lists_for_rows(len(rows)))
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(rows, size=min(len(rows), lists * 256), replace=False))
+        sample = self.vectors[sample_rows].astype(np.float32)
+
+        centroids = sample[rng.choice(len(sample), size=lists, replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=lists)
+            # Empty lists keep their previous centroid
+            centroids = np.where(counts[:, None] > 0, _normalize(sums), centroids)
+
+        self.centroids = centroids.astype(np.float32)
+        self.assignments = np.full(self.vectors.shape[0], -1, dtype=np.int32)
+        self.assignments[rows] = self._assign(rows)
+        self.trained_rows = len(rows)
+        self.save_ivf()
+        logger.info(f"Trained IVF with {lists} lists on {len(rows)} rows in {self.path}")
+
+    def save_ivf(self) -> None:
+        if self.centroids is None:
+            return
+        np.savez(
+            os.path.join(self.path, IVF_FILE),
+            centroids=self.centroids,
+            assignments=self.assignments[:self.size],
+            trained_rows=self.trained_rows,
+        )
+
+    def search(
+        self,
+        query_vector: Vector,
+        limit: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        probes: Optional[int],
+        rescore_factor: Optional[int] = None,
+    ) -> List[SearchResult]:
+        query = _normalize(as_float32(query_vector))
+        if query.shape[0] != self.dimension:
+            raise ValueError(
+                f"Query dimension {query.shape[0]} does not match collection dimension {self.dimension}"
+            )
+
+        mask = self._filter_mask(filter_metadata)
+        rows: Optional[np.ndarray] = None
+        if probes and self.centroids is not None:
+            nearest = np.argsort(-(self.centroids @ query))[:probes]
+            probed = mask & np.isin(self.assignments[:self.size], nearest)
+            if probed.sum() >= limit:
+                mask = probed
+
+        if self.quantizer is not None:
+            return self._rescored_results(mask, query, limit, rescore_factor)
+
+        if mask.all():
+            scores = self._scores(None, query)
+            rows = np.arange(self.size)
+        else:
+            rows = np.flatnonzero(mask)
+            scores = self._scores(rows, query)
+
+        return self._results(rows, scores, limit)
+
+    def _rescored_results(
+        self, mask: np.ndarray, query: np.ndarray, limit: int, rescore_factor: Optional[int]
+    ) -> List[SearchResult]:
+        """Shortlist with the codes, then rank the shortlist with float vectors"""
+        if mask.all():
+            rows = np.arange(self.size)
+            approx = self._approx_scores(None, query)
+        else:
+            rows = np.flatnonzero(mask)
+            approx = self._approx_scores(rows, query)
+
+        shortlist = limit * (rescore_factor or DEFAULT_RESCORE_FACTOR[self.quantizer.kind])
+        if len(rows) > shortlist:
+            rows = np.sort(rows[np.argpartition(-approx, shortlist)[:shortlist]])
+        return self._results(rows, self._scores(rows, query), limit)
+
+    def search_many(
+        self,
+        query_vectors: Union[np.ndarray, List[Vector]],
+        limit: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        rescore_factor: Optional[int] = None,
+    ) -> List[List[SearchResult]]:
+        """Exact search for a batch of queries sharing one filter: one matmul per row block"""
+        if self.quantizer is not None:
+            return [
+                self.search(query_vector, limit, filter_metadata, None, rescore_factor)
+                for query_vector in query_vectors
+            ]
+        queries = _normalize(as_float32(query_vectors))
+        if queries.shape[1] != self.dimension:
+            raise ValueError(
+                f"Query dimension {queries.shape[1]} does not match collection dimension {self.dimension}"
+            )
+
+        mask = self._filter_mask(filter_metadata)
+        rows = np.arange(self.size) if mask.all() else np.flatnonzero(mask)
+        scores = self._scores(None if len(rows) == self.size else rows, queries.T)
+        return [self._results(rows, scores[:, i], limit) for i in range(len(queries))]
+
+    def _results(self, rows: np.ndarray, scores: np.ndarray, limit: int) -> List[SearchResult]:
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top])]
+        result_rows = [int(rows[i]) for i in top]
+
+        contents = dict(self.db.execute(
+            f"SELECT row, content FROM documents WHERE row IN ({','.join('?' * len(result_rows))})",
+            result_rows,
+        )) if result_rows else {}
+
+        return [
+            SearchResult(
+                id=self.ids[row],
+                content=contents.get(row, ""),
+                metadata=self.metadata[row],
+                score=float(scores[i]),
+            )
+            for i, row in zip(top, result_rows)
+        ]
+
+
+class LocalVectorStore(BaseVectorStore):
+    """Embedded store for single-tenant deployments, CI and offline benchmarks.
+
+    Each collection is a directory holding a memory-mapped ``.npy`` matrix of
+    unit-normalized embeddings (float32 or float16) and a SQLite table with
+    ids, content and metadata. Search is a vectorized brute-force dot product;
+    with ``index="ivf"`` collections above ``ivf_min_rows`` are clustered and
+    only the ``ivf_probes`` nearest lists are scanned. With ``quantization``
+    set to int8 or binary, compact codes are scanned instead and the best
+    ``limit * rescore_factor`` candidates are rescored with the float vectors.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        dtype: str = "float32",
+        index: str = "flat",
+        ivf_probes: int = 8,
+        ivf_min_rows: int = 10_000,
+        quantization: str = "none",
+        rescore_factor: Optional[int] = None,
+    ):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'. Available: {list(DTYPES)}")
+        if index not in INDEX_KINDS:
+            raise ValueError(f"Unsupported index '{index}'. Available: {list(INDEX_KINDS)}")
+
+        self.root_dir = root_dir
+        self.dtype = dtype
+        self.index = index
+        self.ivf_probes = ivf_probes
+        self.ivf_min_rows = ivf_min_rows
+        if quantization not in QUANTIZATION_KINDS:
+            raise ValueError(f"Unsupported quantization '{quantization}'. Available: {list(QUANTIZATION_KINDS)}")
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.collections: Dict[str, _Collection] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        if not _COLLECTION_NAME.match(name) or name in (".", ".."):
+            raise ValueError(f"Invalid collection name '{name}'")
+        return os.path.join(self.root_dir, name)
+
+    def _open(self, name: str) -> _Collection:
+        with self._lock:
+            collection = self.collections.get(name)
+            if collection is None:
+                path = self._path(name)
+                if not os.path.exists(os.path.join(path, EMBEDDINGS_FILE)):
+                    raise ValueError(f"Collection {name} does not exist")
+                collection = self.collections[name] = _Collection(path)
+            return collection
+
+    async def connect(self) -> None:
+        """Create the data directory"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        logger.info(f"Local vector store at {self.root_dir}")
+
+    async def disconnect(self) -> None:
+        """Flush and close every open collection"""
+        with self._lock:
+            for collection in self.collections.values():
+                with collection.lock:
+                    collection.close()
+            self.collections.clear()
+
+    async def create_collection(self, name: str, dimension: int = 1536) -> None:
+        """Create collection directory if missing"""
+        def create():
+            with self._lock:
+                path = self._path(name)
+                if name not in self.collections and not os.path.exists(os.path.join(path, EMBEDDINGS_FILE)):
+                    self.collections[name] = _Collection.create(path, dimension, self.dtype, self.quantization)
+
+        await asyncio.to_thread(create)
+        logger.info(f"Created collection {name} with dimension {dimension}")
+
+    async def delete_collection(self, name: str) -> None:
+        """Delete collection directory"""
+        def delete():
+            with self._lock:
+                collection = self.collections.pop(name, None)
+                if collection is not None:
+                    with collection.lock:
+                        collection.close()
+                shutil.rmtree(self._path(name), ignore_errors=True)
+
+        await asyncio.to_thread(delete)
+        logger.info(f"Deleted collection {name}")
+
+    async def upsert_documents(
+        self,
+        collection: str,
+        documents: List[VectorDocument]
+    ) -> None:
+        """Insert or update documents, retraining IVF once the collection doubles"""
+        if not documents:
+            return
+
+        def upsert():
+            coll = self._open(collection)
+            with coll.lock:
+                coll.upsert(documents)
+                if self.index == "ivf" and coll.count >= self.ivf_min_rows and coll.count >= 2 * coll.trained_rows:
+                    coll.train_ivf()
+                else:
+                    coll.save_ivf()
+
+        await asyncio.to_thread(upsert)
+        logger.info(f"Upserted {len(documents)} documents to {collection}")
+
+    async def search(
+        self,
+        collection: str,
+        query_vector: Vector,
+        limit: int = 10,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
+        """Search using cosine similarity; accepts Pinecone-style filters"""
+        def search():
+            coll = self._open(collection)
+            with coll.lock:
+                probes = self.ivf_probes if self.index == "ivf" else None
+                return coll.search(query_vector, limit, filter_metadata, probes, self.rescore_factor)
+
+        return await asyncio.to_thread(search)
+
+    async def search_many(
+        self,
+        collection: str,
+        query_vectors: Union[np.ndarray, List[Vector]],
+        limit: int = 10,
+        filter_metadata: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]] = None
+    ) -> List[List[SearchResult]]:
+        """Score the whole batch in one pass when the queries share a filter"""
+        if len(query_vectors) == 0:
+            return []
+        if isinstance(filter_metadata, list) or self.index == "ivf":
+            return await super().search_many(collection, query_vectors, limit, filter_metadata)
+
+        def search_many():
+            coll = self._open(collection)
+            with coll.lock:
+                return coll.search_many(query_vectors, limit, filter_metadata, self.rescore_factor)
+
+        return await asyncio.to_thread(search_many)
+
+    async def delete_documents(
+        self,
+        collection: str,
+        document_ids: List[str]
+    ) -> None:
+        """Delete documents by ID; freed rows are reused by later upserts"""
+        def delete():
+            coll = self._open(collection)
+            with coll.lock:
+                coll.delete(document_ids)
+                coll.save_ivf()
+
+        await asyncio.to_thread(delete)
+        logger.info(f"Deleted {len(document_ids)} documents from {collection}")
+
+    async def get_document(
+        self,
+        collection: str,
+        document_id: str
+    ) -> Optional[VectorDocument]:
+        """Get specific document"""
+        coll = self._open(collection)
+        with coll.lock:
+            return coll.get(document_id)
+
+    async def list_collections(self) -> List[str]:
+        """List collection directories"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root_dir)
+            if os.path.exists(os.path.join(self.root_dir, name, EMBEDDINGS_FILE))
+        )
+
+    async def get_collection_stats(self, collection: str) -> Dict[str, Any]:
+        """Get collection statistics"""
+        coll = self._open(collection)
+        with coll.lock:
+            return {
+                "document_count": coll.count,
+                "dimension": coll.dimension,
+                "dtype": str(coll.vectors.dtype),
+                "index": "ivf" if coll.centroids is not None else "flat",
+                "quantization": coll.quantizer.kind if coll.quantizer is not None else "none",
+                "vector_bytes": coll.count * coll.dimension * coll.vectors.dtype.itemsize,
+                "code_bytes": coll.count * coll.codes.shape[1] * coll.codes.dtype.itemsize
+                if coll.codes is not None else 0,
+            }
@@ -0,0 +1,131 @@
+"""
+Pinecone-style metadata filters translated to indexable JSONB predicates
+"""
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .filters import normalize_filter
+
+# Scalar keys nearly every retrieval filters on; each gets a btree expression
+# index on metadata->>'key' in addition to the GIN index on metadata
+FILTER_INDEX_KEYS = ("user_id", "file_id", "kh_item_id", "type")
+
+_RANGE_OPERATORS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+# Estimated matches at or below which a filtered search scans the filtered
+# rows exactly instead of post-filtering ANN results
+PREFILTER_MAX_ROWS = int(os.getenv("PGVECTOR_PREFILTER_MAX_ROWS", "20000"))
+
+# Row estimates are cached briefly; they only steer the plan
+ESTIMATE_TTL_SECONDS = 60.0
+_estimates: Dict[str, Tuple[float, float]] = {}
+
+
+def _param(params: List[Any], value: Any) -> str:
+    params.append(value)
+    return f"${len(params)}"
+
+
+def _jsonpath_key(key: str) -> str:
+    return '$."' + key.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _equals(key: str, value: Any, params: List[Any]) -> str:
+    if key in FILTER_INDEX_KEYS and isinstance(value, str):
+        # Key inlined (it is one of FILTER_INDEX_KEYS) so the expression index matches
+        return f"(metadata->>'{key}') = {_param(params, value)}"
+    # A list-valued field matches when any element equals the value (Pinecone semantics)
+    scalar = _param(params, {key: value})
+    element = _param(params, {key: [value]})
+    return f"(metadata @> {scalar}::jsonb OR metadata @> {element}::jsonb)"
+
+
+def _in(key: str, values: List[Any], params: List[Any]) -> str:
+    if not values:
+        return "FALSE"
+    if key in FILTER_INDEX_KEYS and all(isinstance(value, str) for value in values):
+        return f"(metadata->>'{key}') = ANY({_param(params, list(values))}::text[])"
+    return "(" + " OR ".join(_equals(key, value, params) for value in values) + ")"
+
+
+def _condition(key: str, op: str, expected: Any, params: List[Any]) -> str:
+    if op == "$eq":
+        return _equals(key, expected, params)
+    if op == "$ne":
+        return f"NOT {_equals(key, expected, params)}"
+    if op == "$in":
+        return _in(key, expected, params)
+    if op == "$nin":
+        return f"NOT {_in(key, expected, params)}"
+    if op == "$exists":
+        exists = f"metadata ? {_param(params, key)}"
+        return exists if expected else f"NOT ({exists})"
+    if op in _RANGE_OPERATORS:
+        # jsonpath compares only like types, so strings never error against numbers
+        path = f"{_jsonpath_key(key)} ? (@ {_RANGE_OPERATORS[op]} $v)"
+        return (
+            f"jsonb_path_exists(metadata, {_param(params, path)}::jsonpath, "
+            f"{_param(params, {'v': expected})}::jsonb)"
+        )
+    raise ValueError(f"Unsupported filter operator '{op}'")
+
+
+def _translate(filters: Dict[str, Any], params: List[Any]) -> str:
+    clauses = []
+    for key, condition in filters.items():
+        if key == "$and":
+            clauses.append("(" + " AND ".join(_translate(clause, params) for clause in condition) + ")")
+        elif key == "$or":
+            clauses.append("(" + " OR ".join(_translate(clause, params) for clause in condition) + ")")
+        else:
+            clauses.extend(_condition(key, op, expected, params) for op, expected in condition.items())
+    return " AND ".join(clauses) if clauses else "TRUE"
+
+
+def translate_filter(filters: Optional[Dict[str, Any]], params: List[Any]) -> Optional[str]:
+    """SQL predicate over the metadata column, appending its values to params.
+
+    Accepts the same shorthand as VectorDatabase.query_vectors (scalar ->
+    $eq, list -> $in). jsonb values are appended as Python objects for the
+    codec registered by init_pgvector_connection. Returns None when there is
+    nothing to filter.
+    """
+    normalized = normalize_filter(filters)
+    if not normalized:
+        return None
+    return _translate(normalized, params)
+
+
+def filter_index_statements(name: str, quote_ident) -> List[str]:
+    """GIN + expression indexes that back translated filters"""
+    table = quote_ident(name)
+    statements = [
+        f"CREATE INDEX IF NOT EXISTS {quote_ident(f'{name}_metadata_gin')} "
+        f"ON {table} USING gin (metadata);"
+    ]
+    for key in FILTER_INDEX_KEYS:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS {quote_ident(f'{name}_meta_{key}_idx')} "
+            f"ON {table} ((metadata->>'{key}'));"
+        )
+    return statements
+
+
+async def estimate_rows(conn, table: str, where: str, params: List[Any]) -> Tuple[float, float]:
+    """(planner row estimate for the filter, estimated table rows)"""
+    key = json.dumps([table, where, params], default=str)
+    cached = _estimates.get(key)
+    if cached and time.monotonic() - cached[1] < ESTIMATE_TTL_SECONDS:
+        return cached[0]
+
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table} WHERE {where}", *params)
+    plan_rows = float(json.loads(plan)[0]["Plan"]["Plan Rows"])
+    total = float(await conn.fetchval(
+        "SELECT GREATEST(reltuples, 0) FROM pg_class WHERE oid = $1::regclass", table
+    ) or 0)
+    if len(_estimates) > 1024:
+        _estimates.clear()
+    _estimates[key] = ((plan_rows, total), time.monotonic())
+    return plan_rows, total
@@ -1,225 +1,394 @@
 """
 PostgreSQL + pgvector implementation
 """
+import json
 import logging
-from typing import List, Dict, Any, Optional
-from .base import BaseVectorStore, VectorDocument, SearchResult
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from .base import BaseVectorStore, VectorDocument, SearchResult, Vector
+from .index_spec import (
+    IndexSpec,
+    apply_search_settings,
+    build_index,
+    delete_index_spec,
+    lift_build_limits,
+    load_index_spec,
+    save_index_spec,
+)
+from .pg_filters import PREFILTER_MAX_ROWS, estimate_rows, filter_index_statements, translate_filter
 
 logger = logging.getLogger(__name__)
 
-# TODO: Import required libraries
-# import asyncpg
-# from pgvector.asyncpg import register_vector
+try:
+    import asyncpg
+    from pgvector.asyncpg import register_vector
+except ImportError:
+    asyncpg = None
+    register_vector = None
+
+
+def quote_ident(name: str) -> str:
+    """Quote a table/index name so collection names like 'magic-rfp-pdfs' are valid"""
+    if not name:
+        raise ValueError("Collection name cannot be empty")
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # Binary jsonb wire format: version byte followed by the JSON text
+    return b"\x01" + json.dumps(value).encode("utf-8")
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return json.loads(data[1:].decode("utf-8"))
+
+
+async def init_pgvector_connection(conn) -> None:
+    """Register binary codecs for vector and jsonb on a new pool connection.
+
+    Both codecs need to be binary so that ``copy_records_to_table`` can stream
+    rows with the binary COPY protocol.
+    """
+    await register_vector(conn)
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=_encode_jsonb,
+        decoder=_decode_jsonb,
+        schema="pg_catalog",
+        format="binary",
+    )
+
+
+def dedupe_documents(documents: List[VectorDocument]) -> List[VectorDocument]:
+    """Keep the last occurrence of each id; ON CONFLICT cannot touch a row twice"""
+    latest: Dict[str, VectorDocument] = {}
+    for doc in documents:
+        if doc.embedding is None:
+            raise ValueError(f"Document {doc.id} missing embedding")
+        latest[doc.id] = doc
+    return list(latest.values())
+
+
+async def copy_upsert_documents(conn, collection: str, documents: List[Any]) -> None:
+    """Upsert documents through a binary COPY into a staging table and one merge"""
+    table = quote_ident(collection)
+    staging_name = f"_staging_{collection}"
+    staging = quote_ident(staging_name)
+
+    records: Iterable[Tuple] = (
+        (doc.id, doc.content, doc.metadata or {}, doc.embedding)
+        for doc in documents
+    )
+
+    async with conn.transaction():
+        await conn.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+            f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;"
+        )
+        await conn.copy_records_to_table(
+            staging_name,
+            records=records,
+            columns=["id", "content", "metadata", "embedding"],
+        )
+        await conn.execute(f"""
+        INSERT INTO {table} (id, content, metadata, embedding)
+        SELECT id, content, metadata, embedding FROM {staging}
+        ON CONFLICT (id) DO UPDATE SET
+            content = EXCLUDED.content,
+            metadata = EXCLUDED.metadata,
+            embedding = EXCLUDED.embedding;
+        """)
+
+
+async def ensure_collection(conn, name: str, dimension: int, spec: IndexSpec) -> IndexSpec:
+    """Create the collection table and (re)build its ANN index if the spec changed"""
+    table = quote_ident(name)
+    index = quote_ident(f"{name}_embedding_idx")
+
+    async with conn.transaction():
+        await conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id TEXT PRIMARY KEY,
+            content TEXT,
+            metadata JSONB,
+            embedding VECTOR({dimension})
+        );
+        """)
+        # The filter indexes are built on a possibly loaded table too
+        await lift_build_limits(conn)
+        for statement in filter_index_statements(name, quote_ident):
+            await conn.execute(statement)
+        existing = await load_index_spec(conn, name)
+        index_exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL;", index)
+        if existing == spec and (index_exists or spec.kind == "exact"):
+            return existing
+
+        await build_index(conn, table, index, spec)
+        await save_index_spec(conn, name, dimension, spec)
+    return spec
+
+
+async def rebuild_collection_index(conn, name: str, spec: IndexSpec) -> IndexSpec:
+    """Rebuild the ANN index, e.g. after a bulk load so IVFFlat lists match the row count"""
+    async with conn.transaction():
+        await build_index(conn, quote_ident(name), quote_ident(f"{name}_embedding_idx"), spec)
+        dimension = await conn.fetchval(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = $1::regclass AND attname = 'embedding';",
+            quote_ident(name),
+        )
+        await save_index_spec(conn, name, dimension, spec)
+    return spec
+
+
+async def search_collection(
+    conn,
+    collection: str,
+    query_vector: Any,
+    limit: int,
+    filter_metadata: Optional[Dict[str, Any]],
+    spec: Optional[IndexSpec],
+    recall_target: float,
+    timeout: Optional[float] = None,
+) -> List[Any]:
+    """Cosine search with metadata filters pushed down to indexed predicates.
+
+    Filters estimated to match at most PREFILTER_MAX_ROWS rows are pre-filtered:
+    the ANN index is disabled so the GIN/expression indexes select the rows
+    and distances are exact. Broader filters post-filter the ANN scan, whose
+    ef_search / probes widen by the inverse selectivity; if that still yields
+    fewer than ``limit`` rows the query is re-run pre-filtered.
+    """
+    table = quote_ident(collection)
+    params: List[Any] = []
+    where = translate_filter(filter_metadata, params)
+
+    prefilter = False
+    settings = spec.search_settings(recall_target, limit) if spec else {}
+    if where:
+        matches, total = await estimate_rows(conn, table, where, params)
+        if spec is None or spec.kind == "exact" or total <= 0 or matches <= PREFILTER_MAX_ROWS:
+            prefilter = True
+        else:
+            settings = spec.search_settings(recall_target, limit, selectivity=matches / total)
+
+    params.extend([query_vector, limit])
+    vector, limit_param = f"${len(params) - 1}", f"${len(params)}"
+    search_sql = f"""
+    SELECT id, content, metadata, 1 - (embedding <=> {vector}) AS score
+    FROM {table}
+    {f"WHERE {where}" if where else ""}
+    ORDER BY embedding <=> {vector}
+    LIMIT {limit_param};
+    """
+
+    async with conn.transaction():
+        await apply_search_settings(conn, {"enable_indexscan": "off"} if prefilter else settings)
+        rows = await conn.fetch(search_sql, *params, timeout=timeout)
+
+    if where and not prefilter and len(rows) < limit:
+        async with conn.transaction():
+            await apply_search_settings(conn, {"enable_indexscan": "off"})
+            rows = await conn.fetch(search_sql, *params, timeout=timeout)
+    return rows
+
 
 class PgVectorStore(BaseVectorStore):
     """PostgreSQL with pgvector extension"""
-    
-    def __init__(self, connection_string: str):
+
+    def __init__(
+        self,
+        connection_string: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        recall_target: float = 0.95,
+    ):
+        if asyncpg is None:
+            raise ImportError("asyncpg and pgvector packages are required for pgvector")
+
         self.connection_string = connection_string
+        self.min_size = min_size
+        self.max_size = max_size
+        self.recall_target = recall_target
         self.pool = None
         self.dimension = 1536  # Default OpenAI embedding dimension
-    
+        self.index_specs: Dict[str, Optional[IndexSpec]] = {}
+
     async def connect(self) -> None:
         """Connect to PostgreSQL"""
-        # TODO: Implement connection
-        # self.pool = await asyncpg.create_pool(
-        #     self.connection_string,
-        #     min_size=1,
-        #     max_size=10
-        # )
-        # 
-        # # Register pgvector extension
-        # async with self.pool.acquire() as conn:
-        #     await register_vector(conn)
-        #     await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-        
-        logger.info("TODO: Connect to PostgreSQL with pgvector")
-    
+        if self.pool is not None:
+            return
+
+        # The extension must exist before register_vector can resolve the type
+        conn = await asyncpg.connect(self.connection_string)
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        finally:
+            await conn.close()
+
+        self.pool = await asyncpg.create_pool(
+            self.connection_string,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            init=init_pgvector_connection,
+        )
+        logger.info("Connected to PostgreSQL with pgvector")
+
     async def disconnect(self) -> None:
         """Disconnect from PostgreSQL"""
-        # TODO: Implement disconnection
-        # if self.pool:
-        #     await self.pool.close()
-        
-        logger.info("TODO: Disconnect from PostgreSQL")
-    
-    async def create_collection(self, name: str, dimension: int = 1536) -> None:
-        """Create table for vector storage"""
-        # TODO: Implement collection creation
-        # create_table_sql = f"""
-        # CREATE TABLE IF NOT EXISTS {name} (
-        #     id TEXT PRIMARY KEY,
-        #     content TEXT,
-        #     metadata JSONB,
-        #     embedding VECTOR({dimension})
-        # );
-        # """
-        # 
-        # create_index_sql = f"""
-        # CREATE INDEX IF NOT EXISTS {name}_embedding_idx 
-        # ON {name} USING ivfflat (embedding vector_cosine_ops) 
-        # WITH (lists = 100);
-        # """
-        # 
-        # async with self.pool.acquire() as conn:
-        #     await conn.execute(create_table_sql)
-        #     await conn.execute(create_index_sql)
-        
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+            logger.info("Disconnected from PostgreSQL")
+
+    async def create_collection(
+        self,
+        name: str,
+        dimension: int = 1536,
+        index_spec: Optional[IndexSpec] = None
+    ) -> None:
+        """Create table for vector storage with a per-collection index spec"""
+        spec = index_spec or IndexSpec.from_env()
+        async with self.pool.acquire() as conn:
+            self.index_specs[name] = await ensure_collection(conn, name, dimension, spec)
+
         self.dimension = dimension
-        logger.info(f"TODO: Create collection {name} with dimension {dimension}")
-    
+        logger.info(f"Created collection {name} with dimension {dimension} ({spec.kind} index)")
+
+    async def rebuild_index(self, name: str, index_spec: Optional[IndexSpec] = None) -> None:
+        """Rebuild the collection index, optionally switching to a new spec"""
+        async with self.pool.acquire() as conn:
+            spec = index_spec or await self._get_index_spec(conn, name) or IndexSpec.from_env()
+            self.index_specs[name] = await rebuild_collection_index(conn, name, spec)
+
+        logger.info(f"Rebuilt {spec.kind} index for collection {name}")
+
     async def delete_collection(self, name: str) -> None:
         """Delete table"""
-        # TODO: Implement collection deletion
-        # async with self.pool.acquire() as conn:
-        #     await conn.execute(f"DROP TABLE IF EXISTS {name};")
-        
-        logger.info(f"TODO: Delete collection {name}")
-    
+        async with self.pool.acquire() as conn:
+            await conn.execute(f"DROP TABLE IF EXISTS {quote_ident(name)};")
+            await delete_index_spec(conn, name)
+        self.index_specs.pop(name, None)
+
+        logger.info(f"Deleted collection {name}")
+
+    async def _get_index_spec(self, conn, collection: str) -> Optional[IndexSpec]:
+        if collection not in self.index_specs:
+            self.index_specs[collection] = await load_index_spec(conn, collection)
+        return self.index_specs[collection]
+
     async def upsert_documents(
-        self, 
-        collection: str, 
+        self,
+        collection: str,
         documents: List[VectorDocument]
     ) -> None:
-        """Insert or update documents"""
-        # TODO: Implement document upsert
-        # upsert_sql = f"""
-        # INSERT INTO {collection} (id, content, metadata, embedding)
-        # VALUES ($1, $2, $3, $4)
-        # ON CONFLICT (id) DO UPDATE SET
-        #     content = EXCLUDED.content,
-        #     metadata = EXCLUDED.metadata,
-        #     embedding = EXCLUDED.embedding;
-        # """
-        # 
-        # async with self.pool.acquire() as conn:
-        #     for doc in documents:
-        #         await conn.execute(
-        #             upsert_sql,
-        #             doc.id,
-        #             doc.content,
-        #             doc.metadata,
-        #             doc.embedding
-        #         )
-        
-        logger.info(f"TODO: Upsert {len(documents)} documents to {collection}")
-    
+        """Insert or update documents.
+
+        Rows are streamed into a temporary staging table with binary COPY and
+        merged into the collection with a single INSERT ... ON CONFLICT, so the
+        cost is one round trip per batch rather than one per document.
+        """
+        if not documents:
+            return
+
+        documents = dedupe_documents(documents)
+        async with self.pool.acquire() as conn:
+            await copy_upsert_documents(conn, collection, documents)
+
+        logger.info(f"Upserted {len(documents)} documents to {collection}")
+
     async def search(
         self,
         collection: str,
-        query_vector: List[float],
+        query_vector: Vector,
         limit: int = 10,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        recall_target: Optional[float] = None
     ) -> List[SearchResult]:
-        """Search using cosine similarity"""
-        # TODO: Implement vector search
-        # where_clause = ""
-        # params = [query_vector, limit]
-        # 
-        # if filter_metadata:
-        #     conditions = []
-        #     for key, value in filter_metadata.items():
-        #         conditions.append(f"metadata->>'{key}' = ${len(params)+1}")
-        #         params.append(str(value))
-        #     where_clause = "WHERE " + " AND ".join(conditions)
-        # 
-        # search_sql = f"""
-        # SELECT id, content, metadata, 1 - (embedding <=> $1) as score
-        # FROM {collection}
-        # {where_clause}
-        # ORDER BY embedding <=> $1
-        # LIMIT $2;
-        # """
-        # 
-        # async with self.pool.acquire() as conn:
-        #     rows = await conn.fetch(search_sql, *params)
-        #     return [
-        #         SearchResult(
-        #             id=row['id'],
-        #             content=row['content'],
-        #             metadata=row['metadata'],
-        #             score=row['score']
-        #         )
-        #         for row in rows
-        #     ]
-        
-        # Mock results for development
+        """Search using cosine similarity.
+
+        ef_search / probes are set per query from ``recall_target`` (defaults
+        to the store's target) and the collection's index spec. Filters take
+        Pinecone syntax ($eq, $in, $gt, ...) and run against indexed JSONB.
+        """
+        async with self.pool.acquire() as conn:
+            spec = await self._get_index_spec(conn, collection)
+            rows = await search_collection(
+                conn, collection, query_vector, limit, filter_metadata,
+                spec, recall_target or self.recall_target,
+            )
+
         return [
             SearchResult(
-                id="doc_1",
-                content="Sample document content",
-                metadata={"type": "rfp", "project_id": "proj_1"},
-                score=0.95
+                id=row["id"],
+                content=row["content"],
+                metadata=row["metadata"] or {},
+                score=row["score"]
             )
+            for row in rows
         ]
-    
+
     async def delete_documents(
         self,
         collection: str,
         document_ids: List[str]
     ) -> None:
         """Delete documents by ID"""
-        # TODO: Implement document deletion
-        # delete_sql = f"DELETE FROM {collection} WHERE id = ANY($1);"
-        # async with self.pool.acquire() as conn:
-        #     await conn.execute(delete_sql, document_ids)
-        
-        logger.info(f"TODO: Delete {len(document_ids)} documents from {collection}")
-    
+        delete_sql = f"DELETE FROM {quote_ident(collection)} WHERE id = ANY($1::text[]);"
+        async with self.pool.acquire() as conn:
+            await conn.execute(delete_sql, document_ids)
+
+        logger.info(f"Deleted {len(document_ids)} documents from {collection}")
+
     async def get_document(
         self,
         collection: str,
         document_id: str
     ) -> Optional[VectorDocument]:
         """Get specific document"""
-        # TODO: Implement document retrieval
-        # select_sql = f"""
-        # SELECT id, content, metadata, embedding
-        # FROM {collection}
-        # WHERE id = $1;
-        # """
-        # 
-        # async with self.pool.acquire() as conn:
-        #     row = await conn.fetchrow(select_sql, document_id)
-        #     if row:
-        #         return VectorDocument(
-        #             id=row['id'],
-        #             content=row['content'],
-        #             metadata=row['metadata'],
-        #             embedding=row['embedding']
-        #         )
-        
-        return None
-    
+        select_sql = f"""
+        SELECT id, content, metadata, embedding
+        FROM {quote_ident(collection)}
+        WHERE id = $1;
+        """
+
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(select_sql, document_id)
+
+        if not row:
+            return None
+        embedding = row["embedding"]
+        return VectorDocument(
+            id=row["id"],
+            content=row["content"],
+            metadata=row["metadata"] or {},
+            embedding=embedding.to_list() if hasattr(embedding, "to_list") else list(embedding)
+        )
+
     async def list_collections(self) -> List[str]:
-        """List all collections (tables)"""
-        # TODO: Implement collection listing
-        # list_sql = """
-        # SELECT tablename FROM pg_tables 
-        # WHERE schemaname = 'public' 
-        # AND tablename NOT LIKE 'pg_%' 
-        # AND tablename NOT LIKE 'sql_%';
-        # """
-        # 
-        # async with self.pool.acquire() as conn:
-        #     rows = await conn.fetch(list_sql)
-        #     return [row['tablename'] for row in rows]
-        
-        return ["sample_collection"]
-    
+        """List all collections (tables with a vector embedding column)"""
+        list_sql = """
+        SELECT table_name FROM information_schema.columns
+        WHERE table_schema = 'public'
+        AND column_name = 'embedding'
+        AND udt_name = 'vector';
+        """
+
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(list_sql)
+        return [row["table_name"] for row in rows]
+
     async def get_collection_stats(self, collection: str) -> Dict[str, Any]:
         """Get collection statistics"""
-        # TODO: Implement stats collection
-        # stats_sql = f"SELECT COUNT(*) as count FROM {collection};"
-        # async with self.pool.acquire() as conn:
-        #     row = await conn.fetchrow(stats_sql)
-        #     return {
-        #         "document_count": row['count'],
-        #         "dimension": self.dimension
-        #     }
-        
+        table = quote_ident(collection)
+        async with self.pool.acquire() as conn:
+            count = await conn.fetchval(f"SELECT COUNT(*) FROM {table};")
+            dimension = await conn.fetchval(
+                "SELECT atttypmod FROM pg_attribute "
+                "WHERE attrelid = $1::regclass AND attname = 'embedding';",
+                table,
+            )
+
         return {
-            "document_count": 0,
-            "dimension": self.dimension
+            "document_count": count,
+            "dimension": dimension if dimension and dimension > 0 else self.dimension
         }
-
@@ -3,7 +3,7 @@ Pinecone vector store implementation
 """
 import logging
 from typing import List, Dict, Any, Optional
-from .base import BaseVectorStore, VectorDocument, SearchResult
+from .base import BaseVectorStore, VectorDocument, SearchResult, Vector
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +93,7 @@ class PineconeStore(BaseVectorStore):
     async def search(
         self,
         collection: str,
-        query_vector: List[float],
+        query_vector: Vector,
         limit: int = 10,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[SearchResult]:
@@ -0,0 +1,100 @@
+"""
+Compact embedding codes for first-pass scoring, rescored with float vectors
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+QUANTIZATION_KINDS = ("none", "int8", "binary")
+
+# Candidates rescored with full-precision vectors, as a multiple of the limit
+DEFAULT_RESCORE_FACTOR = {"int8": 4, "binary": 10}
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(codes: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[codes]
+
+
+class Int8Quantizer:
+    """Symmetric per-dimension scalar quantization to int8 (4x smaller than float32).
+
+    The per-dimension scale tracks the largest magnitude seen so far; when a
+    batch exceeds it, ``update`` returns True and existing codes must be
+    re-encoded.
+    """
+    kind = "int8"
+    code_dtype = np.int8
+
+    def __init__(self, dimension: int, scale: Optional[np.ndarray] = None):
+        self.dimension = dimension
+        self.scale = scale if scale is not None else np.zeros(dimension, dtype=np.float32)
+
+    def code_width(self) -> int:
+        return self.dimension
+
+    def update(self, matrix: np.ndarray) -> bool:
+        peak = np.abs(matrix).max(axis=0)
+        if np.all(peak <= self.scale):
+            return False
+        self.scale = np.maximum(self.scale, peak).astype(np.float32)
+        return True
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        scale = np.where(self.scale > 0, self.scale, 1.0)
+        return np.clip(np.rint(matrix / scale * 127), -127, 127).astype(np.int8)
+
+    def prepare_query(self, query: np.ndarray) -> np.ndarray:
+        # x ~= code * scale / 127, so x . q ~= code . (q * scale / 127)
+        return (query * (self.scale / 127)[:, None] if query.ndim == 2 else query * self.scale / 127).astype(np.float32)
+
+    def scores(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ prepared
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"scale": self.scale}
+
+
+class BinaryQuantizer:
+    """Sign bits packed 8 per byte (32x smaller than float32), scored by Hamming distance"""
+    kind = "binary"
+    code_dtype = np.uint8
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def code_width(self) -> int:
+        return (self.dimension + 7) // 8
+
+    def update(self, matrix: np.ndarray) -> bool:
+        return False
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        return np.packbits(matrix > 0, axis=1)
+
+    def prepare_query(self, query: np.ndarray) -> np.ndarray:
+        return np.packbits(query > 0)
+
+    def scores(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        if codes.shape[1] % 8 == 0 and codes.flags.c_contiguous:
+            # Popcount 64 bits at a time
+            codes, prepared = codes.view(np.uint64), prepared.view(np.uint64)
+        hamming = _popcount(np.bitwise_xor(codes, prepared)).sum(axis=1, dtype=np.int32)
+        return (self.dimension - 2 * hamming).astype(np.float32)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+
+def create_quantizer(kind: str, dimension: int, state: Optional[Dict[str, np.ndarray]] = None):
+    """Quantizer for ``kind``, or None for full-precision storage only"""
+    if kind not in QUANTIZATION_KINDS:
+        raise ValueError(f"Unsupported quantization '{kind}'. Available: {list(QUANTIZATION_KINDS)}")
+    if kind == "int8":
+        return Int8Quantizer(dimension, scale=(state or {}).get("scale"))
+    if kind == "binary":
+        return BinaryQuantizer(dimension)
+    return None
@@ -0,0 +1,196 @@
+"""
+Process-wide write-coalescing buffer for vector upserts
+
+Every vectorization job used to upsert its own small batches, so a run over
+many small files issued dozens of tiny requests. Jobs now add their vectors
+here; pending vectors for the same index and namespace are merged across
+jobs into requests of up to UPSERT_BUFFER_MAX_VECTORS vectors (and
+UPSERT_BUFFER_MAX_BYTES of payload). A partial request is sent once its
+oldest vector has waited UPSERT_BUFFER_MAX_DELAY seconds.
+
+add() returns a future that resolves when all of the call's vectors have
+been written (or fails with the first error); a file is only durable once
+the futures of all its batches have resolved. add() itself waits while more
+than UPSERT_BUFFER_MAX_PENDING vectors are buffered, so producers slow down
+instead of piling vectors up in memory.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BUFFER_MAX_VECTORS = int(os.getenv("UPSERT_BUFFER_MAX_VECTORS", "100"))
+# Pinecone rejects upsert requests over 2 MB
+UPSERT_BUFFER_MAX_BYTES = int(os.getenv("UPSERT_BUFFER_MAX_BYTES", str(1_800_000)))
+UPSERT_BUFFER_MAX_DELAY = float(os.getenv("UPSERT_BUFFER_MAX_DELAY", "0.05"))  # seconds
+UPSERT_BUFFER_MAX_PENDING = int(os.getenv("UPSERT_BUFFER_MAX_PENDING", "2000"))
+UPSERT_BUFFER_CONCURRENCY = int(os.getenv("UPSERT_BUFFER_CONCURRENCY", "8"))
+
+Upsert = Callable[[str, str, List[Dict[str, Any]]], Awaitable[None]]
+
+
+def payload_size(vector: Dict[str, Any]) -> int:
+    """Rough JSON size of an upsert payload"""
+    return 12 * len(vector["values"]) + len(json.dumps(vector.get("metadata", {}), default=str))
+
+
+class _Waiter:
+    """Completion of one add() call, which may span several requests"""
+
+    def __init__(self, remaining: int):
+        self.future = asyncio.get_running_loop().create_future()
+        self.remaining = remaining
+
+    def done(self, count: int) -> None:
+        self.remaining -= count
+        if self.remaining <= 0 and not self.future.done():
+            self.future.set_result(None)
+
+    def fail(self, error: BaseException) -> None:
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class UpsertBuffer:
+    def __init__(
+        self,
+        upsert: Upsert,
+        max_vectors: int = UPSERT_BUFFER_MAX_VECTORS,
+        max_bytes: int = UPSERT_BUFFER_MAX_BYTES,
+        max_delay: float = UPSERT_BUFFER_MAX_DELAY,
+        max_pending: int = UPSERT_BUFFER_MAX_PENDING,
+        concurrency: int = UPSERT_BUFFER_CONCURRENCY,
+    ):
+        self.upsert = upsert
+        self.max_vectors = max(1, max_vectors)
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.max_pending = max(self.max_vectors, max_pending)
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        # (index_name, namespace) -> buffered (vector, size, waiter)
+        self._buffers: Dict[Tuple[str, str], List[Tuple[Dict[str, Any], int, _Waiter]]] = {}
+        self._buffer_bytes: Dict[Tuple[str, str], int] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._requests: set = set()
+        self._pending = 0  # vectors added but not yet written
+        self._space = asyncio.Condition()
+        self.requests = 0
+        self.vectors = 0
+        self.added_calls = 0
+
+    async def add(self, index_name: str, namespace: str, vectors: List[Dict[str, Any]]) -> "asyncio.Future[None]":
+        """Buffer vectors; the returned future resolves once they are all written"""
+        waiter = _Waiter(len(vectors))
+        if not vectors:
+            waiter.done(0)
+            return waiter.future
+        async with self._space:
+            await self._space.wait_for(lambda: self._pending < self.max_pending)
+            self._pending += len(vectors)
+        self.added_calls += 1
+
+        key = (index_name, namespace)
+        for vector in vectors:
+            size = payload_size(vector)
+            buffer = self._buffers.setdefault(key, [])
+            if buffer and (
+                len(buffer) >= self.max_vectors or self._buffer_bytes[key] + size > self.max_bytes
+            ):
+                self._send(key)
+                buffer = self._buffers.setdefault(key, [])
+            buffer.append((vector, size, waiter))
+            self._buffer_bytes[key] = self._buffer_bytes.get(key, 0) + size
+        if len(self._buffers[key]) >= self.max_vectors:
+            self._send(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.ensure_future(self._flush_later(key))
+        return waiter.future
+
+    async def upsert_now(self, index_name: str, namespace: str, vectors: List[Dict[str, Any]]) -> None:
+        """add() and wait until the vectors are written"""
+        await (await self.add(index_name, namespace, vectors))
+
+    async def flush(self) -> None:
+        """Send everything buffered and wait for all requests in flight"""
+        for key in list(self._buffers):
+            self._send(key)
+        while self._requests:
+            await asyncio.gather(*list(self._requests), return_exceptions=True)
+
+    async def _flush_later(self, key: Tuple[str, str]) -> None:
+        await asyncio.sleep(self.max_delay)
+        self._timers.pop(key, None)
+        self._send(key)
+
+    def _send(self, key: Tuple[str, str]) -> None:
+        buffer = self._buffers.pop(key, None)
+        self._buffer_bytes.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        if not buffer:
+            return
+        request = asyncio.ensure_future(self._write(key, buffer))
+        self._requests.add(request)
+        request.add_done_callback(self._requests.discard)
+
+    async def _write(self, key: Tuple[str, str], buffer: List[Tuple[Dict[str, Any], int, _Waiter]]) -> None:
+        counts: Dict[_Waiter, int] = {}
+        for _, _, waiter in buffer:
+            counts[waiter] = counts.get(waiter, 0) + 1
+        try:
+            async with self._slots:
+                await self.upsert(key[0], key[1], [vector for vector, _, _ in buffer])
+        except Exception as e:
+            logger.error(f"Buffered upsert of {len(buffer)} vectors to {key[0]}/{key[1]} failed: {e}")
+            for waiter in counts:
+                waiter.fail(e)
+        else:
+            self.requests += 1
+            self.vectors += len(buffer)
+            for waiter, count in counts.items():
+                waiter.done(count)
+        finally:
+            async with self._space:
+                self._pending -= len(buffer)
+                self._space.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "vectors": self.vectors,
+            "add_calls": self.added_calls,
+            "avg_vectors_per_request": round(self.vectors / self.requests, 1) if self.requests else 0,
+            "pending_vectors": self._pending,
+        }
+
+
+_buffer: Optional[UpsertBuffer] = None
+_buffer_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_upsert_buffer(upsert: Upsert) -> UpsertBuffer:
+    """Process-wide buffer for the running event loop.
+
+    Its futures and timers are bound to the loop, so scripts that call
+    asyncio.run() repeatedly get a fresh buffer (like the Pinecone client).
+    """
+    global _buffer, _buffer_loop
+    loop = asyncio.get_running_loop()
+    if _buffer is None or _buffer_loop is not loop:
+        _buffer = UpsertBuffer(upsert)
+        _buffer_loop = loop
+    return _buffer
+
+
+def get_upsert_buffer_stats() -> Dict[str, Any]:
+    return _buffer.get_stats() if _buffer is not None else {}
+
+
+async def flush_upsert_buffer() -> None:
+    """Write out buffered vectors (app shutdown)"""
+    if _buffer is not None:
+        await _buffer.flush()
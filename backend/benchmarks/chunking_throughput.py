@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Multi-file chunking throughput: event-loop chunking vs the process pool
+
+Usage (from backend/):
+    python -m benchmarks.chunking_throughput --files 32 --pages 60
+
+Chunks a batch of synthetic files the way vectorize_files_batch does, first
+inline on the event loop (as it used to), then through chunking_pool with 1,
+2, 4, ... worker processes up to the CPU count (or --max-workers). A
+heartbeat task ticks every 10 ms during each run; its worst delay is the
+longest the event loop (and with it WebSocket progress and every other
+request) was frozen.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.services import chunking_pool
+from app.services.markdown_chunker import MarkdownChunker
+from benchmarks.markdown_chunking import synthetic_pages
+
+
+async def heartbeat(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def run(files: list, workers: int) -> None:
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    chunks = 0
+    if workers == 0:
+        chunker = MarkdownChunker()
+        for file in files:
+            chunks += len(chunker.hybrid_chunk_markdown_with_headers(file["markdown"], max_tokens=500))
+    else:
+        async for _, file_chunks in chunking_pool.iter_chunked_files(files, max_tokens=500):
+            chunks += len(file_chunks)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    label = "inline" if workers == 0 else f"{workers} worker{'s' if workers > 1 else ''}"
+    print(
+        f"{label:<11} {len(files) / elapsed:7.1f} files/s  {chunks / elapsed:8.0f} chunks/s  "
+        f"max loop stall {max(lags, default=0) * 1000:7.1f} ms"
+    )
+
+
+async def measure(files: list, workers: int) -> None:
+    if workers:
+        chunking_pool.CHUNKING_WORKERS = workers
+        chunking_pool.shutdown_chunking_pool()
+        # Start the workers (spawn + imports) outside the timed run
+        await asyncio.gather(*(chunking_pool.chunk_markdown({"page_1": "# warm up"}) for _ in range(workers)))
+    await run(files, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    files = [{"id": str(i), "markdown": synthetic_pages(args.pages, seed=i)} for i in range(args.files)]
+    print(f"{args.files} files x {args.pages} pages, {os.cpu_count()} CPU(s)")
+
+    counts = [0]
+    workers = 1
+    while workers < args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(args.max_workers)
+
+    MarkdownChunker().count_tokens("")  # load the encoding outside the timings
+    for workers in counts:
+        asyncio.run(measure(files, workers))
+    chunking_pool.shutdown_chunking_pool()
+
+
+if __name__ == "__main__":
+    main()
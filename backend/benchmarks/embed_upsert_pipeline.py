@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Embed-and-upsert: one batch at a time vs the bounded pipeline
+
+Usage (from backend/):
+    python -m benchmarks.embed_upsert_pipeline --batches 40 --embed-ms 120 --upsert-ms 90
+
+Simulates embed_and_upload with fixed per-batch embedding and upsert
+latencies (asyncio.sleep stands in for the provider and Pinecone calls).
+"before" awaits each upsert before embedding the next batch, as
+embed_and_upload used to; "after" runs the same batches through
+run_pipeline at several queue depths and upsert worker counts, and prints
+the per-stage stats that show which side is the bottleneck.
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.embed_pipeline import run_pipeline
+
+
+async def main_async(args) -> None:
+    async def embed(batch: int) -> int:
+        await asyncio.sleep(args.embed_ms / 1000)
+        return batch
+
+    async def upsert(batch: int) -> None:
+        await asyncio.sleep(args.upsert_ms / 1000)
+
+    started = time.perf_counter()
+    for batch in range(args.batches):
+        await upsert(await embed(batch))
+    before = time.perf_counter() - started
+    print(f"before                    {before:6.2f} s")
+
+    for depth, workers in ((1, 1), (4, 1), (4, 2)):
+        started = time.perf_counter()
+        embed_stats, upsert_stats = await run_pipeline(range(args.batches), embed, upsert, depth, workers)
+        after = time.perf_counter() - started
+        print(f"after depth={depth} workers={workers}  {after:6.2f} s  ({before / after:.2f}x)")
+        print(f"    {embed_stats}")
+        print(f"    {upsert_stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--embed-ms", type=float, default=120)
+    parser.add_argument("--upsert-ms", type=float, default=90)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Peak memory of the embedding path: Python float lists vs float32 arrays
+
+Usage (from backend/):
+    python -m benchmarks.embedding_memory --chunks 20000 --dim 1024
+
+Embeds synthetic chunks with the offline LocalHashProvider (no network) the
+way embed_and_upload does, builds the upsert payloads and writes them to a
+LocalVectorStore, holding every embedding of the run at once as a large
+vectorize_files_batch does across its concurrent files. "lists" converts
+each batch to List[List[float]] as the pipeline used to; "float32" keeps the
+arrays. Peak traced allocations are reported for each.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("LOCAL_DATA_DIR", tempfile.mkdtemp(prefix="embedding_memory_"))
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from app.services.embeddings_service import EmbeddingsService
+from app.vector.base import VectorDocument
+from app.vector.local_store import LocalVectorStore
+
+
+def synthetic_chunks(count: int):
+    words = [f"term{i}" for i in range(5_000)]
+    for i in range(count):
+        yield " ".join(words[(i * 7 + j * 13) % len(words)] for j in range(120))
+
+
+async def run(mode: str, chunks, dim: int, batch_size: int) -> None:
+    service = EmbeddingsService(provider="local", dimensions=dim)
+    store = LocalVectorStore(tempfile.mkdtemp(prefix=f"embedding_memory_{mode}_"))
+    await store.create_collection("bench", dim)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    payloads = []
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        embeddings = await service.embed_documents(batch)
+        if mode == "lists":
+            embeddings = embeddings.tolist()
+        payloads.extend(
+            {"id": str(start + i), "values": embedding, "metadata": {"text": text}}
+            for i, (text, embedding) in enumerate(zip(batch, embeddings))
+        )
+    await store.upsert_documents("bench", [
+        VectorDocument(id=p["id"], content="", metadata={}, embedding=p["values"]) for p in payloads
+    ])
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{mode:<8} peak {peak / 2**20:9.1f} MB  {len(chunks) / elapsed:8.0f} chunks/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    chunks = list(synthetic_chunks(args.chunks))
+    for mode in ("lists", "float32"):
+        asyncio.run(run(mode, chunks, args.dim, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
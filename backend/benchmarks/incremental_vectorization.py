@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Incremental re-vectorization: chunks re-embedded after a light edit
+
+Usage (from backend/):
+    python -m benchmarks.incremental_vectorization --pages 200 --edits 3
+
+Chunks a synthetic RFP the way vectorize_files_batch does, edits one
+sentence on --edits pages, chunks it again and diffs the deterministic chunk
+IDs the way sync_file_vectors does. Before, a reprocess deleted the file's
+vectors and re-embedded every chunk; now only added chunks are embedded and
+only vanished ones deleted.
+"""
+import argparse
+import random
+
+from app.services.markdown_chunker import MarkdownChunker
+from app.services.vectorization_service import chunk_ids
+from benchmarks.markdown_chunking import synthetic_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=3)
+    args = parser.parse_args()
+
+    chunker = MarkdownChunker()
+    metadata = {"file_id": "rfp", "project_id": "project", "user_id": "user"}
+    pages = synthetic_pages(args.pages)
+    chunks = chunker.hybrid_chunk_markdown_with_headers(
+        pages, max_tokens=500, add_image_metadata=True, add_table_metadata=True
+    )
+    stored = chunk_ids("rfp", chunks, metadata)
+
+    rng = random.Random(11)
+    edited = dict(pages)
+    for page in rng.sample(sorted(pages), args.edits):
+        edited[page] = edited[page].replace(".", ", as amended.", 1)
+    chunks = chunker.hybrid_chunk_markdown_with_headers(
+        edited, max_tokens=500, add_image_metadata=True, add_table_metadata=True
+    )
+    ids = chunk_ids("rfp", chunks, metadata)
+
+    stored_ids, wanted = set(stored), set(ids)
+    added = sum(id not in stored_ids for id in ids)
+    deleted = sum(id not in wanted for id in stored)
+    print(
+        f"{args.pages} pages, {args.edits} edited: {len(ids)} chunks  "
+        f"before: embed {len(ids)}, delete {len(stored)}  after: embed {added}, delete {deleted}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Footprint, QPS and recall@10 of int8 / binary quantized local collections
+
+Usage (from backend/):
+    python -m benchmarks.local_vector_quantization --rows 100000 --dim 1024
+
+Loads synthetic embeddings into LocalVectorStore collections with
+quantization none, int8 and binary, then reports the bytes held for the
+first-pass scan (float matrix or codes), queries per second and recall@k
+against exact float32 ground truth, for a range of rescore factors.
+
+Real text embeddings concentrate in a low-dimensional subspace, which is what
+makes sign bits informative; --latent-dim controls that (0 = isotropic
+clusters as in pgvector_recall, the worst case for binary codes).
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+
+from app.vector.base import VectorDocument
+from app.vector.local_store import LocalVectorStore
+from benchmarks.pgvector_recall import synthetic_embeddings
+
+
+def low_rank_embeddings(rows: int, dim: int, latent_dim: int, projection: np.ndarray, rng: np.random.Generator):
+    vectors = rng.standard_normal((rows, latent_dim), dtype=np.float32) @ projection
+    vectors += 0.1 * rng.standard_normal((rows, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--latent-dim", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.latent_dim:
+        projection = rng.standard_normal((args.latent_dim, args.dim), dtype=np.float32)
+        data = low_rank_embeddings(args.rows, args.dim, args.latent_dim, projection, rng)
+        queries = low_rank_embeddings(args.queries, args.dim, args.latent_dim, projection, rng)
+    else:
+        data = synthetic_embeddings(args.rows, args.dim, args.clusters, rng)
+        queries = synthetic_embeddings(args.queries, args.dim, args.clusters, np.random.default_rng(0))
+        queries += 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+
+    runs = [("none", None), ("int8", 1), ("int8", 4), ("binary", 4), ("binary", 10), ("binary", 30)]
+    print(f"{'quantization':<12} {'rescore':>7} {'scan MB':>8} {'QPS':>8} {'recall@' + str(args.k):>10}")
+    with tempfile.TemporaryDirectory() as root:
+        for quantization, rescore in runs:
+            store = LocalVectorStore(root, quantization=quantization, rescore_factor=rescore)
+            await store.connect()
+            await store.create_collection("bench_quant", args.dim)
+            for start in range(0, args.rows, 5_000):
+                await store.upsert_documents("bench_quant", [
+                    VectorDocument(id=str(i), content="", metadata={}, embedding=data[i])
+                    for i in range(start, min(start + 5_000, args.rows))
+                ])
+            stats = await store.get_collection_stats("bench_quant")
+            scan_bytes = stats["code_bytes"] or stats["vector_bytes"]
+
+            hits = 0
+            t0 = time.perf_counter()
+            for q, expected in zip(queries, truth):
+                results = await store.search("bench_quant", q, args.k)
+                hits += len({int(r.id) for r in results} & set(expected.tolist()))
+            elapsed = time.perf_counter() - t0
+
+            print(f"{quantization:<12} {rescore or '-':>7} {scan_bytes / 1e6:>8.1f} "
+                  f"{len(queries) / elapsed:>8.1f} {hits / (args.k * len(queries)):>10.3f}")
+            await store.delete_collection("bench_quant")
+            await store.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Recall@k and latency of the embedded LocalVectorStore (no database needed)
+
+Usage (from backend/):
+    python -m benchmarks.local_vector_search --rows 100000 --dim 256
+
+Loads the same clustered synthetic data as benchmarks/pgvector_recall.py into
+flat and IVF collections (float32 and float16) in a temporary directory and
+reports recall@k against numpy ground truth alongside query latency.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.vector.base import VectorDocument
+from app.vector.local_store import LocalVectorStore
+from benchmarks.pgvector_recall import synthetic_embeddings
+
+
+async def run(store: LocalVectorStore, data, queries, truth, k: int, label: str):
+    collection = "bench_local"
+    await store.create_collection(collection, data.shape[1])
+    t0 = time.perf_counter()
+    for start in range(0, len(data), 5_000):
+        await store.upsert_documents(collection, [
+            VectorDocument(id=str(i), content="", metadata={"shard": i % 10}, embedding=data[i])
+            for i in range(start, min(start + 5_000, len(data)))
+        ])
+    load_s = time.perf_counter() - t0
+
+    for filters in (None, {"shard": {"$in": [1, 2]}}):
+        hits, expected_total, latencies = 0, 0, []
+        for q, expected in zip(queries, truth):
+            if filters:
+                expected = [i for i in np.argsort(-(data @ q)) if i % 10 in (1, 2)][:k]
+            t0 = time.perf_counter()
+            results = await store.search(collection, q, k, filters)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len({int(r.id) for r in results} & set(int(i) for i in expected))
+            expected_total += len(expected)
+        p95 = sorted(latencies)[int(len(latencies) * 0.95)]
+        print(f"{label:<14} {'filtered' if filters else 'all':<9} {hits / expected_total:>9.3f} "
+              f"{statistics.mean(latencies):>8.2f} {p95:>8.2f} {load_s:>8.1f}")
+    await store.delete_collection(collection)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--probes", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = synthetic_embeddings(args.rows, args.dim, args.clusters, rng)
+    queries = synthetic_embeddings(args.queries, args.dim, args.clusters, np.random.default_rng(0))
+    queries += 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+
+    print(f"{'store':<14} {'filter':<9} {'recall@' + str(args.k):>9} {'mean ms':>8} {'p95 ms':>8} {'load s':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        for dtype in ("float32", "float16"):
+            for index in ("flat", "ivf"):
+                store = LocalVectorStore(root, dtype=dtype, index=index, ivf_probes=args.probes)
+                await store.connect()
+                await run(store, data, queries, truth, args.k, f"{index}/{dtype}")
+                await store.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
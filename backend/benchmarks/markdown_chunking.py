@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Markdown chunking: re-tokenizing merge buffers vs incremental token counts
+
+Usage (from backend/):
+    python -m benchmarks.markdown_chunking --pages 300
+
+Chunks a synthetic RFP-sized document (headed sections, many short
+paragraphs, tables and image references on every page) with both hybrid chunkers. "before"
+is the previous merge loop, which looked up the tiktoken encoding and encoded
+the whole combined buffer for every merge attempt; "after" is the current
+chunker, which tokenizes each split once and only re-counts the seam. Both must produce identical chunks. Needs the tiktoken encoding for the
+model to be available (downloaded or cached); otherwise counts are estimates.
+"""
+import argparse
+import copy
+import random
+import time
+
+import tiktoken
+from langchain.text_splitter import MarkdownHeaderTextSplitter
+
+from app.services.markdown_chunker import MarkdownChunker, PageChunk
+
+WORDS = (
+    "the vendor shall provide support for all services described in this section including "
+    "maintenance reporting security compliance pricing schedule deliverables and acceptance"
+).split()
+
+
+def synthetic_pages(count: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+
+    def sentence() -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+
+    pages = {}
+    for page in range(1, count + 1):
+        parts = [f"# Section {page}"] if page % 5 == 1 else []
+        for block in range(rng.randint(8, 20)):
+            kind = rng.random()
+            if kind < 0.08:
+                parts.append(f"## Requirement {page}.{block}")
+            elif kind < 0.3:
+                rows = [f"| {rng.choice(WORDS)} | {rng.randint(1, 999)} | {rng.choice(WORDS)} |" for _ in range(rng.randint(2, 6))]
+                parts.append("| Item | Qty | Notes |\n|---|---|---|\n" + "\n".join(rows))
+            elif kind < 0.35:
+                parts.append(f"![figure {page}.{block}](images/page_{page}_{block}.png)")
+            else:
+                parts.append(" ".join(sentence() for _ in range(rng.randint(1, 3))))
+        pages[f"page_{page}"] = "\n\n".join(parts)
+    return pages
+
+
+def count_tokens_before(text: str, model: str = "gpt-4") -> int:
+    encoding = tiktoken.encoding_for_model(model)
+    return len(encoding.encode(text))
+
+
+def merge_pages_before(service: MarkdownChunker, pages: dict, max_tokens: int = 1024, model: str = "gpt-4"):
+    splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=[("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")], strip_headers=False
+    )
+    all_chunks = [
+        PageChunk(content=split.page_content, page_numbers=[f"page_{i+1}"], metadata=split.metadata)
+        for i in range(len(pages))
+        for split in splitter.split_text(pages[f"page_{i+1}"])
+    ]
+    merged, current = [], None
+    for chunk in all_chunks:
+        if current is None:
+            current = chunk
+            continue
+        if not service.has_header(chunk.metadata) or chunk.page_numbers[0] == current.page_numbers[0]:
+            combined = current.content + "\n" + chunk.content
+            if count_tokens_before(combined, model) <= max_tokens:
+                current.content = combined
+                current.page_numbers = sorted(set(current.page_numbers + chunk.page_numbers))
+                if chunk.metadata:
+                    current.metadata = current.metadata or {}
+                    current.metadata.update(chunk.metadata)
+                continue
+        merged.append(current)
+        current = chunk
+    if current is not None:
+        merged.append(current)
+    return merged
+
+
+def merge_headers_before(service: MarkdownChunker, pages: dict, max_tokens: int = 500, model: str = "gpt-4"):
+    splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=[("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")], strip_headers=True
+    )
+    all_chunks = []
+    for i in range(len(pages)):
+        for split in splitter.split_text(pages[f"page_{i+1}"]):
+            # Synthetic splits stay far below model_max_tokens; the size check still tokenizes them
+            count_tokens_before(split.page_content)
+            all_chunks.append(PageChunk(content=split.page_content, page_numbers=[f"page_{i+1}"], metadata=split.metadata))
+    merged, current = [], None
+    for chunk in all_chunks:
+        if current is None:
+            current = chunk
+            continue
+        combined = f"{current.content}\n{chunk.content}"
+        if not service.has_header(chunk.metadata) and count_tokens_before(combined, model) <= max_tokens:
+            current.content = combined
+            current.page_numbers = sorted(set(current.page_numbers + chunk.page_numbers))
+            if chunk.metadata:
+                current.metadata = current.metadata or {}
+                current.metadata.update(chunk.metadata)
+        else:
+            merged.append(current)
+            if not chunk.metadata:
+                chunk.metadata = current.metadata
+            current = chunk
+    if current is not None:
+        merged.append(current)
+    for chunk in merged:
+        headers = [
+            f"{'#' * int(level[-1])} {chunk.metadata[level]}"
+            for level in ("Header 1", "Header 2", "Header 3")
+            if chunk.metadata.get(level)
+        ]
+        if headers:
+            chunk.content = "\n".join(headers) + "\n" + chunk.content
+    return merged
+
+
+def split_only(pages: dict, strip_headers: bool) -> None:
+    """Header splitting alone, which both versions share"""
+    splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=[("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")], strip_headers=strip_headers
+    )
+    for page in pages.values():
+        splitter.split_text(page)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+    service = MarkdownChunker()
+    print(f"{args.pages} pages, {sum(len(page) for page in pages.values()) / 1024:.0f} KiB of markdown")
+
+    service.count_tokens("warm up")  # load the encoding outside the timings
+
+    cases = (
+        ("with_headers", merge_headers_before, service.hybrid_chunk_markdown_with_headers, True),
+        ("with_pages", merge_pages_before, service.hybrid_chunk_markdown_with_pages, False),
+    )
+    for name, before_fn, after_fn, strip_headers in cases:
+        _, split_seconds = timed(split_only, pages, strip_headers)
+        before, before_seconds = timed(before_fn, service, copy.deepcopy(pages))
+        after, after_seconds = timed(after_fn, copy.deepcopy(pages))
+        identical = [(c.content, c.page_numbers) for c in before] == [(c.content, c.page_numbers) for c in after]
+        # Token counting and merging, without the shared header splitting
+        before_merge, after_merge = before_seconds - split_seconds, after_seconds - split_seconds
+        print(
+            f"{name:<13} before {before_seconds * 1000:8.1f} ms  after {after_seconds * 1000:8.1f} ms  "
+            f"(counting+merge {before_merge * 1000:7.1f} -> {after_merge * 1000:6.1f} ms, "
+            f"{before_merge / max(after_merge, 1e-6):5.1f}x)  {len(after)} chunks  identical={identical}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Markdown structure: one regex pass per question vs the single-pass parser
+
+Usage (from backend/):
+    python -m benchmarks.markdown_structure --pages 300
+
+Runs every structural question the pipeline asks of a page of markdown on a
+synthetic RFP-sized document with table reference tags. "before" is the
+previous code: has_image and has_table recompiling their regexes per call,
+the VERBOSE table regex plus row splitting for table extraction, and the
+search-time extract_table_names/extract_image_names scans. "after" is one
+parse_markdown call per page. Both must find the same tables, rows, image
+names and table names.
+"""
+import argparse
+import re
+import time
+
+from app.services.markdown_structure import parse_markdown
+from benchmarks.markdown_chunking import synthetic_pages
+
+TABLE_PATTERN = r"""(
+    (?:^\|.*\|\s*\n)+
+    ^\|(?:\s*:?-+:?\s*\|)+\s*\n
+    (?:^\|.*\|\s*\n?)*
+)"""
+
+
+def with_table_references(pages: dict) -> dict:
+    """Tag each table the way extract_tables_from_markdown does"""
+    pattern = re.compile(TABLE_PATTERN, re.MULTILINE | re.VERBOSE)
+    counter = iter(range(10**9))
+    return {
+        page: pattern.sub(lambda m: f"<!--TABLE_REFERENCE: table-{next(counter)}-->\n{m.group(0).strip()}\n", text)
+        for page, text in pages.items()
+    }
+
+
+def structure_before(text: str):
+    has_image = len(re.compile(r'!\[([^\]]*)\]\(([^)]+)\)').findall(text)) > 0
+    has_table = len(re.compile(TABLE_PATTERN, re.MULTILINE | re.VERBOSE).findall(text)) > 0
+    tables = []
+    for match in re.compile(TABLE_PATTERN, re.MULTILINE | re.VERBOSE).finditer(text):
+        lines = [line for line in match.group(0).strip().splitlines() if not re.match(r'^\|\s*:?-+:?\s*\|', line)]
+        tables.append([[cell.strip() for cell in re.split(r'\s*\|\s*', line.strip('|'))] for line in lines])
+    table_names = {name.strip() for name in re.compile(r'<!--TABLE_REFERENCE:\s*([^>]+)-->').findall(text)}
+    image_names = {src.split('/')[-1] for _, src in re.compile(r'!\[([^\]]*)\]\(([^)]+)\)').findall(text)}
+    return has_image, has_table, tables, sorted(table_names), sorted(image_names)
+
+
+def structure_after(text: str):
+    structure = parse_markdown(text)
+    return (
+        bool(structure.images),
+        bool(structure.tables),
+        [table.rows for table in structure.tables],
+        structure.table_names,
+        structure.image_names,
+    )
+
+
+def timed(fn, pages: dict):
+    started = time.perf_counter()
+    result = [fn(text) for text in pages.values()]
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = with_table_references(synthetic_pages(args.pages))
+    print(f"{args.pages} pages, {sum(len(page) for page in pages.values()) / 1024:.0f} KiB of markdown")
+
+    before_best = after_best = float("inf")
+    for _ in range(args.repeat):
+        before, seconds = timed(structure_before, pages)
+        before_best = min(before_best, seconds)
+        after, seconds = timed(structure_after, pages)
+        after_best = min(after_best, seconds)
+    print(
+        f"before {before_best * 1000:8.1f} ms  after {after_best * 1000:8.1f} ms  "
+        f"({before_best / max(after_best, 1e-9):4.1f}x)  identical={before == after}"
+    )
+
+
+if __name__ == "__main__":
+    main()
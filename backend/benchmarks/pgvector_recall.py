@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Recall@k vs latency for pgvector index specs over synthetic data
+
+Usage (from backend/):
+    SUPABASE_DB_URL=postgresql://... python -m benchmarks.pgvector_recall --rows 20000 --dim 256
+
+Loads clustered synthetic embeddings into one collection per index kind
+(exact, ivfflat, hnsw), then sweeps recall targets and reports measured
+recall@k against numpy brute-force ground truth alongside query latency.
+Use it to re-calibrate HNSW_EF_SEARCH / IVFFLAT_PROBE_FACTOR in
+app/vector/index_spec.py.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import numpy as np
+
+from app.vector.base import VectorDocument
+from app.vector.index_spec import IndexSpec
+from app.vector.pgvector_store import PgVectorStore
+
+RECALL_TARGETS = [0.90, 0.95, 0.98, 0.99]
+
+
+def synthetic_embeddings(rows: int, dim: int, clusters: int, rng: np.random.Generator):
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, rows)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((rows, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = synthetic_embeddings(args.rows, args.dim, args.clusters, rng)
+    queries = synthetic_embeddings(args.queries, args.dim, args.clusters, np.random.default_rng(0))
+    queries += 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+
+    store = PgVectorStore(os.environ["SUPABASE_DB_URL"])
+    await store.connect()
+    specs = [IndexSpec(kind="exact"), IndexSpec(kind="ivfflat"), IndexSpec(kind="hnsw")]
+
+    print(f"{'index':<8} {'target':>6} {'recall@' + str(args.k):>10} {'mean ms':>8} {'p95 ms':>8}")
+    try:
+        for spec in specs:
+            collection = f"bench_recall_{spec.kind}"
+            await store.delete_collection(collection)
+            await store.create_collection(collection, args.dim, index_spec=spec)
+            for start in range(0, args.rows, 5_000):
+                await store.upsert_documents(collection, [
+                    VectorDocument(id=str(i), content="", metadata={}, embedding=data[i])
+                    for i in range(start, min(start + 5_000, args.rows))
+                ])
+            t0 = time.perf_counter()
+            await store.rebuild_index(collection)
+            build_s = time.perf_counter() - t0
+
+            targets = RECALL_TARGETS if spec.kind != "exact" else [1.0]
+            for target in targets:
+                hits, latencies = 0, []
+                for q, expected in zip(queries, truth):
+                    t0 = time.perf_counter()
+                    results = await store.search(collection, q, args.k, recall_target=target)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    hits += len({int(r.id) for r in results} & set(expected.tolist()))
+                recall = hits / (args.k * len(queries))
+                p95 = sorted(latencies)[int(len(latencies) * 0.95)]
+                print(f"{spec.kind:<8} {target:>6.2f} {recall:>10.3f} "
+                      f"{statistics.mean(latencies):>8.2f} {p95:>8.2f}")
+            print(f"{spec.kind:<8} index build {build_s:.1f}s")
+            await store.delete_collection(collection)
+    finally:
+        await store.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
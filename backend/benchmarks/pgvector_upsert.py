@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark PgVectorStore.upsert_documents (binary COPY + single merge)
+
+Usage (from backend/):
+    SUPABASE_DB_URL=postgresql://... python -m benchmarks.pgvector_upsert --rows 100000 --dim 1024
+
+Also times the previous row-by-row INSERT ... ON CONFLICT path on a sample
+so the two numbers can be compared on the same database. Pass --drop-index
+to measure load throughput without ANN index maintenance, which otherwise
+dominates both paths.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from app.vector.base import VectorDocument
+from app.vector.pgvector_store import PgVectorStore, quote_ident
+
+
+def make_documents(start: int, count: int, dim: int, rng: np.random.Generator):
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [
+        VectorDocument(
+            id=f"chunk-{start + i}",
+            content=f"Synthetic chunk {start + i}",
+            metadata={"file_id": f"file-{(start + i) % 500}", "page_numbers": ["page_1"]},
+            embedding=vectors[i],
+        )
+        for i in range(count)
+    ]
+
+
+async def row_by_row_upsert(store: PgVectorStore, collection: str, documents):
+    sql = f"""
+    INSERT INTO {quote_ident(collection)} (id, content, metadata, embedding)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (id) DO UPDATE SET
+        content = EXCLUDED.content,
+        metadata = EXCLUDED.metadata,
+        embedding = EXCLUDED.embedding;
+    """
+    async with store.pool.acquire() as conn:
+        for doc in documents:
+            await conn.execute(sql, doc.id, doc.content, doc.metadata, doc.embedding)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--batch", type=int, default=5_000)
+    parser.add_argument("--baseline-rows", type=int, default=2_000)
+    parser.add_argument("--collection", default="bench_upsert")
+    parser.add_argument("--drop-index", action="store_true",
+                        help="Measure raw load speed without ANN index maintenance")
+    args = parser.parse_args()
+
+    store = PgVectorStore(os.environ["SUPABASE_DB_URL"])
+    await store.connect()
+    rng = np.random.default_rng(0)
+
+    try:
+        await store.delete_collection(args.collection)
+        await store.create_collection(args.collection, args.dim)
+        if args.drop_index:
+            async with store.pool.acquire() as conn:
+                await conn.execute(
+                    f"DROP INDEX IF EXISTS {quote_ident(args.collection + '_embedding_idx')};"
+                )
+
+        elapsed = 0.0
+        for start in range(0, args.rows, args.batch):
+            documents = make_documents(start, min(args.batch, args.rows - start), args.dim, rng)
+            t0 = time.perf_counter()
+            await store.upsert_documents(args.collection, documents)
+            elapsed += time.perf_counter() - t0
+        print(f"COPY upsert   : {args.rows} rows x {args.dim} dims in {elapsed:.2f}s "
+              f"-> {args.rows / elapsed:,.0f} rows/sec")
+
+        # Re-upsert the same ids to exercise the ON CONFLICT branch
+        documents = make_documents(0, min(args.batch, args.rows), args.dim, rng)
+        t0 = time.perf_counter()
+        await store.upsert_documents(args.collection, documents)
+        elapsed = time.perf_counter() - t0
+        print(f"COPY update   : {len(documents)} rows in {elapsed:.2f}s "
+              f"-> {len(documents) / elapsed:,.0f} rows/sec")
+
+        documents = make_documents(args.rows, args.baseline_rows, args.dim, rng)
+        t0 = time.perf_counter()
+        await row_by_row_upsert(store, args.collection, documents)
+        elapsed = time.perf_counter() - t0
+        print(f"Row-by-row    : {len(documents)} rows in {elapsed:.2f}s "
+              f"-> {len(documents) / elapsed:,.0f} rows/sec")
+    finally:
+        await store.delete_collection(args.collection)
+        await store.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Retrieval latency of generate_tickets_answer: per-call vs shared Pinecone client
+
+Usage (from backend/):
+    PINECONE_API_KEY=... PINECONE_INDEX_NAME=... python -m benchmarks.pinecone_client_reuse --tickets 40
+
+Replays the retrieval half of generate_tickets_answer (batches of 10 tickets
+gathered concurrently, one generate_context_for_rfp_tickets call each) twice:
+first with the previous VectorDatabase behaviour (new PineconeAsyncio plus
+describe_index on every call), then with the process-wide client. LLM calls
+are left out so the difference is the Pinecone connection overhead only.
+Pass --fixed-vector to also skip the embedding request.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import numpy as np
+from pinecone import PineconeAsyncio
+
+from app.config import vector_db
+from app.services import llm_agents, vectorization_service
+
+
+class PerCallVectorDatabase(vector_db.VectorDatabase):
+    """VectorDatabase as it was: a client and describe_index per context"""
+
+    async def __aenter__(self):
+        self.pc = PineconeAsyncio(api_key=os.getenv("PINECONE_API_KEY"))
+        index_description = await self.pc.describe_index(self.index_name)
+        self.index = self.pc.IndexAsyncio(host=index_description.host)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.index.close()
+        await self.pc.close()
+
+
+async def run_tickets(tickets: int, filters):
+    """One generate_tickets_answer worth of retrieval; returns per-ticket latencies"""
+    latencies = []
+
+    async def one(i):
+        t0 = time.perf_counter()
+        await llm_agents.generate_context_for_rfp_tickets(f"Ticket {i}: describe the requirement", filters)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    for start in range(0, tickets, 10):
+        await asyncio.gather(*[one(i) for i in range(start, min(start + 10, tickets))])
+    return (time.perf_counter() - t0) * 1000, latencies
+
+
+def report(label, total_ms, latencies):
+    ordered = sorted(latencies)
+    print(f"{label:<10} total {total_ms:8.0f} ms  per ticket p50 {statistics.median(ordered):7.1f} ms  "
+          f"p95 {ordered[int(len(ordered) * 0.95)]:7.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, default=40)
+    parser.add_argument("--file-id", default=None, help="Restrict queries to one file_id")
+    parser.add_argument("--fixed-vector", action="store_true")
+    args = parser.parse_args()
+
+    filters = {"file_id": args.file_id} if args.file_id else {}
+    if args.fixed_vector:
+        dims = int(os.getenv("EMBEDDING_DIMENSIONS", 1024))
+        vector = np.random.default_rng(0).standard_normal(dims).tolist()
+
+        async def embed_query(self, text):
+            return vector
+
+        vectorization_service.EmbeddingsService.embed_query = embed_query
+
+    original = vectorization_service.VectorDatabase
+    vectorization_service.VectorDatabase = PerCallVectorDatabase
+    report("per-call", *await run_tickets(args.tickets, filters))
+
+    vectorization_service.VectorDatabase = original
+    report("shared", *await run_tickets(args.tickets, filters))
+    await vector_db.close_vector_databases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
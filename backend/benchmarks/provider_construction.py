@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Per-request client construction overhead: fresh clients vs the provider registry
+
+Usage (from backend/):
+    OPENAI_API_KEY=... python -m benchmarks.provider_construction --requests 200
+    EMBEDDING_PROVIDER=google VERTEX_SERVICE_ACCOUNT='{...}' python -m benchmarks.provider_construction
+
+Times what a request pays before any network call: query_index building a
+VectorizationService (and with it an EmbeddingsService and provider) plus an
+agent call fetching a chat model from LLMFactory. "before" constructs the
+provider and chat model directly, as every request used to; "after" goes
+through the process-level registry. No API requests are made, so dummy keys
+work for OpenAI.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from app.config.llm_factory import LLMFactory, LLMModel
+from app.services.embeddings_service import EmbeddingsService
+from app.services.vectorization_service import VectorizationService
+
+
+def per_request_before(provider: str, model: str, dimensions: int, llm_model: LLMModel) -> None:
+    provider_class = EmbeddingsService.PROVIDERS[provider]
+    provider_class(model=model, dimensions=dimensions, batch_size=10)
+    LLMFactory._create_llm(llm_model, 0)
+
+
+def per_request_after(llm_model: LLMModel) -> None:
+    VectorizationService()
+    LLMFactory.get_llm(llm_model)
+
+
+def measure(fn, requests: int) -> list:
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    timings = sorted(timings)
+    print(
+        f"{label:<8} mean {statistics.mean(timings):8.3f} ms  "
+        f"p50 {timings[len(timings) // 2]:8.3f} ms  p99 {timings[int(len(timings) * 0.99) - 1]:8.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--llm-model", default=LLMModel.GPT_4O_MINI.value, choices=[m.value for m in LLMModel])
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    provider = os.getenv("EMBEDDING_PROVIDER", "openai")
+    model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    dimensions = int(os.getenv("EMBEDDING_DIMENSIONS", 1024))
+    llm_model = LLMModel(args.llm_model)
+
+    print(f"{args.requests} requests, embeddings {provider}/{model}, chat model {llm_model.value}")
+    before = measure(lambda: per_request_before(provider, model, dimensions, llm_model), args.requests)
+    report("before", before)
+
+    # First call builds and registers the clients; every later request reuses them
+    started = time.perf_counter()
+    per_request_after(llm_model)
+    print(f"warm-up  {(time.perf_counter() - started) * 1000:8.3f} ms (once per process)")
+    after = measure(lambda: per_request_after(llm_model), args.requests)
+    report("after", after)
+    print(f"speedup  {statistics.mean(before) / statistics.mean(after):8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+OCR of a large PDF: one whole-document request vs concurrent page shards
+
+Usage (from backend/):
+    python -m benchmarks.sharded_ocr --pages 500 --page-ms 60 --batch-ms 300
+
+Builds a PDF locally and runs process_single_file's page loop with a mocked
+OCR call (a fixed request latency plus --page-ms per page, as a
+provider that reads pages sequentially) and a mocked downstream step
+(--batch-ms per batch of 10 pages, standing in for image analysis and the
+Firestore write). "before" OCRs the whole document in one request, then
+processes its batches; "after" goes through iter_ocr_pages. Prints the time
+until the first batch is written and until the last.
+"""
+import argparse
+import asyncio
+import base64
+import time
+from types import SimpleNamespace
+
+import pymupdf
+
+from app.services.file import ocr_shards
+from app.services.file.ocr_shards import iter_ocr_pages
+
+
+def build_pdf(pages: int) -> bytes:
+    with pymupdf.Document() as doc:
+        for number in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Section {number + 1}: the vendor shall provide support and maintenance.")
+        return doc.tobytes()
+
+
+async def main_async(args) -> None:
+    pdf = build_pdf(args.pages)
+
+    async def ocr(document: dict):
+        url = document["document_url"]
+        if url.startswith("data:application/pdf;base64,"):
+            with pymupdf.Document(stream=base64.b64decode(url.split(",", 1)[1]), filetype="pdf") as shard:
+                count = shard.page_count
+        else:
+            count = args.pages
+        await asyncio.sleep(args.request_ms / 1000 + count * args.page_ms / 1000)
+        return SimpleNamespace(pages=[SimpleNamespace(index=i, markdown="text", images=[]) for i in range(count)])
+
+    async def fetch(url: str) -> bytes:
+        return pdf
+
+    async def process(pages: list, started: float, first: list) -> None:
+        for _ in range(0, len(pages), 10):
+            await asyncio.sleep(args.batch_ms / 1000)
+            if not first:
+                first.append(time.perf_counter() - started)
+
+    started, first = time.perf_counter(), []
+    await process((await ocr({"document_url": "https://example.com/rfp.pdf"})).pages, started, first)
+    before = time.perf_counter() - started
+    print(f"before  first batch {first[0]:6.2f} s  all pages {before:6.2f} s")
+
+    started, first, seen = time.perf_counter(), [], set()
+    async for pages, total in iter_ocr_pages("https://example.com/rfp.pdf", ocr, fetch=fetch):
+        seen.update(page.index for page in pages)
+        await process(pages, started, first)
+    after = time.perf_counter() - started
+    assert seen == set(range(total)) and total == args.pages
+    print(f"after   first batch {first[0]:6.2f} s  all pages {after:6.2f} s  ({before / after:.2f}x)")
+    print(f"    {ocr_shards.get_ocr_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--request-ms", type=float, default=1500)
+    parser.add_argument("--page-ms", type=float, default=60)
+    parser.add_argument("--batch-ms", type=float, default=300)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
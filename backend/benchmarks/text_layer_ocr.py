@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Large PDF ingestion: every page through OCR vs the text-layer fast path
+
+Usage (from backend/):
+    python -m benchmarks.text_layer_ocr --pages 500 --scanned 0.1 --blank 0.05
+
+Builds a PDF locally with mostly born-digital pages (headings, paragraphs,
+bullets, a ruled table), plus scanned pages (a full-page image, no text)
+and blank pages. The OCR call is mocked (a fixed request latency plus
+--page-ms per page). "before" sends every page to OCR in concurrent shards
+(iter_ocr_pages); "after" goes through iter_text_layer_pages, which reads
+born-digital pages locally, skips blank ones and OCRs only the scans.
+Prints OCR pages and cost, local extraction time and wall time.
+"""
+import argparse
+import asyncio
+import base64
+import random
+import time
+from types import SimpleNamespace
+
+import pymupdf
+
+from app.services.file import ocr_shards, text_layer
+from app.services.file.ocr_shards import iter_ocr_pages
+from app.services.file.text_layer import MISTRAL_OCR_COST_PER_PAGE, iter_text_layer_pages
+
+
+def born_digital_page(doc: "pymupdf.Document", number: int) -> None:
+    page = doc.new_page()
+    page.insert_text((72, 72), f"{number}. Requirements", fontsize=16)
+    y = 100
+    for line in range(12):
+        page.insert_text((72, y), "The vendor shall provide support, maintenance and monthly reporting for the", fontsize=10)
+        y += 13
+    for item in ("Security compliance", "Service levels", "Pricing schedule"):
+        y += 13
+        page.insert_text((72, y), f"• {item}", fontsize=10)
+    top = y + 30
+    for row, cells in enumerate((("Item", "Price"), ("Licences", "1200"), ("Support", "800"))):
+        for column, cell in enumerate(cells):
+            page.insert_text((76 + column * 150, top + row * 20 + 14), cell, fontsize=10)
+    for row in range(4):
+        page.draw_line((72, top + row * 20), (372, top + row * 20))
+    for column in range(3):
+        page.draw_line((72 + column * 150, top), (72 + column * 150, top + 60))
+
+
+def build_pdf(pages: int, scanned: float, blank: float, seed: int = 11) -> bytes:
+    rng = random.Random(seed)
+    scan = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 600, 800), False)
+    scan.clear_with(235)
+    with pymupdf.Document() as doc:
+        for number in range(pages):
+            kind = rng.random()
+            if kind < scanned:
+                page = doc.new_page()
+                page.insert_image(page.rect, pixmap=scan)
+            elif kind < scanned + blank:
+                doc.new_page()
+            else:
+                born_digital_page(doc, number + 1)
+        return doc.tobytes(garbage=1, deflate=True)
+
+
+async def main_async(args) -> None:
+    pdf = build_pdf(args.pages, args.scanned, args.blank)
+    ocr_pages = 0
+
+    async def ocr(document: dict):
+        nonlocal ocr_pages
+        url = document["document_url"]
+        if url.startswith("data:application/pdf;base64,"):
+            with pymupdf.Document(stream=base64.b64decode(url.split(",", 1)[1]), filetype="pdf") as shard:
+                count = shard.page_count
+        else:
+            count = args.pages
+        ocr_pages += count
+        await asyncio.sleep(args.request_ms / 1000 + count * args.page_ms / 1000)
+        return SimpleNamespace(pages=[SimpleNamespace(index=i, markdown="text", images=[]) for i in range(count)])
+
+    async def fetch(url: str) -> bytes:
+        return pdf
+
+    started = time.perf_counter()
+    async for pages, total in iter_ocr_pages("https://example.com/rfp.pdf", ocr, fetch=fetch):
+        pass
+    before = time.perf_counter() - started
+    print(f"before  {ocr_pages:4d} OCR pages  ${ocr_pages * MISTRAL_OCR_COST_PER_PAGE:.3f}  {before:6.2f} s")
+
+    ocr_pages, seen = 0, set()
+    started = time.perf_counter()
+    async for pages, total in iter_text_layer_pages("https://example.com/rfp.pdf", ocr, fetch=fetch):
+        seen.update(page.index for page in pages)
+    after = time.perf_counter() - started
+    assert len(seen) == total
+    stats = text_layer.get_text_layer_stats()
+    sample = sorted(seen)[:50]
+    started = time.perf_counter()
+    text_layer.read_text_layer(pdf, sample)
+    per_page = (time.perf_counter() - started) * 1000 / len(sample)
+    print(
+        f"after   {ocr_pages:4d} OCR pages  ${ocr_pages * MISTRAL_OCR_COST_PER_PAGE:.3f}  {after:6.2f} s  "
+        f"({before / after:.2f}x), text layer {per_page:.1f} ms/page"
+    )
+    print(f"    {stats}")
+    print(f"    {ocr_shards.get_ocr_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--scanned", type=float, default=0.1)
+    parser.add_argument("--blank", type=float, default=0.05)
+    parser.add_argument("--request-ms", type=float, default=1500)
+    parser.add_argument("--page-ms", type=float, default=60)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Vector upserts: one request per batch vs the write-coalescing buffer
+
+Usage (from backend/):
+    python -m benchmarks.upsert_coalescing --files 40 --request-ms 60
+
+Simulates a process_files run over many small files: each file upserts a
+few small batches concurrently with the others. asyncio.sleep stands in for
+a Pinecone upsert request. "before" sends every batch as its own request;
+"after" adds them to an UpsertBuffer and waits on each file's futures.
+Prints the request count and the time until every file is durable.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.vector.upsert_buffer import UpsertBuffer
+
+
+def file_batches(files: int, seed: int = 5) -> list:
+    rng = random.Random(seed)
+    return [
+        [[{"id": f"{f}-{b}-{v}", "values": [0.0] * 1024, "metadata": {"text": "x" * 800}}
+          for v in range(rng.randint(1, 12))]
+         for b in range(rng.randint(1, 4))]
+        for f in range(files)
+    ]
+
+
+async def main_async(args) -> None:
+    files = file_batches(args.files)
+    requests = 0
+
+    async def write(index_name: str, namespace: str, vectors: list) -> None:
+        nonlocal requests
+        requests += 1
+        await asyncio.sleep(args.request_ms / 1000)
+
+    async def file_before(batches: list) -> None:
+        for batch in batches:
+            await write("index", "pdfs", batch)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[file_before(batches) for batches in files])
+    print(f"before  {requests:4d} requests  {time.perf_counter() - started:6.2f} s")
+
+    requests = 0
+    buffer = UpsertBuffer(write)
+
+    async def file_after(batches: list) -> None:
+        durable = [await buffer.add("index", "pdfs", batch) for batch in batches]
+        await asyncio.gather(*durable)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[file_after(batches) for batches in files])
+    print(f"after   {requests:4d} requests  {time.perf_counter() - started:6.2f} s  {buffer.get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--request-ms", type=float, default=60)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
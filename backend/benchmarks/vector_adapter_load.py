@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Load test: latency of unrelated endpoints while pgvector searches run
+
+Usage (from backend/):
+    SUPABASE_DB_URL=postgresql://... python -m benchmarks.vector_adapter_load --rows 50000
+
+Serves a small FastAPI app in-process with a /ping endpoint and a /search
+endpoint backed by the vector adapter's PgVectorStore. /ping is measured
+alone, then again while --concurrency clients hammer /search with exact
+(sequential scan) similarity queries. With the pooled adapter, /ping p99
+should stay flat because searches never hold the event loop.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from app.services.vector_adapter import PgVectorStore, VectorDocument
+from app.vector.pgvector_store import quote_ident
+
+COLLECTION = "bench_adapter_load"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def build_app(store: PgVectorStore, dim: int) -> FastAPI:
+    app = FastAPI()
+    rng = np.random.default_rng(1)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/search")
+    async def search():
+        query = rng.standard_normal(dim, dtype=np.float32)
+        results = await store.search(COLLECTION, query, top_k=5)
+        return {"count": len(results)}
+
+    return app
+
+
+async def measure_ping(client: httpx.AsyncClient, duration: float, interval: float = 0.005):
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        await client.get("/ping")
+        samples.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def search_worker(client: httpx.AsyncClient, stop: asyncio.Event, latencies):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get("/search")
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    store = PgVectorStore(
+        os.environ["SUPABASE_DB_URL"],
+        max_pool_size=args.concurrency,
+        embedding_dimension=args.dim,
+    )
+    await store.connect()
+
+    try:
+        async with store.pool.acquire() as conn:
+            await conn.execute(f"DROP TABLE IF EXISTS {quote_ident(COLLECTION)};")
+        await store.create_collection(COLLECTION)
+        async with store.pool.acquire() as conn:
+            # Exact scans make every search deliberately slow
+            await conn.execute(f"DROP INDEX IF EXISTS {quote_ident(COLLECTION + '_embedding_idx')};")
+
+        rng = np.random.default_rng(0)
+        for start in range(0, args.rows, 5_000):
+            count = min(5_000, args.rows - start)
+            vectors = rng.standard_normal((count, args.dim), dtype=np.float32)
+            await store.upsert_documents(COLLECTION, [
+                VectorDocument(id=str(start + i), content="", metadata={}, embedding=vectors[i])
+                for i in range(count)
+            ])
+
+        transport = httpx.ASGITransport(app=build_app(store, args.dim))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            idle = await measure_ping(client, args.duration / 2)
+
+            stop, search_latencies = asyncio.Event(), []
+            workers = [
+                asyncio.create_task(search_worker(client, stop, search_latencies))
+                for _ in range(args.concurrency)
+            ]
+            loaded = await measure_ping(client, args.duration)
+            stop.set()
+            await asyncio.gather(*workers)
+
+        print(f"/ping idle     : p50 {statistics.median(idle):6.2f} ms  p99 {percentile(idle, 99):6.2f} ms")
+        print(f"/ping w/ search: p50 {statistics.median(loaded):6.2f} ms  p99 {percentile(loaded, 99):6.2f} ms")
+        print(f"/search        : p50 {statistics.median(search_latencies):6.2f} ms  "
+              f"p99 {percentile(search_latencies, 99):6.2f} ms  ({len(search_latencies)} requests)")
+    finally:
+        async with store.pool.acquire() as conn:
+            await conn.execute(f"DROP TABLE IF EXISTS {quote_ident(COLLECTION)};")
+        await store.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
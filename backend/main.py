@@ -35,6 +35,16 @@ from app.routers.evaluations import router as evaluations_router
 # New architecture imports
 from app.auth import initialize_firebase
 from app.db import initialize_database, close_database, health_check
+from app.config.provider_registry import close_providers, warm_providers
+from app.config.vector_db import close_vector_databases
+from app.services.chunk_dedup import get_dedup_index
+from app.services.chunking_pool import shutdown_chunking_pool
+from app.services.embed_pipeline import get_pipeline_stats
+from app.services.embedding_batcher import get_batcher_stats
+from app.services.file.ocr_shards import get_ocr_stats
+from app.services.file.text_layer import get_text_layer_stats
+from app.services.embedding_cache import get_embedding_cache, get_query_embedding_cache
+from app.vector.upsert_buffer import flush_upsert_buffer, get_upsert_buffer_stats
 
 import dotenv
 
@@ -88,6 +98,9 @@ async def startup_event():
         # Initialize database connections  
         await initialize_database()
         logger.info("✓ Database connections initialized")
+
+        # Build shared embedding clients before the first request needs them
+        await warm_providers()
         
         logger.info("🚀 RFP Buyer API started successfully!")
         
@@ -106,6 +119,17 @@ async def shutdown_event():
         # Cleanup database connections
         await close_database()
         logger.info("✓ Database connections closed")
+
+        await flush_upsert_buffer()
+        logger.info("✓ Buffered vector upserts written")
+        await close_vector_databases()
+        logger.info("✓ Vector database clients closed")
+
+        await close_providers()
+        logger.info("✓ Embedding and LLM clients closed")
+
+        shutdown_chunking_pool()
+        logger.info("✓ Chunking workers stopped")
         
     except Exception as e:
         logger.error(f"❌ Error during shutdown: {e}")
@@ -165,6 +189,29 @@ async def health_check():
                 "error": str(e)
             }
         
+        # Pipeline stats; each component reports (or fails) under its own key
+        def optional_stats(component):
+            return {"status": "healthy", **component.get_stats()} if component else {"status": "disabled"}
+
+        pipeline_stats = {
+            "embedding_cache": lambda: optional_stats(get_embedding_cache()),
+            "query_embedding_cache": lambda: optional_stats(get_query_embedding_cache()),
+            "embedding_throughput": get_batcher_stats,
+            "embed_pipeline": get_pipeline_stats,
+            "vector_upsert_buffer": get_upsert_buffer_stats,
+            "ocr": get_ocr_stats,
+            "ocr_text_layer": get_text_layer_stats,
+            "chunk_dedup": lambda: optional_stats(get_dedup_index()),
+        }
+        for name, get_stats in pipeline_stats.items():
+            try:
+                services_status[name] = get_stats()
+            except Exception as e:
+                services_status[name] = {
+                    "status": "error",
+                    "error": str(e)
+                }
+        
         # Check Database
         try:
             db_healthy = await health_check()
@@ -0,0 +1,99 @@
+"""
+Tests for duplicate occurrences stored in canonical vector metadata
+
+Run from backend/: python -m pytest test_chunk_dedup.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.services import chunk_dedup
+from app.vector.filters import matches_filter, normalize_filter
+
+
+class MemoryVectors:
+    """The VectorDatabase calls chunk_dedup makes, over a dict"""
+
+    def __init__(self):
+        self.vectors = {}
+
+    async def fetch_vectors(self, ids, namespace):
+        return {
+            id: SimpleNamespace(id=id, values=self.vectors[id]["values"], metadata=dict(self.vectors[id]["metadata"]))
+            for id in ids if id in self.vectors
+        }
+
+    async def query_ids(self, filters, namespace):
+        normalized = normalize_filter(filters)
+        return [id for id, vector in self.vectors.items() if matches_filter(vector["metadata"], normalized)]
+
+    async def update_metadata(self, id, metadata, namespace):
+        self.vectors[id]["metadata"].update(metadata)
+
+    async def upsert_vectors(self, vectors, namespace):
+        for vector in vectors:
+            self.vectors[vector["id"]] = {"values": vector["values"], "metadata": dict(vector["metadata"])}
+
+    def query(self, filters):
+        expanded, in_scope = chunk_dedup.expand_filters(filters)
+        matches = [
+            SimpleNamespace(id=id, metadata=dict(vector["metadata"]))
+            for id, vector in self.vectors.items()
+            if matches_filter(vector["metadata"], normalize_filter(expanded))
+        ]
+        return chunk_dedup.remap_matches(matches, in_scope)
+
+
+def canonical(db, id, file_id, project_id="p1"):
+    db.vectors[id] = {
+        "values": [0.1, 0.2],
+        "metadata": {"id": id, "text": "terms", "page_numbers": [1], "file_id": file_id, "project_id": project_id},
+    }
+
+
+def test_occurrences_are_found_by_scope_and_remapped():
+    db = MemoryVectors()
+    canonical(db, "a#1#x#0", "a")
+    rejected = asyncio.run(chunk_dedup.attach_occurrences(db, "pdfs", [
+        ("b#3#y#0", "a#1#x#0", {"page_numbers": [3], "file_id": "b", "project_id": "p2"}),
+        ("c#1#z#0", "gone#1#x#0", {"page_numbers": [1], "file_id": "c", "project_id": "p2"}),
+    ]))
+
+    assert rejected == ["c#1#z#0"]
+    assert asyncio.run(chunk_dedup.file_occurrences(db, "pdfs", "b")) == {"b#3#y#0": "a#1#x#0"}
+    [match] = db.query({"file_id": "b"})
+    assert (match.id, match.metadata["file_id"], match.metadata["page_numbers"]) == ("a#1#x#0", "b", [3])
+    [match] = db.query({"file_id": ["a"], "project_id": "p1"})
+    assert match.metadata["file_id"] == "a"
+    assert db.query({"file_id": "b", "project_id": "p1"}) == []
+
+
+def test_deleted_canonical_moves_to_its_occurrence():
+    db = MemoryVectors()
+    canonical(db, "a#1#x#0", "a")
+    asyncio.run(chunk_dedup.attach_occurrences(db, "pdfs", [
+        ("b#3#y#0", "a#1#x#0", {"page_numbers": [3], "file_id": "b", "project_id": "p2"}),
+        ("c#2#y#0", "a#1#x#0", {"page_numbers": [2], "file_id": "c", "project_id": "p2"}),
+    ]))
+
+    rehomed = asyncio.run(chunk_dedup.release(db, "pdfs", ["a#1#x#0"], scope=("file_id", ["a", "c"])))
+    del db.vectors["a#1#x#0"]
+
+    assert list(rehomed) == ["a#1#x#0"]
+    assert rehomed["a#1#x#0"]["id"] == "b#3#y#0"
+    assert [match.id for match in db.query({"file_id": "b"})] == ["b#3#y#0"]
+    assert db.query({"file_id": "c"}) == []
+    assert db.vectors["b#3#y#0"]["metadata"]["text"] == "terms"
+
+
+def test_deleted_ids_are_released_without_a_scope():
+    db = MemoryVectors()
+    canonical(db, "a#1#x#0", "a")
+    canonical(db, "a#2#w#0", "a")
+    asyncio.run(chunk_dedup.attach_occurrences(db, "pdfs", [
+        ("b#3#y#0", "a#1#x#0", {"page_numbers": [3], "file_id": "b", "project_id": "p2"}),
+    ]))
+
+    rehomed = asyncio.run(chunk_dedup.release(db, "pdfs", ["a#1#x#0", "a#2#w#0", "gone#1#x#0"]))
+
+    assert [vector["id"] for vector in rehomed.values()] == ["b#3#y#0"]
+    assert chunk_dedup.occurrences_of(db.vectors["b#3#y#0"]["metadata"]) == []
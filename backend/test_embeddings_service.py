@@ -0,0 +1,88 @@
+"""
+Tests for batched query embedding
+
+Run from backend/: python -m pytest test_embeddings_service.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.services.embedding_batcher import AdaptiveBatcher
+from app.services.embeddings_service import GoogleProvider, OpenAIProvider
+
+
+class RecordingModels:
+    """client.aio.models of google-genai; records each request"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def embed_content(self, model, contents, config):
+        contents = [contents] if isinstance(contents, str) else contents
+        self.requests.append((len(contents), config.task_type))
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=[float(len(text)), 1.0]) for text in contents])
+
+
+def test_google_queries_are_split_into_requests_of_at_most_250():
+    provider = GoogleProvider.__new__(GoogleProvider)
+    provider.model, provider.dimensions = "text-embedding-004", 2
+    provider.client = SimpleNamespace(aio=SimpleNamespace(models=RecordingModels()))
+    provider.batcher = AdaptiveBatcher(
+        "google-test", provider.model,
+        max_tokens_per_request=20_000, max_inputs_per_request=250, max_tokens_per_input=2048,
+    )
+    queries = [f"query {n}" for n in range(600)]
+
+    embeddings = asyncio.run(provider.embed_queries(queries))
+
+    requests = provider.client.aio.models.requests
+    assert embeddings.shape == (600, 2)
+    assert embeddings[:, 0].tolist() == [float(len(query)) for query in queries]
+    assert sum(size for size, _ in requests) == 600
+    assert max(size for size, _ in requests) <= 250
+    assert {task_type for _, task_type in requests} == {"RETRIEVAL_QUERY"}
+
+
+def test_openai_queries_go_through_the_batcher():
+    sizes = []
+
+    async def aembed_documents(texts):
+        sizes.append(len(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    provider = OpenAIProvider.__new__(OpenAIProvider)
+    provider.embeddings = SimpleNamespace(aembed_documents=aembed_documents)
+    provider.batcher = AdaptiveBatcher(
+        "openai-test", "text-embedding-3-small",
+        max_tokens_per_request=300_000, max_inputs_per_request=2048, max_tokens_per_input=8191,
+    )
+
+    embeddings = asyncio.run(provider.embed_queries([f"query {n}" for n in range(5000)]))
+
+    assert embeddings.shape == (5000, 2)
+    assert max(sizes) <= 2048
+    assert provider.batcher.get_stats()["requests"] == len(sizes)
+
+
+def test_concurrent_runs_share_the_batcher_concurrency_limit():
+    batcher = AdaptiveBatcher(
+        "limit-test", "text-embedding-3-small",
+        max_tokens_per_request=1000, max_inputs_per_request=1, max_concurrency=2, initial_concurrency=2,
+    )
+    active, peak = 0, 0
+
+    async def send(texts):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return [[1.0, 0.0] for _ in texts]
+
+    async def upload_and_queries():
+        return await asyncio.gather(*[batcher.run([f"text {n}" for n in range(6)], send) for _ in range(4)])
+
+    results = asyncio.run(upload_and_queries())
+
+    assert [embeddings.shape for embeddings in results] == [(6, 2)] * 4
+    assert peak == 2
+    assert batcher.get_stats()["in_flight"] == 0
@@ -0,0 +1,42 @@
+"""
+Tests for process_files / vectorize_files_batch when files fail
+
+Run from backend/: python -m pytest test_file_processing.py
+"""
+import asyncio
+import sys
+import types
+from unittest.mock import AsyncMock, MagicMock
+
+# Firestore needs service-account credentials at import time
+_firebase = types.ModuleType("app.config.firebase")
+_firebase.firebase_manager = MagicMock()
+sys.modules.setdefault("app.config.firebase", _firebase)
+
+from app.services.file import file_processing  # noqa: E402
+
+
+def test_vectorize_files_batch_without_files():
+    assert asyncio.run(file_processing.vectorize_files_batch([])) == {"success": True, "vectorized": []}
+
+
+def test_process_files_when_every_file_in_a_batch_fails(monkeypatch):
+    firebase_manager = MagicMock()
+    firebase_manager.get_documents = AsyncMock(return_value=[
+        {"id": "a", "url": "https://example.com/a.pdf"},
+        {"id": "b", "url": "https://example.com/b.pdf"},
+    ])
+    firebase_manager.batch_operation = AsyncMock()
+    monkeypatch.setattr(file_processing, "firebase_manager", firebase_manager)
+    process_single_file = AsyncMock(side_effect=Exception("OCR failed"))
+    monkeypatch.setattr(file_processing, "process_single_file", process_single_file)
+    vectorize_files_batch = AsyncMock(wraps=file_processing.vectorize_files_batch)
+    monkeypatch.setattr(file_processing, "vectorize_files_batch", vectorize_files_batch)
+
+    # One file per batch: both batches must run despite the first failing
+    result = asyncio.run(file_processing.process_files(["a", "b"], files_batch_size=1))
+
+    assert result == ["a", "b"]
+    assert process_single_file.await_count == 2
+    vectorize_files_batch.assert_not_awaited()
+    firebase_manager.batch_operation.assert_not_awaited()
@@ -0,0 +1,49 @@
+"""
+Tests for pgvector index builds
+
+Run from backend/: python -m pytest test_index_spec.py
+"""
+import asyncio
+import contextlib
+
+from app.vector import index_spec
+from app.vector.index_spec import IndexSpec, build_index
+from app.vector.pgvector_store import ensure_collection
+
+
+class RecordingConnection:
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, statement: str, *args):
+        self.statements.append(statement)
+
+    async def fetchval(self, statement: str, *args):
+        # Nothing else exists yet
+        return self.rows if "COUNT(*)" in statement else None
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def test_build_lifts_the_pool_statement_timeout(monkeypatch):
+    monkeypatch.setattr(index_spec, "MAINTENANCE_WORK_MEM", "1GB")
+    conn = RecordingConnection(rows=50_000)
+
+    asyncio.run(build_index(conn, '"docs"', '"docs_embedding_idx"', IndexSpec(kind="hnsw")))
+
+    create = next(i for i, statement in enumerate(conn.statements) if statement.startswith("CREATE INDEX"))
+    assert "SET LOCAL statement_timeout = 0;" in conn.statements[:create]
+    assert "SET LOCAL maintenance_work_mem = '1GB';" in conn.statements[:create]
+
+
+def test_filter_indexes_are_built_without_the_pool_statement_timeout():
+    conn = RecordingConnection(rows=50_000)
+
+    asyncio.run(ensure_collection(conn, "docs", 256, IndexSpec(kind="hnsw")))
+
+    lifted = conn.statements.index("SET LOCAL statement_timeout = 0;")
+    first_index = next(i for i, statement in enumerate(conn.statements) if statement.startswith("CREATE INDEX"))
+    assert lifted < first_index
@@ -0,0 +1,33 @@
+"""
+Tests for LocalVectorStore batch search
+
+Run from backend/: python -m pytest test_local_store.py
+"""
+import asyncio
+
+import numpy as np
+
+from app.vector.base import VectorDocument
+from app.vector.local_store import LocalVectorStore
+
+
+def test_search_many_accepts_ndarray_queries(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((20, 8)).astype(np.float32)
+
+    async def run():
+        store = LocalVectorStore(str(tmp_path))
+        await store.create_collection("docs", dimension=8)
+        await store.upsert_documents("docs", [
+            VectorDocument(id=f"doc-{i}", content=f"chunk {i}", metadata={"file_id": "f"}, embedding=vector)
+            for i, vector in enumerate(vectors)
+        ])
+        return (
+            await store.search_many("docs", vectors[:3], limit=2),
+            await store.search_many("docs", np.empty((0, 8), dtype=np.float32), limit=2),
+        )
+
+    results, empty = asyncio.run(run())
+
+    assert [matches[0].id for matches in results] == ["doc-0", "doc-1", "doc-2"]
+    assert empty == []
@@ -0,0 +1,39 @@
+"""
+Tests for which documents are downloaded before OCR
+
+Run from backend/: python -m pytest test_ocr_shards.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.services.file.ocr_shards import iter_ocr_pages, may_be_pdf
+from app.services.file.text_layer import iter_text_layer_pages
+
+
+async def ocr(document):
+    return SimpleNamespace(pages=[SimpleNamespace(index=0)])
+
+
+def test_non_pdf_urls_go_to_ocr_without_a_download():
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(url)
+        return b"PK\x03\x04"
+
+    async def pages(iterate, url):
+        return [total async for _, total in iterate(url, ocr, fetch=fetch)]
+
+    url = "https://storage.googleapis.com/bucket/u/p/d/file.docx?alt=media"
+    assert asyncio.run(pages(iter_ocr_pages, url)) == [1]
+    assert asyncio.run(pages(iter_text_layer_pages, url)) == [1]
+    assert fetched == []
+
+    asyncio.run(pages(iter_ocr_pages, "https://example.com/o/u%2Ffile.pdf?alt=media"))
+    assert fetched == ["https://example.com/o/u%2Ffile.pdf?alt=media"]
+
+
+def test_urls_without_an_extension_may_be_pdfs():
+    assert may_be_pdf("https://example.com/download/1234")
+    assert may_be_pdf("https://example.com/files/RFP.PDF")
+    assert not may_be_pdf("https://example.com/files/notes.txt")
@@ -0,0 +1,149 @@
+"""
+Tests for VectorizationService.sync_file_vectors diffing against Pinecone
+
+Run from backend/: python -m pytest test_vectorization_service.py
+"""
+import asyncio
+import importlib
+from unittest.mock import AsyncMock
+
+from app.config import local_storage
+from app.services import vector_registry, vectorization_service
+from app.services.markdown_chunker import PageChunk
+from app.services.vector_registry import VectorRegistry
+
+
+class ListingDatabase:
+    """Pinecone holding ``stored`` IDs; dedup is off, so only IDs are listed"""
+
+    stored = []
+
+    def __init__(self, index_name):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def list_ids(self, prefixes, namespace):
+        return [[id for id in self.stored if id.startswith(prefix)] for prefix in prefixes]
+
+
+def test_sync_diffs_against_ids_listed_from_pinecone(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_storage, "LOCAL_DATA_DIR", str(tmp_path))
+    # This instance's registry knows nothing of the file
+    registry = VectorRegistry(str(tmp_path / "registry.db"))
+    monkeypatch.setattr(vector_registry, "_registry", registry)
+    monkeypatch.setattr(vectorization_service, "VectorDatabase", ListingDatabase)
+    service = vectorization_service.VectorizationService(index_name="index")
+    service.embed_and_upload = AsyncMock()
+    service.delete_data = AsyncMock()
+
+    metadata = {"file_id": "f", "user_id": "u"}
+    chunks = [PageChunk(content=f"Section {n}", page_numbers=[n], metadata={}) for n in range(3)]
+    ids = vectorization_service.chunk_ids("f", chunks, metadata)
+    ListingDatabase.stored = ids[:2] + ["f#9#removed#0"]
+
+    counts = asyncio.run(service.sync_file_vectors("f", chunks, metadata, namespace="pdfs"))
+
+    assert counts == {"added": 1, "deduplicated": 0, "deleted": 1, "unchanged": 2}
+    assert service.embed_and_upload.await_args.kwargs["ids"] == ids[2:]
+    service.delete_data.assert_awaited_once_with(ids=["f#9#removed#0"], namespace="pdfs")
+    assert sorted(registry.lookup("index", "pdfs", "file_id", ["f"])[0]) == sorted(ListingDatabase.stored)
+
+
+class BufferingDatabase(ListingDatabase):
+    """Records buffered vectors; writes complete at once"""
+
+    written = []
+
+    async def buffer_vectors(self, vectors, namespace):
+        self.written.extend(vectors)
+        durable = asyncio.get_running_loop().create_future()
+        durable.set_result(None)
+        return durable
+
+
+def test_embed_and_upload_leaves_the_shared_provider_alone(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_storage, "LOCAL_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(vector_registry, "_registry", VectorRegistry(str(tmp_path / "registry.db")))
+    monkeypatch.setattr(vectorization_service, "VectorDatabase", BufferingDatabase)
+    service = vectorization_service.VectorizationService(
+        index_name="index", provider="local", embed_model="local-hash"
+    )
+    provider = service.embeddings_service.provider
+    shared_batch_size = provider.batch_size
+
+    chunks = [PageChunk(content=f"Section {n} pricing", page_numbers=[n], metadata={}) for n in range(7)]
+    asyncio.run(service.embed_and_upload(chunks, {"file_id": "f"}, namespace="pdfs", batch_size=3))
+
+    assert provider.batch_size == shared_batch_size
+    assert [vector["metadata"]["text"] for vector in BufferingDatabase.written] == [c.content for c in chunks]
+
+
+class ListingIndex:
+    """Pinecone's async index.list(): pages of plain ID lists"""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    async def list(self, prefix, namespace):
+        matching = [id for id in self.ids if id.startswith(prefix)]
+        for start in range(0, len(matching), 2):
+            yield matching[start:start + 2]
+
+
+def test_list_ids_reads_id_pages():
+    db = vectorization_service.VectorDatabase("index")
+    db.index = ListingIndex(["a#1#x#0", "a#2#y#0", "a#3#z#0", "b#1#x#0"])
+
+    listed = asyncio.run(db.list_ids(["a#", "b#", "c#"], "pdfs"))
+
+    assert listed == [["a#1#x#0", "a#2#y#0", "a#3#z#0"], ["b#1#x#0"], []]
+
+
+def test_local_provider_with_dimensions_from_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_storage, "LOCAL_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "256")
+    # The default is read when the module is imported
+    module = importlib.reload(vectorization_service)
+    try:
+        service = module.VectorizationService(index_name="index", provider="local", embed_model="local-hash")
+        embeddings = asyncio.run(service.embeddings_service.embed_documents(["vendor shall provide support"]))
+        query = asyncio.run(service.embeddings_service.embed_query("support"))
+    finally:
+        monkeypatch.delenv("EMBEDDING_DIMENSIONS")
+        importlib.reload(vectorization_service)
+
+    assert embeddings.shape == (1, 256)
+    assert query.shape == (256,)
+
+
+class ScanningDatabase(ListingDatabase):
+    """Pinecone whose filter scan finds ``scanned``; records deleted IDs"""
+
+    scanned = []
+    deleted = []
+
+    async def query_ids(self, filters, namespace):
+        return list(self.scanned)
+
+    async def delete_ids(self, ids, namespace):
+        self.deleted.extend(ids)
+
+
+def test_delete_by_item_also_removes_vectors_other_instances_uploaded(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_storage, "LOCAL_DATA_DIR", str(tmp_path))
+    registry = VectorRegistry(str(tmp_path / "registry.db"))
+    monkeypatch.setattr(vector_registry, "_registry", registry)
+    monkeypatch.setattr(vectorization_service, "VectorDatabase", ScanningDatabase)
+    registry.add("index", "pdfs", [{"id": "mine", "metadata": {"kh_item_id": "k"}}])
+    ScanningDatabase.scanned = ["mine", "theirs"]
+    service = vectorization_service.VectorizationService(index_name="index")
+
+    assert asyncio.run(service.delete_data(namespace="pdfs", filters={"kh_item_id": ["k"]}))
+
+    assert ScanningDatabase.deleted == ["mine", "theirs"]
+    assert registry.lookup("index", "pdfs", "kh_item_id", ["k"]) == ([], ["k"])